@@ -0,0 +1,110 @@
+"""
+Compare the NumPy analytics reports with equivalent per-dict Python loops.
+
+Run from the project directory:
+    python -m benchmarks.analytics_benchmark [--orders N] [--items N]
+"""
+import argparse
+import random
+import time
+from datetime import datetime, timedelta
+
+from src.services.analytics_service import AnalyticsService, SalesFrame
+
+def make_data(order_count: int, item_count: int, seed: int = 42):
+    rng = random.Random(seed)
+    items = [
+        {"item_id": f"sku{i}", "name": f"Item {i}", "price": round(rng.uniform(5, 500), 2),
+         "quantity": rng.randint(0, 200), "description": ""}
+        for i in range(item_count)
+    ]
+    start = datetime(2024, 1, 1)
+    orders = []
+    for _ in range(order_count):
+        lines = [
+            {"item_id": item["item_id"], "quantity": rng.randint(1, 5), "price": item["price"]}
+            for item in rng.sample(items, rng.randint(1, 5))
+        ]
+        orders.append({
+            "username": f"user{rng.randint(0, 999)}",
+            "items": lines,
+            "total": sum(line["price"] * line["quantity"] for line in lines),
+            "status": "processing",
+            "timestamp": (start + timedelta(minutes=rng.randint(0, 525600))).isoformat()
+        })
+    return orders, items
+
+def python_reports(orders, items):
+    units, revenue, days = {}, {}, {}
+    for order in orders:
+        day = order["timestamp"][:10]
+        bucket = days.setdefault(day, [0, 0.0])
+        bucket[0] += 1
+        bucket[1] += order["total"]
+        for line in order["items"]:
+            units[line["item_id"]] = units.get(line["item_id"], 0) + line["quantity"]
+            revenue[line["item_id"]] = revenue.get(line["item_id"], 0.0) + line.get("price", 0.0) * line["quantity"]
+
+    top = sorted(units, key=lambda item_id: (-units[item_id], -revenue[item_id]))[:10]
+
+    period = 1
+    if days:
+        first, last = min(days), max(days)
+        period = (datetime.fromisoformat(last) - datetime.fromisoformat(first)).days + 1
+    health = []
+    for item in items:
+        sold = units.get(item["item_id"], 0)
+        received = sold + item["quantity"]
+        rate = sold / period
+        health.append((
+            item["item_id"],
+            sold / received if received else 0.0,
+            item["quantity"] / rate if rate else float("inf")
+        ))
+    return top, revenue, sorted(days.items()), health
+
+def numpy_reports(orders, items):
+    frame = SalesFrame(orders, items)
+    return (
+        AnalyticsService.top_sellers(frame=frame),
+        AnalyticsService.revenue_by_item(frame=frame),
+        AnalyticsService.revenue_by_day(frame=frame),
+        AnalyticsService.stock_health(frame=frame)
+    )
+
+def timed(function, *args, repeat: int = 3) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function(*args)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--orders", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--items", type=int, default=5000)
+    args = parser.parse_args()
+
+    if not AnalyticsService.available():
+        print("numpy is not installed; install it to run the analytics benchmark")
+        return
+
+    print(f"{'orders':>10} {'python (s)':>12} {'numpy (s)':>12} {'numpy, frame reused (s)':>24}")
+    for order_count in args.orders:
+        orders, items = make_data(order_count, args.items)
+        python_time = timed(python_reports, orders, items)
+        numpy_time = timed(numpy_reports, orders, items)
+
+        # Reports against an already-built frame, as the reports menu does between writes
+        frame = SalesFrame(orders, items)
+        reuse_time = timed(lambda: (
+            AnalyticsService.top_sellers(frame=frame),
+            AnalyticsService.revenue_by_item(frame=frame),
+            AnalyticsService.revenue_by_day(frame=frame),
+            AnalyticsService.stock_health(frame=frame)
+        ))
+        print(f"{order_count:>10} {python_time:>12.4f} {numpy_time:>12.4f} {reuse_time:>24.4f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,46 @@
+"""
+On-disk size and encode/decode time of each data file format (see
+src/storage/formats.py) for inventory, user and order collections.
+
+Run from the project directory:
+    python -m benchmarks.format_benchmark [--items N] [--users N] [--orders N] [--data-dir DIR]
+
+With --data-dir the files found there (e.g. data) are measured as well.
+"""
+import argparse
+import glob
+import os
+
+from benchmarks.analytics_benchmark import make_data, timed
+from benchmarks.models_benchmark import make_users
+from src.storage import formats
+from src.storage.json_backend import JsonFileBackend
+
+def measure(name: str, records) -> None:
+    for fmt in formats.FORMATS + (formats.JSON_LINES,):
+        raw = formats.encode(records, fmt)
+        encode_time = timed(formats.encode, records, fmt)
+        decode_time = timed(formats.decode, raw)
+        print(f"{name:<24} {len(records):>9} {fmt:>8} {len(raw) / 2**20:>10.2f} {encode_time:>12.4f} {decode_time:>12.4f}")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--items", type=int, default=100000)
+    parser.add_argument("--users", type=int, default=100000)
+    parser.add_argument("--orders", type=int, default=100000)
+    parser.add_argument("--data-dir", help="also measure the data files in this directory")
+    args = parser.parse_args()
+
+    orders, items = make_data(args.orders, args.items)
+    print(f"{'collection':<24} {'records':>9} {'format':>8} {'MiB':>10} {'encode (s)':>12} {'decode (s)':>12}")
+    measure("inventory", items)
+    measure("users", make_users(args.users))
+    measure("orders", orders)
+
+    if args.data_dir:
+        backend = JsonFileBackend()
+        for filename in sorted(glob.glob(os.path.join(args.data_dir, "*.txt"))):
+            measure(os.path.basename(filename), backend.read_data(filename))
+
+if __name__ == "__main__":
+    main()
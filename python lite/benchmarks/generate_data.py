@@ -0,0 +1,121 @@
+"""
+Seeded synthetic data for the retail system: users, items, carts and orders.
+The same seed always produces the same data.
+
+Run from the project directory:
+    python -m benchmarks.generate_data DIR [--users N] [--items N] [--orders N] [--carts N] [--seed N]
+
+Writes DIR/data/ through the configured storage backend. Every generated
+user's password is "password"; user0 is always an approved customer.
+"""
+import argparse
+import os
+import random
+from datetime import datetime, timedelta
+from typing import Dict, List
+
+from src.models.item import Item
+from src.models.user import User, UserRole, UserStatus
+from src.repositories.cart_repository import CartRepository
+from src.repositories.inventory_repository import InventoryRepository
+from src.repositories.order_repository import OrderRepository
+from src.repositories.sales_repository import SalesRepository
+from src.repositories.user_repository import UserRepository
+from src.services.order_service import OrderService
+from src.utils.file_handler import FileHandler
+
+PASSWORD = "password"
+START = datetime(2024, 1, 1)
+
+def make_users(count: int, rng: random.Random) -> List[Dict]:
+    users = []
+    for i in range(count):
+        # Mostly customers, with a few staff; most accounts approved
+        role = UserRole.CUSTOMER if i == 0 or rng.random() < 0.95 else rng.choice(
+            [UserRole.ADMIN, UserRole.INVENTORY]
+        )
+        status = UserStatus.APPROVED if i == 0 or rng.random() < 0.9 else rng.choice(
+            [UserStatus.PENDING, UserStatus.BANNED]
+        )
+        users.append(User(f"user{i}", PASSWORD, role, status).to_dict())
+    return users
+
+def make_items(count: int, rng: random.Random) -> List[Dict]:
+    return [
+        Item(
+            f"sku{i}", f"Item {i}", round(rng.uniform(5, 2000), 2), rng.randint(0, 500),
+            f"Synthetic item {i}", rng.randint(0, 20)
+        ).to_dict()
+        for i in range(count)
+    ]
+
+def make_orders(count: int, customers: List[str], items: List[Dict], rng: random.Random) -> List[Dict]:
+    orders = []
+    for _ in range(count):
+        lines = []
+        for item in rng.sample(items, min(len(items), rng.randint(1, 5))):
+            lines.append({"item_id": item["item_id"], "quantity": rng.randint(1, 3), "price": item["price"]})
+        orders.append({
+            "username": rng.choice(customers),
+            "items": lines,
+            "total": sum(line["price"] * line["quantity"] for line in lines),
+            "status": "processing",
+            "timestamp": (START + timedelta(seconds=rng.randint(0, 365 * 86400))).isoformat()
+        })
+    # Orders are appended as they happen, so keep them in time order and number them in it
+    orders.sort(key=lambda order: order["timestamp"])
+    return [{"order_id": i, **order} for i, order in enumerate(orders, 1)]
+
+def generate(users: int, items: int, orders: int, carts: int, seed: int = 42) -> Dict[str, int]:
+    """Replace the data files under ./data with synthetic records. Returns record counts"""
+    rng = random.Random(seed)
+    os.makedirs(CartRepository.CART_DIR, exist_ok=True)
+
+    user_records = make_users(max(users, 1), rng)
+    FileHandler.write_data(UserRepository.USER_FILE, user_records)
+    customers = [
+        user["username"] for user in user_records
+        if user["role"] == UserRole.CUSTOMER.value and user["status"] == UserStatus.APPROVED.value
+    ]
+
+    item_records = make_items(items, rng)
+    FileHandler.write_data(InventoryRepository.INVENTORY_FILE, item_records)
+
+    # Written shard by shard with one index rebuild at the end, rather than
+    # updating the cart index once per cart
+    cart_owners = rng.sample(customers, min(carts, len(customers))) if item_records else []
+    for username in cart_owners:
+        lines = [
+            {"username": username, "item_id": item["item_id"], "quantity": rng.randint(1, 3),
+             "timestamp": (START + timedelta(seconds=rng.randint(0, 365 * 86400))).isoformat()}
+            for item in rng.sample(item_records, min(len(item_records), rng.randint(1, 5)))
+        ]
+        FileHandler.write_data(CartRepository.shard(username), lines)
+    CartRepository.rebuild_index(cart_owners)
+
+    order_records = make_orders(orders, customers, item_records, rng) if item_records else []
+    FileHandler.write_data(OrderService.ORDERS_FILE, order_records)
+    SalesRepository.rebuild(OrderService.ORDERS_FILE)
+    OrderRepository.rebuild()
+
+    return {"users": len(user_records), "items": len(item_records), "carts": len(cart_owners),
+            "orders": len(order_records)}
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("directory", help="working directory to create data/ in")
+    parser.add_argument("--users", type=int, default=10000)
+    parser.add_argument("--items", type=int, default=10000)
+    parser.add_argument("--orders", type=int, default=10000)
+    parser.add_argument("--carts", type=int, default=1000)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    os.makedirs(args.directory, exist_ok=True)
+    os.chdir(args.directory)
+    counts = generate(args.users, args.items, args.orders, args.carts, args.seed)
+    for name, count in counts.items():
+        print(f"{name}: {count}")
+
+if __name__ == "__main__":
+    main()
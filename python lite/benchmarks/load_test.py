@@ -0,0 +1,146 @@
+"""
+Load test for the HTTP API. Start the server first (python main.py serve),
+then run from the project directory:
+    python -m benchmarks.load_test [--scenario browse|cart|checkout] [--concurrency N] [--requests N]
+
+Setup logs in as the manager, creates one approved customer per connection
+and, if needed, a well-stocked test item. Each connection then loops over the
+scenario's requests on one keep-alive connection. Reports requests/sec and
+p50/p99 latency.
+"""
+import argparse
+import asyncio
+import json
+import time
+from typing import Dict, List, Optional, Tuple
+
+ITEM_ID = "loadtest-item"
+
+class Connection:
+    def __init__(self, host: str, port: int):
+        self.host = host
+        self.port = port
+        self.reader: Optional[asyncio.StreamReader] = None
+        self.writer: Optional[asyncio.StreamWriter] = None
+        self.token: Optional[str] = None
+
+    async def open(self) -> "Connection":
+        self.reader, self.writer = await asyncio.open_connection(self.host, self.port)
+        return self
+
+    async def close(self) -> None:
+        self.writer.close()
+        await self.writer.wait_closed()
+
+    async def request(self, method: str, path: str, body: Optional[Dict] = None) -> Tuple[int, object]:
+        payload = json.dumps(body).encode() if body is not None else b""
+        head = f"{method} {path} HTTP/1.1\r\nHost: {self.host}\r\nContent-Length: {len(payload)}\r\n"
+        if self.token:
+            head += f"Authorization: Bearer {self.token}\r\n"
+        self.writer.write((head + "\r\n").encode("latin-1") + payload)
+        await self.writer.drain()
+
+        response = (await self.reader.readuntil(b"\r\n\r\n")).decode("latin-1").split("\r\n")
+        status = int(response[0].split(" ")[1])
+        length = 0
+        for line in response[1:]:
+            name, _, value = line.partition(":")
+            if name.strip().lower() == "content-length":
+                length = int(value)
+        body = await self.reader.readexactly(length) if length else b""
+        return status, json.loads(body) if body else None
+
+    async def login(self, username: str, password: str) -> None:
+        status, result = await self.request("POST", "/login", {"username": username, "password": password})
+        if status != 200:
+            raise RuntimeError(f"Login as {username} failed: {result}")
+        self.token = result["token"]
+
+async def approved_account(admin: Connection, username: str, password: str, role: str) -> None:
+    await admin.request("POST", "/register", {"username": username, "password": password, "role": role})
+    status, result = await admin.request("PATCH", f"/users/{username}", {"status": "approved"})
+    if status != 200:
+        raise RuntimeError(f"Could not approve {username}: {result}")
+
+async def setup(args) -> List[Connection]:
+    admin = await Connection(args.host, args.port).open()
+    await admin.login(args.manager, args.manager_password)
+
+    await approved_account(admin, "loadtest-stock", "loadtest", "inventory")
+    stock = await Connection(args.host, args.port).open()
+    await stock.login("loadtest-stock", "loadtest")
+    status, _ = await stock.request("GET", f"/items/{ITEM_ID}")
+    if status == 404:
+        await stock.request("POST", "/items", {"item_id": ITEM_ID, "name": "Load test item", "price": 1.0,
+                                               "quantity": 10 ** 9})
+    else:
+        await stock.request("PATCH", f"/items/{ITEM_ID}", {"quantity_change": 10 ** 6})
+    await stock.close()
+
+    connections = []
+    for i in range(args.concurrency):
+        username = f"loadtest{i}"
+        await approved_account(admin, username, "loadtest", "customer")
+        connection = await Connection(args.host, args.port).open()
+        await connection.login(username, "loadtest")
+        connections.append(connection)
+    await admin.close()
+    return connections
+
+SCENARIOS = {
+    "browse": [("GET", f"/items/{ITEM_ID}", None), ("GET", "/cart", None)],
+    "cart": [("POST", "/cart", {"item_id": ITEM_ID, "quantity": 1}), ("GET", "/cart", None)],
+    "checkout": [("POST", "/cart", {"item_id": ITEM_ID, "quantity": 1}), ("POST", "/checkout", None)],
+}
+
+async def worker(connection: Connection, steps, count: int, latencies: List[float], errors: List[int]) -> None:
+    for i in range(count):
+        method, path, body = steps[i % len(steps)]
+        start = time.perf_counter()
+        status, _ = await connection.request(method, path, body)
+        latencies.append(time.perf_counter() - start)
+        if status >= 400:
+            errors.append(status)
+
+def percentile(sorted_values: List[float], fraction: float) -> float:
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, int(fraction * len(sorted_values)))]
+
+async def run(args) -> None:
+    connections = await setup(args)
+    latencies: List[float] = []
+    errors: List[int] = []
+    per_connection = max(1, args.requests // args.concurrency)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(
+        worker(connection, SCENARIOS[args.scenario], per_connection, latencies, errors)
+        for connection in connections
+    ))
+    elapsed = time.perf_counter() - start
+    for connection in connections:
+        await connection.close()
+
+    latencies.sort()
+    print(f"scenario:    {args.scenario}")
+    print(f"concurrency: {args.concurrency}")
+    print(f"requests:    {len(latencies)} ({len(errors)} errors)")
+    print(f"elapsed:     {elapsed:.2f} s")
+    print(f"throughput:  {len(latencies) / elapsed:.1f} requests/s")
+    print(f"p50 latency: {percentile(latencies, 0.50) * 1000:.2f} ms")
+    print(f"p99 latency: {percentile(latencies, 0.99) * 1000:.2f} ms")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--scenario", choices=sorted(SCENARIOS), default="browse")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--manager", default="manager")
+    parser.add_argument("--manager-password", default="admin123")
+    asyncio.run(run(parser.parse_args()))
+
+if __name__ == "__main__":
+    main()
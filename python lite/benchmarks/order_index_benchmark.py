@@ -0,0 +1,71 @@
+"""
+Order lookups through the order index (OrderRepository) against reading the
+whole order history, as OrderService.get_orders did before orders had IDs.
+
+Run from the project directory:
+    python -m benchmarks.order_index_benchmark [--orders 1000 10000 100000] [--repeat N]
+
+For each history size: fetching one order by ID, listing one customer's
+orders, and changing one order's status, which the index does in place and
+the baseline does by rewriting the history.
+"""
+import argparse
+import os
+import tempfile
+import time
+from typing import Callable
+
+from benchmarks.generate_data import generate
+from src.services.order_service import OrderService
+from src.utils.file_handler import FileHandler
+
+def timed(function: Callable, repeat: int) -> float:
+    """Mean seconds per call"""
+    start = time.perf_counter()
+    for _ in range(repeat):
+        function()
+    return (time.perf_counter() - start) / repeat
+
+def full_read_get(order_id: int):
+    return next(order for order in FileHandler.iter_data(OrderService.ORDERS_FILE) if order["order_id"] == order_id)
+
+def full_read_user(username: str):
+    return [order for order in FileHandler.iter_data(OrderService.ORDERS_FILE) if order["username"] == username]
+
+def full_rewrite_status(order_id: int, status: str):
+    orders = FileHandler.read_data(OrderService.ORDERS_FILE)
+    orders = [{**order, "status": status} if order["order_id"] == order_id else order for order in orders]
+    FileHandler.write_data(OrderService.ORDERS_FILE, orders)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--orders", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    print(f"{'operation':<14} {'orders':>8} {'index (ms)':>11} {'full read (ms)':>15} {'speedup':>8}")
+    for count in args.orders:
+        with tempfile.TemporaryDirectory(prefix="retail-orders-") as directory:
+            os.chdir(directory)
+            os.makedirs("data")
+            generate(users=1000, items=1000, orders=count, carts=0)
+            # Start from a cold cache, as a new process would, rather than the history just written
+            FileHandler.clear_cache()
+            order_id = count // 2
+            username = OrderService.get_order(order_id)["username"]
+            statuses = iter(OrderService.ORDER_STATUSES * args.repeat * 2)
+
+            rows = {
+                "get order": (lambda: OrderService.get_order(order_id), lambda: full_read_get(order_id)),
+                "user orders": (lambda: OrderService.get_orders(username), lambda: full_read_user(username)),
+                "update status": (lambda: OrderService.update_order_status(order_id, next(statuses)),
+                                  lambda: full_rewrite_status(order_id, next(statuses))),
+            }
+            for name, (indexed, baseline) in rows.items():
+                indexed_time = timed(indexed, args.repeat)
+                baseline_time = timed(baseline, max(1, args.repeat // 4))
+                print(f"{name:<14} {count:>8} {indexed_time * 1000:>11.3f} {baseline_time * 1000:>15.3f} "
+                      f"{baseline_time / indexed_time:>7.1f}x")
+
+if __name__ == "__main__":
+    main()
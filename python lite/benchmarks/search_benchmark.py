@@ -0,0 +1,103 @@
+"""
+Query latency of InventoryService.search_items against a linear substring scan
+over every item's name and description, plus the cost of building the index
+and of keeping it current as items change.
+
+Run from the project directory:
+    python -m benchmarks.search_benchmark [--items N] [--repeat N] [--seed N]
+
+The catalog is generated in a temporary directory from a fixed vocabulary of
+brands, product types and features, so queries hit realistic match counts.
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+from typing import Callable, Dict, List
+
+from src.models.item import Item
+from src.repositories.inventory_repository import InventoryRepository
+from src.repositories.search_index import SearchIndex
+from src.services.inventory_service import InventoryService
+from src.utils.file_handler import FileHandler
+
+BRANDS = ["Acer", "Asus", "Dell", "HP", "Lenovo", "Apple", "Samsung", "LG", "MSI", "Corsair", "Logitech",
+          "Razer", "Kingston", "Crucial", "Seagate", "Western Digital", "Gigabyte", "Intel", "AMD", "Nvidia"]
+PRODUCTS = ["Laptop", "Desktop", "Monitor", "Keyboard", "Mouse", "Headset", "SSD", "Hard Drive", "Graphics Card",
+            "Processor", "Motherboard", "Memory Kit", "Power Supply", "Webcam", "Router", "Docking Station"]
+FEATURES = ["wireless", "mechanical", "gaming", "ultrawide", "portable", "silent", "rgb", "bluetooth",
+            "ergonomic", "curved", "overclocked", "refurbished", "professional", "compact", "backlit", "4k"]
+
+QUERIES = {
+    "one word": "laptop",
+    "two words": "wireless mouse",
+    "rare words": "curved ultrawide monitor",
+    "prefix": "mech",
+    "no match": "typewriter",
+}
+
+def make_catalog(count: int, rng: random.Random) -> List[Dict]:
+    items = []
+    for i in range(count):
+        product = rng.choice(PRODUCTS)
+        features = rng.sample(FEATURES, 3)
+        items.append(Item(
+            f"sku{i}", f"{rng.choice(BRANDS)} {features[0].title()} {product} {rng.randint(100, 9999)}",
+            round(rng.uniform(5, 2000), 2), rng.randint(0, 100),
+            f"A {features[1]}, {features[2]} {product.lower()} for home and office use."
+        ).to_dict())
+    return items
+
+def linear_search(query: str, limit: int = 20) -> List[Item]:
+    """Baseline: the first items whose name or description contains every query word"""
+    words = query.lower().split()
+    matches = []
+    for record in InventoryRepository.all():
+        text = f"{record['name']} {record.get('description', '')}".lower()
+        if all(word in text for word in words):
+            matches.append(record)
+    return Item.from_records(matches[:limit])
+
+def timed(function: Callable, repeat: int) -> float:
+    """Mean seconds per call"""
+    start = time.perf_counter()
+    for _ in range(repeat):
+        function()
+    return (time.perf_counter() - start) / repeat
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--items", type=int, default=100000)
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix="retail-search-") as directory:
+        os.chdir(directory)
+        os.makedirs("data")
+        FileHandler.write_data(InventoryRepository.INVENTORY_FILE, make_catalog(args.items, random.Random(args.seed)))
+        InventoryService.get_all_items()
+
+        start = time.perf_counter()
+        InventoryService.search_items("warm up")
+        print(f"index build for {args.items} items: {(time.perf_counter() - start) * 1000:.1f} ms\n")
+
+        print(f"{'query':<12} {'matches':>8} {'index (ms)':>11} {'linear (ms)':>12} {'speedup':>8}")
+        for name, query in QUERIES.items():
+            matches = len(InventoryService.search_items(query, limit=None))
+            indexed = timed(lambda: InventoryService.search_items(query), args.repeat)
+            linear = timed(lambda: linear_search(query), max(1, args.repeat // 4))
+            print(f"{name:<12} {matches:>8} {indexed * 1000:>11.3f} {linear * 1000:>12.3f} {linear / indexed:>7.1f}x")
+
+        # Each change also rewrites the inventory file, so time the index update on its own
+        index = SearchIndex(InventoryRepository.all())
+        record = InventoryRepository.get("sku1")
+        renamed = {**record, "name": "Renamed Curved Monitor", "description": "A silent, portable monitor."}
+        print("\nincremental index update per change:")
+        print(f"  rename item: {timed(lambda: (index.update(renamed), index.update(record)), args.repeat) / 2 * 1e6:.1f} us")
+        print(f"  price change: {timed(lambda: index.update({**record, 'price': 1.0}), args.repeat) * 1e6:.1f} us")
+        print(f"  delete and re-add: {timed(lambda: (index.remove('sku1'), index.update(record)), args.repeat) * 1e6:.1f} us")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,191 @@
+"""
+Time and peak memory of each public service method at several data sizes.
+
+Run from the project directory:
+    python -m benchmarks.service_benchmark [--sizes 10000 100000 1000000] [--output FILE] [--compare FILE]
+
+For each size N a fresh process generates N users, N items and N orders (plus
+N/10 carts) with benchmarks.generate_data in a temporary directory and
+benchmarks every method there. The data is rebuilt at each size, so results
+depend only on the size and seed.
+
+Results are written as JSON (default benchmarks/results.json). With --compare,
+methods whose mean time grew by more than --threshold over an earlier results
+file are listed and the exit status is 1.
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+from typing import Callable, Dict, List, Optional
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def measure(name: str, function: Callable, setup: Optional[Callable] = None, repeat: int = 20) -> Dict:
+    """
+    First (cold) call time, mean and best time over repeat further calls, and
+    peak memory allocated during one more call. setup, if given, runs untimed
+    before each call and its result is passed to function.
+    """
+    def call():
+        argument = setup() if setup else None
+        start = time.perf_counter()
+        function(argument) if setup else function()
+        return time.perf_counter() - start
+
+    cold = call()
+    times = [call() for _ in range(repeat)]
+
+    argument = setup() if setup else None
+    tracemalloc.start()
+    function(argument) if setup else function()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        "method": name,
+        "cold_seconds": cold,
+        "mean_seconds": sum(times) / len(times),
+        "best_seconds": min(times),
+        "calls": repeat,
+        "peak_bytes": peak
+    }
+
+def run_size(size: int, seed: int, repeat: int) -> List[Dict]:
+    """Runs inside the per-size worker process, with the temporary directory as cwd"""
+    from benchmarks.generate_data import PASSWORD, generate
+    from src.models.item import Item
+    from src.models.user import User, UserRole, UserStatus
+    from src.services.auth_service import AuthService
+    from src.services.inventory_service import InventoryService
+    from src.services.order_service import OrderService
+
+    generate(users=size, items=size, orders=size, carts=max(1, size // 10), seed=seed)
+    manager = User("manager", "admin123", UserRole.MANAGER, UserStatus.APPROVED)
+    AuthService.register_manager(manager)
+    customer = User("user0", PASSWORD, UserRole.CUSTOMER, UserStatus.APPROVED)
+    middle = f"sku{size // 2}"
+    counter = iter(range(10 ** 9))
+
+    def restock():
+        InventoryService.update_item_quantity(middle, 10)
+
+    def fill_cart():
+        OrderService.add_to_cart(customer, middle, 1)
+
+    def new_item():
+        item_id = f"bench{next(counter)}"
+        InventoryService.add_item(Item(item_id, "Bench item", 1.0, 1))
+        return item_id
+
+    results = [
+        measure("AuthService.login", lambda: AuthService.login("user0", PASSWORD), repeat=repeat),
+        measure("AuthService.register",
+                lambda: AuthService.register(f"bench{next(counter)}", "password", "customer"), repeat=repeat),
+        measure("AuthService.get_all_users", AuthService.get_all_users, repeat=repeat),
+        measure("AuthService.update_user_status",
+                lambda: AuthService.update_user_status("user1", UserStatus.APPROVED, manager), repeat=repeat),
+        measure("InventoryService.get_item", lambda: InventoryService.get_item(middle), repeat=repeat),
+        measure("InventoryService.get_all_items", InventoryService.get_all_items, repeat=repeat),
+        measure("InventoryService.get_low_stock_items",
+                lambda: InventoryService.get_low_stock_items(10), repeat=repeat),
+        measure("InventoryService.add_item", new_item, repeat=repeat),
+        measure("InventoryService.update_item_price",
+                lambda: InventoryService.update_item_price(middle, 9.99), repeat=repeat),
+        measure("InventoryService.update_item_quantity", restock, repeat=repeat),
+        measure("InventoryService.delete_item", InventoryService.delete_item, setup=new_item, repeat=repeat),
+        measure("OrderService.add_to_cart", fill_cart, repeat=repeat),
+        measure("OrderService.get_cart", lambda: OrderService.get_cart("user0"), repeat=repeat),
+        measure("OrderService.checkout", lambda _: OrderService.checkout("user0"), setup=fill_cart,
+                repeat=repeat),
+        measure("OrderService.get_orders(user)", lambda: OrderService.get_orders("user0"), repeat=repeat),
+        measure("OrderService.get_orders", OrderService.get_orders, repeat=repeat),
+        measure("OrderService.get_sales_aggregates", OrderService.get_sales_aggregates, repeat=repeat),
+    ]
+    for result in results:
+        result["size"] = size
+    return results
+
+def run_worker(size: int, seed: int, repeat: int) -> List[Dict]:
+    with tempfile.TemporaryDirectory(prefix="retail-bench-") as directory:
+        env = dict(os.environ, PYTHONPATH=PROJECT_DIR)
+        output = subprocess.run(
+            [sys.executable, "-m", "benchmarks.service_benchmark", "--worker", str(size),
+             "--seed", str(seed), "--repeat", str(repeat)],
+            cwd=directory, env=env, check=True, stdout=subprocess.PIPE, text=True
+        ).stdout
+    return json.loads(output)
+
+def compare(results: List[Dict], baseline_file: str, threshold: float) -> List[str]:
+    with open(baseline_file) as file:
+        baseline = {(r["method"], r["size"]): r for r in json.load(file)["results"]}
+    regressions = []
+    for result in results:
+        before = baseline.get((result["method"], result["size"]))
+        if before and before["mean_seconds"] > 0:
+            ratio = result["mean_seconds"] / before["mean_seconds"]
+            if ratio > threshold:
+                regressions.append(
+                    f"{result['method']} at {result['size']}: {before['mean_seconds'] * 1000:.3f} ms -> "
+                    f"{result['mean_seconds'] * 1000:.3f} ms ({ratio:.2f}x)"
+                )
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10000, 100000])
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--repeat", type=int, default=20, help="timed calls per method after the first")
+    parser.add_argument("--output", default=os.path.join(PROJECT_DIR, "benchmarks", "results.json"))
+    parser.add_argument("--compare", help="earlier results file to check for regressions")
+    parser.add_argument("--threshold", type=float, default=1.25, help="mean time ratio counted as a regression")
+    parser.add_argument("--worker", type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker is not None:
+        json.dump(run_size(args.worker, args.seed, args.repeat), sys.stdout)
+        return
+
+    from src import config
+
+    results = []
+    print(f"{'method':<40} {'size':>9} {'cold (ms)':>11} {'mean (ms)':>11} {'peak KiB':>10}")
+    for size in args.sizes:
+        for result in run_worker(size, args.seed, args.repeat):
+            results.append(result)
+            print(f"{result['method']:<40} {size:>9} {result['cold_seconds'] * 1000:>11.3f} "
+                  f"{result['mean_seconds'] * 1000:>11.3f} {result['peak_bytes'] / 1024:>10.1f}")
+
+    with open(args.output, "w") as file:
+        json.dump({
+            "meta": {
+                "timestamp": datetime.now().isoformat(),
+                "python": platform.python_version(),
+                "platform": platform.platform(),
+                "storage_backend": config.STORAGE_BACKEND,
+                "inventory_engine": config.INVENTORY_ENGINE,
+                "file_format": config.FILE_FORMAT,
+                "seed": args.seed,
+                "repeat": args.repeat
+            },
+            "results": results
+        }, file, indent=4)
+    print(f"\nResults written to {args.output}")
+
+    if args.compare:
+        regressions = compare(results, args.compare, args.threshold)
+        if regressions:
+            print(f"\nSlower than {args.compare} by more than {args.threshold}x:")
+            for regression in regressions:
+                print(f"- {regression}")
+            sys.exit(1)
+        print(f"\nNo regressions against {args.compare}")
+
+if __name__ == "__main__":
+    main()
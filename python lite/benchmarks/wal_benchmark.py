@@ -0,0 +1,115 @@
+"""
+Cost of one change with and without the write-ahead log (RETAIL_WAL), and how
+long startup recovery takes as the log grows.
+
+Run from the project directory:
+    python -m benchmarks.wal_benchmark [--sizes 1000 10000 100000] [--log-lengths 1000 10000 100000]
+
+Changes: for each catalog size, InventoryService.update_item_price and a
+one-line checkout are timed on the plain JSON backend, which rewrites the
+files it changes, and on the WAL backend, which appends one log line.
+
+Recovery: N price changes are made with automatic compaction disabled, then a
+fresh process times FileHandler.recover(), which initialize_system runs at
+startup, against the resulting log.
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Callable, Dict
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def timed(function: Callable, repeat: int) -> float:
+    """Mean seconds per call"""
+    start = time.perf_counter()
+    for _ in range(repeat):
+        function()
+    return (time.perf_counter() - start) / repeat
+
+def run_changes(size: int, repeat: int) -> Dict[str, float]:
+    from benchmarks.generate_data import generate
+    from src.models.user import User, UserRole, UserStatus
+    from src.services.inventory_service import InventoryService
+    from src.services.order_service import OrderService
+
+    generate(users=10, items=size, orders=size // 10, carts=0)
+    customer = User("user0", "password", UserRole.CUSTOMER, UserStatus.APPROVED)
+    prices = iter(range(10 ** 9))
+
+    def checkout():
+        OrderService.add_to_cart(customer, "sku0", 1)
+        OrderService.checkout(customer.username)
+
+    InventoryService.update_item_quantity("sku0", repeat * 2)
+    return {
+        "update_item_price": timed(lambda: InventoryService.update_item_price(f"sku{size // 2}", next(prices)), repeat),
+        "checkout": timed(checkout, repeat)
+    }
+
+def run_recovery(transactions: int) -> Dict[str, float]:
+    from benchmarks.generate_data import generate
+    from src.services.inventory_service import InventoryService
+
+    generate(users=10, items=1000, orders=0, carts=0)
+    for i in range(transactions):
+        InventoryService.update_item_price(f"sku{i % 1000}", i % 500 + 1)
+
+    # Recover in a process of its own, as at startup
+    code = "import json; from src.utils.file_handler import FileHandler; print(json.dumps(FileHandler.recover()))"
+    env = dict(os.environ, PYTHONPATH=PROJECT_DIR)
+    start = time.perf_counter()
+    output = subprocess.run([sys.executable, "-c", code], env=env, check=True,
+                            stdout=subprocess.PIPE, text=True).stdout
+    stats = json.loads(output)
+    stats["process_seconds"] = time.perf_counter() - start
+    return stats
+
+def run_worker(mode: str, value: int, repeat: int, wal: bool) -> Dict:
+    with tempfile.TemporaryDirectory(prefix="retail-wal-") as directory:
+        env = dict(os.environ, PYTHONPATH=PROJECT_DIR, RETAIL_STORAGE_BACKEND="json",
+                   RETAIL_WAL="1" if wal else "", RETAIL_WAL_COMPACT_BYTES="0")
+        output = subprocess.run(
+            [sys.executable, "-m", "benchmarks.wal_benchmark", f"--{mode}", str(value), "--repeat", str(repeat)],
+            cwd=directory, env=env, check=True, stdout=subprocess.PIPE, text=True
+        ).stdout
+    return json.loads(output)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--log-lengths", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--repeat", type=int, default=50)
+    parser.add_argument("--changes", type=int, help=argparse.SUPPRESS)
+    parser.add_argument("--recovery", type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.changes is not None:
+        os.makedirs("data")
+        json.dump(run_changes(args.changes, args.repeat), sys.stdout)
+        return
+    if args.recovery is not None:
+        os.makedirs("data")
+        json.dump(run_recovery(args.recovery), sys.stdout)
+        return
+
+    print(f"{'change':<18} {'items':>8} {'json (ms)':>10} {'wal (ms)':>9} {'speedup':>8}")
+    for size in args.sizes:
+        plain = run_worker("changes", size, args.repeat, wal=False)
+        logged = run_worker("changes", size, args.repeat, wal=True)
+        for name in plain:
+            print(f"{name:<18} {size:>8} {plain[name] * 1000:>10.3f} {logged[name] * 1000:>9.3f} "
+                  f"{plain[name] / logged[name]:>7.1f}x")
+
+    print(f"\n{'transactions':>12} {'log (KiB)':>10} {'recover (ms)':>13} {'process (ms)':>13}")
+    for length in args.log_lengths:
+        stats = run_worker("recovery", length, args.repeat, wal=True)
+        print(f"{stats['transactions']:>12} {stats['log_bytes'] / 1024:>10.1f} {stats['seconds'] * 1000:>13.1f} "
+              f"{stats['process_seconds'] * 1000:>13.1f}")
+
+if __name__ == "__main__":
+    main()
@@ -3,26 +3,60 @@ from src.models.item import Item
 from src.services.auth_service import AuthService
 from src.services.inventory_service import InventoryService
 from src.services.order_service import OrderService
+from src.services.analytics_service import AnalyticsService
+from src.services.inventory_transfer import InventoryTransfer
+from src.repositories.cart_repository import CartRepository
+from src.repositories.inventory_repository import InventoryRepository
+from src.repositories.order_repository import OrderRepository
+from src.repositories.sales_repository import SalesRepository
+from src.utils.file_handler import FileHandler
+from src.utils.instrumentation import Instrumentation
+from src import config
+import argparse
+import glob
 import os
-import json
+import sys
+
+DATA_FILES = [
+    "data/users.txt",
+    "data/inventory.txt",
+    "data/cart.txt",
+    "data/orders.txt"
+]
+
+# Rows shown per page by the item and order listings
+PAGE_SIZE = 20
 
 def initialize_system():
     """Create necessary directories and files if they don't exist"""
     # Create data directory
     os.makedirs("data", exist_ok=True)
     
-    # Initialize empty files with valid JSON
-    files = [
-        "data/users.txt",
-        "data/inventory.txt",
-        "data/cart.txt",
-        "data/orders.txt"
-    ]
-    
-    for file_path in files:
-        if not os.path.exists(file_path):
-            with open(file_path, 'w') as f:
-                json.dump([], f)
+    # Create any missing data files (or tables) in the configured storage backend
+    FileHandler.initialize(DATA_FILES)
+
+    recover_storage()
+
+    # One-time split of the old shared cart file into per-user carts
+    CartRepository.import_legacy(OrderService.CART_FILE)
+
+    # Sales aggregates are built from the order history the first time
+    SalesRepository.ensure(OrderService.ORDERS_FILE)
+
+    # Orders placed before order IDs are numbered and indexed the first time
+    OrderRepository.ensure()
+
+    if config.INSTRUMENTATION:
+        Instrumentation.enable()
+
+def recover_storage():
+    """Bring the data files up to date after the last run, however it ended"""
+    # Replay the write-ahead log (RETAIL_WAL)
+    FileHandler.recover()
+
+    # Items kept in the mmap inventory store go back to the data file once the engine is turned off
+    if config.INVENTORY_ENGINE != "mmap":
+        InventoryRepository.export_store()
 
 def clear_screen():
     os.system('cls' if os.name == 'nt' else 'clear')
@@ -127,7 +161,7 @@ def customer_menu(user: User):
     while True:
         clear_screen()
         print(f"=== Customer Menu - {user.username} ===")
-        options = ["View Items", "Add to Cart", "View Cart", "Checkout", "View Orders"]
+        options = ["View Items", "Add to Cart", "View Cart", "Checkout", "View Orders", "Search Items"]
         print_menu(options)
         
         choice = input("Enter your choice: ")
@@ -142,6 +176,8 @@ def customer_menu(user: User):
             checkout(user)
         elif choice == "5":
             view_orders(user)
+        elif choice == "6":
+            search_items(user)
         elif choice == "0":
             break
         else:
@@ -151,7 +187,7 @@ def admin_menu(user: User):
     while True:
         clear_screen()
         print(f"=== Admin Menu - {user.username} ===")
-        options = ["Approve/Ban Users", "Generate Reports", "View All Orders"]
+        options = ["Approve/Ban Users", "Generate Reports", "View All Orders", "Update Order Status"]
         print_menu(options)
         
         choice = input("Enter your choice: ")
@@ -162,6 +198,11 @@ def admin_menu(user: User):
             generate_reports()
         elif choice == "3":
             view_all_orders()
+        elif choice == "4":
+            update_order_status()
+        elif choice == "99":
+            # Not listed in the menu
+            instrumentation_menu()
         elif choice == "0":
             break
         else:
@@ -171,7 +212,8 @@ def inventory_menu(user: User):
     while True:
         clear_screen()
         print(f"=== Inventory Menu - {user.username} ===")
-        options = ["Add Item", "Update Price", "Update Stock", "Delete Item", "View Items", "Generate Reports"]
+        options = ["Add Item", "Update Price", "Update Stock", "Delete Item", "View Items", "Generate Reports",
+                   "Set Reorder Point", "Import Items (CSV/JSONL)", "Export Items (CSV/JSONL)", "Stock Take"]
         print_menu(options)
         
         choice = input("Enter your choice: ")
@@ -188,6 +230,14 @@ def inventory_menu(user: User):
             view_items()
         elif choice == "6":
             generate_reports()
+        elif choice == "7":
+            update_reorder_point()
+        elif choice == "8":
+            import_items()
+        elif choice == "9":
+            export_items()
+        elif choice == "10":
+            stock_take()
         elif choice == "0":
             break
         else:
@@ -197,7 +247,7 @@ def manager_menu(user: User):
     while True:
         clear_screen()
         print(f"=== Manager Menu - {user.username} ===")
-        options = ["Approve/Ban Users", "Generate Reports", "View All Orders"]
+        options = ["Approve/Ban Users", "Generate Reports", "View All Orders", "Update Order Status"]
         print_menu(options)
         
         choice = input("Enter your choice: ")
@@ -208,24 +258,59 @@ def manager_menu(user: User):
             generate_reports()
         elif choice == "3":
             view_all_orders()
+        elif choice == "4":
+            update_order_status()
+        elif choice == "99":
+            # Not listed in the menu
+            instrumentation_menu()
         elif choice == "0":
             break
         else:
             input("Invalid choice. Press Enter to continue...")
 
+def page_through(title, fetch, show, empty_message):
+    """
+    Show the pages returned by fetch(cursor) -> (rows, next cursor) one at a
+    time, letting the user move forwards and back
+    """
+    # Cursors of the pages shown so far; the first page has none
+    cursors = [None]
+    while True:
+        clear_screen()
+        print(f"=== {title} ===")
+        rows, next_cursor = fetch(cursors[-1])
+        if not rows and len(cursors) == 1:
+            input(f"{empty_message} Press Enter to continue...")
+            return
+        show(rows)
+
+        options = []
+        if next_cursor:
+            options.append("n = next page")
+        if len(cursors) > 1:
+            options.append("p = previous page")
+        prompt = f"\nPage {len(cursors)}. " + (", ".join(options) + ", " if options else "")
+        choice = input(prompt + "Enter to continue: ").strip().lower()
+        if choice == "n" and next_cursor:
+            cursors.append(next_cursor)
+        elif choice == "p" and len(cursors) > 1:
+            cursors.pop()
+        else:
+            return
+
 def view_items():
-    clear_screen()
-    print("=== Available Items ===")
-    items = InventoryService.get_all_items()
-    if not items:
-        input("No items available. Press Enter to continue...")
-        return
-    
-    print("\nID | Name | Price | Quantity")
-    print("-" * 40)
-    for item in items:
-        print(f"{item.item_id} | {item.name} | ${item.price:.2f} | {item.quantity}")
-    input("\nPress Enter to continue...")
+    def show(items):
+        print("\nID | Name | Price | Quantity")
+        print("-" * 40)
+        for item in items:
+            print(f"{item.item_id} | {item.name} | ${item.price:.2f} | {item.quantity}")
+
+    page_through(
+        "Available Items",
+        lambda cursor: InventoryService.get_items_page(PAGE_SIZE, cursor),
+        show,
+        "No items available."
+    )
 
 def add_to_cart(user: User):
     view_items()
@@ -239,6 +324,44 @@ def add_to_cart(user: User):
     success, message = OrderService.add_to_cart(user, item_id, quantity)
     input(f"{message}\nPress Enter to continue...")
 
+def search_items(user: User):
+    clear_screen()
+    print("=== Search Items ===")
+    query = input("Search for: ").strip()
+    if not query:
+        return
+    max_price = input("Maximum price (Enter for any): ").strip()
+    try:
+        max_price = float(max_price) if max_price else None
+    except ValueError:
+        input("Invalid price. Press Enter to continue...")
+        return
+
+    items = InventoryService.search_items(query, limit=PAGE_SIZE, max_price=max_price, in_stock_only=True)
+    if not items:
+        input("No matching items in stock. Press Enter to continue...")
+        return
+
+    print("\n# | ID | Name | Price | Quantity")
+    print("-" * 40)
+    for idx, item in enumerate(items, 1):
+        print(f"{idx}. {item.item_id} | {item.name} | ${item.price:.2f} | {item.quantity}")
+
+    choice = input("\nEnter a number to add that item to your cart (Enter to go back): ").strip()
+    if not choice:
+        return
+    try:
+        idx = int(choice) - 1
+        if not 0 <= idx < len(items):
+            raise ValueError
+        quantity = int(input("Enter quantity: "))
+    except ValueError:
+        input("Invalid choice. Press Enter to continue...")
+        return
+
+    success, message = OrderService.add_to_cart(user, items[idx].item_id, quantity)
+    input(f"{message}\nPress Enter to continue...")
+
 def view_cart(user: User):
     clear_screen()
     print("=== Your Cart ===")
@@ -248,15 +371,12 @@ def view_cart(user: User):
         input("Cart is empty. Press Enter to continue...")
         return
     
-    total = 0
+    # Priced the same way checkout charges, from one inventory read
+    lines, total = OrderService.price_cart(cart_items)
     print("\nItem | Quantity | Price | Subtotal")
     print("-" * 40)
-    for cart_item in cart_items:
-        item = InventoryService.get_item(cart_item["item_id"])
-        if item:
-            subtotal = item.price * cart_item["quantity"]
-            total += subtotal
-            print(f"{item.name} | {cart_item['quantity']} | ${item.price:.2f} | ${subtotal:.2f}")
+    for line in lines:
+        print(f"{line['name']} | {line['quantity']} | ${line['price']:.2f} | ${line['subtotal']:.2f}")
     
     print(f"\nTotal: ${total:.2f}")
     input("\nPress Enter to continue...")
@@ -266,42 +386,88 @@ def checkout(user: User):
     input(f"{message}\nPress Enter to continue...")
 
 def view_orders(user: User):
-    clear_screen()
-    print("=== Your Orders ===")
-    orders = OrderService.get_orders(user.username)
-    
-    if not orders:
-        input("No orders found. Press Enter to continue...")
-        return
-    
-    for order in orders:
-        print(f"\nOrder Date: {order['timestamp']}")
-        print(f"Status: {order['status']}")
-        print(f"Total: ${order['total']:.2f}")
-        print("Items:")
-        for item in order['items']:
-            print(f"- {item['item_id']}: {item['quantity']} units")
-        print("-" * 40)
-    
-    input("\nPress Enter to continue...")
+    def show(orders):
+        for order in orders:
+            print(f"\nOrder #{order['order_id']}")
+            print(f"Order Date: {order['timestamp']}")
+            print(f"Status: {order['status']}")
+            print(f"Total: ${order['total']:.2f}")
+            print("Items:")
+            for item in order['items']:
+                print(f"- {item['item_id']}: {item['quantity']} units")
+            print("-" * 40)
+
+    page_through(
+        "Your Orders (newest first)",
+        lambda cursor: OrderService.get_orders_page(user.username, PAGE_SIZE, cursor),
+        show,
+        "No orders found."
+    )
 
 def view_all_orders():
+    def show(orders):
+        for order in orders:
+            print(f"\nOrder #{order['order_id']}")
+            print(f"User: {order['username']}")
+            print(f"Order Date: {order['timestamp']}")
+            print(f"Status: {order['status']}")
+            print(f"Total: ${order['total']:.2f}")
+            print("-" * 40)
+
+    page_through(
+        "All Orders (newest first)",
+        lambda cursor: OrderService.get_orders_page(page_size=PAGE_SIZE, cursor=cursor),
+        show,
+        "No orders found."
+    )
+
+def update_order_status():
     clear_screen()
-    print("=== All Orders ===")
-    orders = OrderService.get_orders()
-    
-    if not orders:
-        input("No orders found. Press Enter to continue...")
+    print("=== Update Order Status ===")
+    try:
+        order_id = int(input("Enter order ID: "))
+    except ValueError:
+        input("Invalid order ID. Press Enter to continue...")
         return
-    
-    for order in orders:
-        print(f"\nUser: {order['username']}")
-        print(f"Order Date: {order['timestamp']}")
-        print(f"Status: {order['status']}")
-        print(f"Total: ${order['total']:.2f}")
-        print("-" * 40)
-    
-    input("\nPress Enter to continue...")
+
+    order = OrderService.get_order(order_id)
+    if not order:
+        input("Order not found. Press Enter to continue...")
+        return
+    print(f"\nUser: {order['username']}")
+    print(f"Order Date: {order['timestamp']}")
+    print(f"Total: ${order['total']:.2f}")
+    print(f"Status: {order['status']}\n")
+
+    for idx, status in enumerate(OrderService.ORDER_STATUSES, 1):
+        print(f"{idx}. {status.title()}")
+    try:
+        idx = int(input("Enter new status: ")) - 1
+        if not 0 <= idx < len(OrderService.ORDER_STATUSES):
+            raise ValueError
+    except ValueError:
+        input("Invalid choice. Press Enter to continue...")
+        return
+
+    success, message = OrderService.update_order_status(order_id, OrderService.ORDER_STATUSES[idx])
+    input(f"{message}\nPress Enter to continue...")
+
+def parse_selection(text, count):
+    """
+    Indexes (0-based) of the rows picked by text, e.g. "3", "1,4-6" or "all"
+    out of count numbered from 1. Raises ValueError if it is not a valid pick.
+    """
+    text = text.strip().lower()
+    if text == "all":
+        return list(range(count))
+    picked = []
+    for part in text.split(","):
+        first, _, last = part.strip().partition("-")
+        start, end = int(first), int(last or first)
+        if not 1 <= start <= end <= count:
+            raise ValueError(f"No rows {part.strip()}")
+        picked.extend(index for index in range(start - 1, end) if index not in picked)
+    return picked
 
 def manage_users(actor: User):
     while True:
@@ -319,69 +485,148 @@ def manage_users(actor: User):
             print(f"{idx}. {user['username']} | {user['role']} | {user['status']}")
         print("\n0. Back")
         
+        choice = input("\nSelect users, e.g. 3, 1,4-6 or all (0 to go back): ")
+        if choice.strip() == "0":
+            break
         try:
-            choice = int(input("\nSelect user number (0 to go back): "))
-            if choice == 0:
-                break
-            if choice < 1 or choice > len(users):
-                raise ValueError()
-            
-            selected_user = users[choice - 1]
-            print(f"\nSelected user: {selected_user['username']}")
-            print("1. Approve")
-            print("2. Ban")
-            print("0. Cancel")
-            
-            action = input("Choose action (0-2): ")
-            
-            if action == "1":
-                success, message = AuthService.update_user_status(
-                    selected_user['username'], 
-                    UserStatus.APPROVED, 
-                    actor
-                )
-            elif action == "2":
-                success, message = AuthService.update_user_status(
-                    selected_user['username'], 
-                    UserStatus.BANNED, 
-                    actor
-                )
-            elif action == "0":
-                continue
-            else:
-                message = "Invalid action"
-            
-            input(f"{message}\nPress Enter to continue...")
-            
+            selected = [users[index]['username'] for index in parse_selection(choice, len(users))]
         except ValueError:
             input("Invalid selection. Press Enter to continue...")
             continue
 
+        print(f"\nSelected {len(selected)} users: {', '.join(selected)}")
+        print("1. Approve")
+        print("2. Ban")
+        print("0. Cancel")
+
+        action = input("Choose action (0-2): ")
+        if action == "1":
+            new_status = UserStatus.APPROVED
+        elif action == "2":
+            new_status = UserStatus.BANNED
+        elif action == "0":
+            continue
+        else:
+            input("Invalid action\nPress Enter to continue...")
+            continue
+
+        # One write for the whole selection
+        results = AuthService.update_user_statuses({username: new_status for username in selected}, actor)
+        for username, (success, message) in results.items():
+            print(f"- {username}: {message}")
+        input("\nPress Enter to continue...")
+
 def generate_reports():
     clear_screen()
     print("=== Reports ===")
     print("\n1. Sales Report")
     print("2. Inventory Report")
-    report_type = input("Choose report type (1-2): ")
+    print("3. Top Sellers")
+    print("4. Revenue by Item and Day")
+    print("5. Sell-through and Days of Cover")
+    report_type = input("Choose report type (1-5): ")
     
     if report_type == "1":
-        orders = OrderService.get_orders()
-        total_sales = sum(order['total'] for order in orders)
-        print(f"\nTotal Sales: ${total_sales:.2f}")
-        print(f"Total Orders: {len(orders)}")
+        sales = OrderService.get_sales_aggregates()
+        print(f"\nTotal Sales: ${sales['total_sales']:.2f}")
+        print(f"Total Orders: {sales['order_count']}")
+
+        items = sorted(sales["items"].items(), key=lambda entry: (-entry[1]["revenue"], entry[0]))
+        print(f"\nSales by Item (top {min(PAGE_SIZE, len(items))} of {len(items)} by revenue):")
+        for item_id, totals in items[:PAGE_SIZE]:
+            print(f"- {item_id}: {totals['units']} units, ${totals['revenue']:.2f}")
+
+        days = sorted(sales["days"].items())
+        print(f"\nSales by Day (last {min(PAGE_SIZE, len(days))} of {len(days)} days):")
+        for day, totals in days[-PAGE_SIZE:]:
+            print(f"- {day}: {totals['orders']} orders, ${totals['sales']:.2f}")
     elif report_type == "2":
         items = InventoryService.get_all_items()
         total_items = sum(item.quantity for item in items)
         print(f"\nTotal Items in Stock: {total_items}")
-        print("\nLow Stock Items (< 5 units):")
-        for item in items:
-            if item.quantity < 5:
-                print(f"- {item.name}: {item.quantity} units")
+        print("\nLow Stock Items (below reorder point, most critical first):")
+        for item in InventoryService.get_low_stock_items():
+            print(f"- {item.name}: {item.quantity} units (reorder point {item.reorder_point})")
+    elif report_type in ("3", "4", "5"):
+        if not AnalyticsService.available():
+            print("\nThis report requires numpy (pip install numpy)")
+        elif report_type == "3":
+            print("\nItem | Units Sold | Revenue")
+            print("-" * 40)
+            for seller in AnalyticsService.top_sellers():
+                print(f"{seller['item_id']} | {seller['units']} | ${seller['revenue']:.2f}")
+        elif report_type == "4":
+            print("\nRevenue by Item:")
+            for item_id, revenue in sorted(AnalyticsService.revenue_by_item().items()):
+                print(f"- {item_id}: ${revenue:.2f}")
+            print("\nRevenue by Day:")
+            for day in AnalyticsService.revenue_by_day():
+                print(f"- {day['day']}: {day['orders']} orders, ${day['sales']:.2f}")
+        else:
+            print("\nItem | Sold | On Hand | Sell-through | Days of Cover")
+            print("-" * 55)
+            for item in AnalyticsService.stock_health():
+                cover = "-" if item["days_of_cover"] == float("inf") else f"{item['days_of_cover']:.1f}"
+                print(f"{item['item_id']} | {item['units_sold']} | {item['on_hand']} | "
+                      f"{item['sell_through']:.0%} | {cover}")
     else:
         print("Invalid report type")
     
     input("\nPress Enter to continue...")
 
+def instrumentation_menu():
+    while True:
+        clear_screen()
+        print("=== Instrumentation ===")
+        print(f"Status: {'recording' if Instrumentation.enabled() else 'off'}")
+
+        snapshot = Instrumentation.snapshot()
+        calls = sorted(snapshot["calls"], key=lambda call: call["total_seconds"], reverse=True)
+        if calls:
+            print("\nMethod | File | Calls | Mean (ms) | p99 (ms) | Total (s)")
+            print("-" * 70)
+            for call in calls[:20]:
+                print(f"{call['method']} | {call['file'] or '-'} | {call['count']} | "
+                      f"{call['mean_seconds'] * 1000:.3f} | {call['p99_seconds'] * 1000:.3f} | "
+                      f"{call['total_seconds']:.3f}")
+        io = snapshot["io"]
+        if io:
+            print(f"\nRead: {int(io.get('bytes_read', 0))} bytes in {int(io.get('files_parsed', 0))} parses, "
+                  f"{io.get('parse_seconds', 0):.3f} s parsing")
+            print(f"Written: {int(io.get('bytes_written', 0))} bytes in {int(io.get('files_written', 0))} writes, "
+                  f"{io.get('serialize_seconds', 0):.3f} s encoding")
+        for operation, count in sorted(snapshot["failures"].items()):
+            print(f"Failures: {operation}: {count}")
+        locks = snapshot["locks"]
+        print(f"Locks: {int(locks['acquisitions'])} taken, {int(locks['contended'])} waited for another writer, "
+              f"{locks['total_wait_seconds']:.3f} s waiting (longest {locks['max_wait_seconds'] * 1000:.1f} ms)")
+
+        print()
+        print_menu([
+            "Stop recording" if Instrumentation.enabled() else "Start recording",
+            "Dump as JSON",
+            "Dump in Prometheus format",
+            "Reset"
+        ])
+        choice = input("Enter your choice: ")
+        if choice == "1":
+            if Instrumentation.enabled():
+                Instrumentation.disable()
+            else:
+                Instrumentation.enable()
+        elif choice in ("2", "3"):
+            fmt = "json" if choice == "2" else "prometheus"
+            default = "instrumentation.json" if fmt == "json" else "instrumentation.prom"
+            path = input(f"File to write [{default}]: ").strip() or default
+            Instrumentation.dump(path, fmt)
+            input(f"Written to {path}. Press Enter to continue...")
+        elif choice == "4":
+            Instrumentation.reset()
+        elif choice == "0":
+            break
+        else:
+            input("Invalid choice. Press Enter to continue...")
+
 def add_item():
     clear_screen()
     print("=== Add New Item ===")
@@ -423,6 +668,108 @@ def update_stock():
     success, message = InventoryService.update_item_quantity(item_id, quantity_change)
     input(f"{message}\nPress Enter to continue...")
 
+def stock_take():
+    """Pick items page by page, enter a stock change for each, then apply them all at once"""
+    changes = {}
+    cursors = [None]
+    while True:
+        clear_screen()
+        print("=== Stock Take ===")
+        items, next_cursor = InventoryService.get_items_page(PAGE_SIZE, cursors[-1])
+        if not items and len(cursors) == 1:
+            input("No items available. Press Enter to continue...")
+            return
+        print("\n# | ID | Name | Quantity | Change")
+        print("-" * 40)
+        for idx, item in enumerate(items, 1):
+            change = f"{changes[item.item_id]:+d}" if item.item_id in changes else ""
+            print(f"{idx}. {item.item_id} | {item.name} | {item.quantity} | {change}")
+
+        print(f"\nPage {len(cursors)}. {len(changes)} changes entered.")
+        choice = input("Select items to adjust (e.g. 3, 1,4-6 or all), n/p = next/previous page, "
+                       "s = save changes, 0 = cancel: ").strip().lower()
+        if choice == "0":
+            return
+        if choice == "s":
+            break
+        if choice == "n" and next_cursor:
+            cursors.append(next_cursor)
+            continue
+        if choice == "p" and len(cursors) > 1:
+            cursors.pop()
+            continue
+        try:
+            selected = [items[index] for index in parse_selection(choice, len(items))]
+        except ValueError:
+            input("Invalid selection. Press Enter to continue...")
+            continue
+        for item in selected:
+            try:
+                changes[item.item_id] = int(input(
+                    f"Quantity change for {item.item_id} ({item.name}, {item.quantity} in stock): "
+                ))
+            except ValueError:
+                print("Not a whole number; left unchanged")
+
+    if not changes:
+        return
+    # One write for every change entered
+    results = InventoryService.adjust_quantities(changes)
+    for item_id, (success, message) in results.items():
+        print(f"- {item_id}: {message}")
+    input("\nPress Enter to continue...")
+
+def update_reorder_point():
+    view_items()
+    item_id = input("\nEnter item ID to update: ")
+    try:
+        reorder_point = int(input("Enter reorder point (item is low on stock below this): "))
+    except ValueError:
+        input("Invalid reorder point. Press Enter to continue...")
+        return
+    
+    success, message = InventoryService.update_reorder_point(item_id, reorder_point)
+    input(f"{message}\nPress Enter to continue...")
+
+def print_import_result(success, message, errors, limit=20):
+    print(message)
+    for error in errors[:limit]:
+        print(f"- {error}")
+    if len(errors) > limit:
+        print(f"... and {len(errors) - limit} more")
+
+def import_items():
+    clear_screen()
+    print("=== Import Items ===")
+    print("CSV files need a header row with item_id, name, price, quantity and optionally")
+    print("description and reorder_point; JSON Lines files hold one item object per line.")
+    print("Existing items are updated; empty or missing fields keep their current value.")
+    print("-" * 40)
+    path = input("File to import (or '0' to cancel): ").strip()
+    if path == '0':
+        return
+    strict = input("Import nothing if any row is invalid? (yes/no): ").lower() == 'yes'
+    try:
+        success, message, errors = InventoryTransfer.import_file(path, strict=strict)
+    except (OSError, ValueError) as e:
+        input(f"Import failed: {e}\nPress Enter to continue...")
+        return
+    print_import_result(success, message, errors)
+    input("\nPress Enter to continue...")
+
+def export_items():
+    clear_screen()
+    print("=== Export Items ===")
+    path = input("File to write, ending in .csv or .jsonl (or '0' to cancel): ").strip()
+    if path == '0':
+        return
+    try:
+        count = InventoryTransfer.export_file(path)
+    except (OSError, ValueError) as e:
+        input(f"Export failed: {e}\nPress Enter to continue...")
+        return
+    input(f"Exported {count} items to {path}\nPress Enter to continue...")
+
 def delete_item():
     clear_screen()
     print("=== Delete Item ===")
@@ -443,7 +790,127 @@ def delete_item():
     success, message = InventoryService.delete_item(item_id)
     input(f"{message}\nPress Enter to continue...")
 
+def run_command(argv):
+    parser = argparse.ArgumentParser(prog="main.py", description="Computer Retail System")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    migrate_parser = subparsers.add_parser(
+        "migrate-sqlite", help="Import the data/*.txt files into a SQLite database"
+    )
+    migrate_parser.add_argument("--db", default=config.SQLITE_PATH, help="Database file to create or replace")
+
+    subparsers.add_parser("rebuild-sales", help="Recompute the sales report aggregates from the order history")
+    subparsers.add_parser("check-sales", help="Compare the sales report aggregates with a full recompute")
+    subparsers.add_parser("rebuild-order-index", help="Recompute the order ID index from the order history")
+    subparsers.add_parser("rebuild-cart-index", help="Recompute the index of which carts hold each item")
+    subparsers.add_parser("check-cart-index", help="Compare the cart item index with the customers' carts")
+    import_parser = subparsers.add_parser("import-items", help="Add or update items from a CSV or JSON Lines file")
+    import_parser.add_argument("path")
+    import_parser.add_argument("--format", choices=InventoryTransfer.FORMATS, help="default: from the file extension")
+    import_parser.add_argument("--strict", action="store_true", help="import nothing if any row is invalid")
+
+    export_parser = subparsers.add_parser("export-items", help="Write every item to a CSV or JSON Lines file")
+    export_parser.add_argument("path")
+    export_parser.add_argument("--format", choices=InventoryTransfer.FORMATS, help="default: from the file extension")
+
+    serve_parser = subparsers.add_parser("serve", help="Run the HTTP/JSON API server")
+    serve_parser.add_argument("--host", default="127.0.0.1")
+    serve_parser.add_argument("--port", type=int, default=8080)
+    serve_parser.add_argument("--workers", type=int, default=8, help="Threads running service calls")
+
+    subparsers.add_parser("compact-log", help="Fold the write-ahead log (RETAIL_WAL) into the data files")
+    subparsers.add_parser(
+        "compact-inventory", help="Reclaim space in the mmap inventory files (RETAIL_INVENTORY_ENGINE=mmap)"
+    )
+
+    args = parser.parse_args(argv)
+
+    # The maintenance commands read and rewrite data files that a crashed run may
+    # have left behind the log; the others run the full initialize_system()
+    if args.command not in ("import-items", "export-items", "serve"):
+        recover_storage()
+
+    if args.command == "migrate-sqlite":
+        from src.storage.migrate import import_json_files
+        from src.storage.sqlite_backend import SQLiteBackend
+
+        # The data files only hold what the write-ahead log has been folded into,
+        # and the inventory file not what the mmap inventory store has been given
+        FileHandler.compact_log()
+        InventoryRepository.export_store()
+        cart_files = glob.glob(os.path.join(CartRepository.CART_DIR, "*.txt"))
+        if os.path.exists(CartRepository.INDEX_FILE):
+            cart_files.append(CartRepository.INDEX_FILE)
+        counts = import_json_files(SQLiteBackend(args.db), DATA_FILES + cart_files)
+        for file_path, count in counts.items():
+            print(f"{file_path}: {count} records")
+        print(f"Imported into {args.db}. Set RETAIL_STORAGE_BACKEND=sqlite to use it.")
+    elif args.command == "rebuild-sales":
+        sales = OrderService.rebuild_sales_aggregates()
+        print(f"Rebuilt sales aggregates from {sales['order_count']} orders")
+    elif args.command == "rebuild-order-index":
+        count = OrderService.rebuild_order_index()
+        print(f"Indexed {count} orders")
+    elif args.command == "rebuild-cart-index":
+        count = OrderService.rebuild_cart_index()
+        print(f"Indexed {count} items held in carts")
+    elif args.command == "check-cart-index":
+        differences = OrderService.check_cart_index()
+        if not differences:
+            print("The cart item index matches the carts")
+        else:
+            print("The cart item index differs from the carts:")
+            for difference in differences:
+                print(f"- {difference}")
+            print("Run 'python main.py rebuild-cart-index' to fix it")
+            sys.exit(1)
+    elif args.command == "check-sales":
+        differences = OrderService.check_sales_aggregates()
+        if not differences:
+            print("Sales aggregates match the order history")
+        else:
+            print("Sales aggregates differ from the order history:")
+            for difference in differences:
+                print(f"- {difference}")
+            print("Run 'python main.py rebuild-sales' to fix them")
+            sys.exit(1)
+    elif args.command == "compact-log":
+        files = FileHandler.compact_log()
+        if files is None:
+            print("No write-ahead log is kept; set RETAIL_WAL=1 to use one")
+            sys.exit(1)
+        print(f"Rewrote {len(files)} data files and started an empty log at {config.WAL_PATH}")
+    elif args.command == "compact-inventory":
+        if not InventoryRepository.compact():
+            print("The mmap inventory engine is not enabled; set RETAIL_INVENTORY_ENGINE=mmap")
+            sys.exit(1)
+        print(f"Compacted {config.INVENTORY_MMAP_PATH}.dat and {config.INVENTORY_MMAP_PATH}.heap")
+    elif args.command in ("import-items", "export-items"):
+        initialize_system()
+        try:
+            if args.command == "import-items":
+                success, message, errors = InventoryTransfer.import_file(args.path, args.format, args.strict)
+                print_import_result(success, message, errors, limit=len(errors))
+                if not success:
+                    sys.exit(1)
+            else:
+                count = InventoryTransfer.export_file(args.path, args.format)
+                print(f"Exported {count} items to {args.path}")
+        except (OSError, ValueError) as e:
+            print(f"{args.command} failed: {e}")
+            sys.exit(1)
+    elif args.command == "serve":
+        from src.api.server import RetailServer
+
+        initialize_system()
+        AuthService.register_manager(User("manager", "admin123", UserRole.MANAGER, UserStatus.APPROVED))
+        RetailServer(args.host, args.port, args.workers).run()
+
 if __name__ == "__main__":
+    if len(sys.argv) > 1:
+        run_command(sys.argv[1:])
+        sys.exit(0)
+
     try:
         # Initialize system files and directories
         initialize_system()
@@ -0,0 +1,491 @@
+"""
+HTTP/JSON API over AuthService, InventoryService and OrderService, built on
+asyncio streams from the standard library.
+
+Service calls block on file I/O, so each request's work runs in a bounded
+thread pool: at most `workers` calls run at once and at most `queue_limit`
+more wait for a thread; further requests wait in the event loop. Requests
+that write the same resource (the inventory, one customer's cart, the order
+history, the users) are run one at a time in arrival order instead of
+contending for the file locks from several threads.
+
+Log in with POST /login to get a token, then send it as
+"Authorization: Bearer <token>".
+"""
+import asyncio
+import json
+import re
+import secrets
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import AsyncExitStack
+from functools import partial
+from http import HTTPStatus
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+from urllib.parse import parse_qs, unquote, urlsplit
+
+from ..models.item import Item
+from ..models.user import User, UserRole, UserStatus
+from ..repositories.user_repository import UserRepository
+from ..services.analytics_service import AnalyticsService
+from ..services.auth_service import AuthService
+from ..services.inventory_service import InventoryService
+from ..services.order_service import OrderService
+from ..utils.instrumentation import Instrumentation
+
+MAX_HEADER_BYTES = 64 * 1024
+MAX_BODY_BYTES = 1024 * 1024
+PAGE_SIZE = 20
+MAX_PAGE_SIZE = 100
+
+CUSTOMERS = {UserRole.CUSTOMER}
+USER_ADMINS = {UserRole.ADMIN, UserRole.MANAGER}
+INVENTORY_STAFF = {UserRole.INVENTORY}
+REPORT_READERS = {UserRole.ADMIN, UserRole.MANAGER, UserRole.INVENTORY}
+
+class HTTPError(Exception):
+    def __init__(self, status: HTTPStatus, message: str):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+
+class Request:
+    __slots__ = ("method", "path", "query", "headers", "body", "params", "username")
+
+    def __init__(self, method: str, target: str, headers: Dict[str, str], body: bytes):
+        url = urlsplit(target)
+        self.method = method
+        self.path = unquote(url.path)
+        self.query = {key: values[-1] for key, values in parse_qs(url.query).items()}
+        self.headers = headers
+        self.body = body
+        # Filled in by the router
+        self.params: Dict[str, str] = {}
+        self.username: Optional[str] = None
+
+    def json(self) -> Dict:
+        if not self.body:
+            return {}
+        try:
+            data = json.loads(self.body)
+        except ValueError:
+            raise HTTPError(HTTPStatus.BAD_REQUEST, "Request body is not valid JSON")
+        if not isinstance(data, dict):
+            raise HTTPError(HTTPStatus.BAD_REQUEST, "Request body must be a JSON object")
+        return data
+
+    def token(self) -> Optional[str]:
+        scheme, _, token = self.headers.get("authorization", "").partition(" ")
+        return token.strip() if scheme.lower() == "bearer" else None
+
+class Route:
+    def __init__(self, method: str, pattern: str, handler: Callable, roles: Optional[set],
+                 writes: Callable[[Request], Iterable[str]]):
+        self.method = method
+        # "/items/{item_id}" -> named group matching one path segment
+        self.pattern = re.compile("^" + re.sub(r"\{(\w+)\}", r"(?P<\1>[^/]+)", pattern) + "$")
+        self.handler = handler
+        # None: no login needed; empty set: any logged-in user
+        self.roles = roles
+        self.writes = writes
+
+def _reads(request: Request) -> Iterable[str]:
+    return ()
+
+def _field(data: Dict, name: str, kind: type, required: bool = True):
+    if name not in data:
+        if required:
+            raise HTTPError(HTTPStatus.BAD_REQUEST, f"Missing field: {name}")
+        return None
+    value = data[name]
+    # bool is a subclass of int, so int(True) and float(True) would accept true and false
+    if isinstance(value, bool) or (kind is int and isinstance(value, float) and not value.is_integer()):
+        raise HTTPError(HTTPStatus.BAD_REQUEST, f"Invalid {name}")
+    try:
+        return kind(value)
+    except (TypeError, ValueError):
+        raise HTTPError(HTTPStatus.BAD_REQUEST, f"Invalid {name}")
+
+def _page_args(query: Dict) -> Dict:
+    """The cursor and limit query parameters of a paged listing"""
+    limit = _field(query, "limit", int, required=False)
+    if limit is None:
+        limit = PAGE_SIZE
+    elif not 0 < limit <= MAX_PAGE_SIZE:
+        raise HTTPError(HTTPStatus.BAD_REQUEST, f"limit must be between 1 and {MAX_PAGE_SIZE}")
+    return {"page_size": limit, "cursor": query.get("cursor")}
+
+def _page(rows: List, next_cursor: Optional[str]) -> Tuple[HTTPStatus, Dict]:
+    # Pass next_cursor back as ?cursor= for the following page; null on the last one
+    return HTTPStatus.OK, {"results": rows, "next_cursor": next_cursor}
+
+def _result(success: bool, message: str, **extra: Any) -> Tuple[HTTPStatus, Dict]:
+    status = HTTPStatus.OK if success else HTTPStatus.BAD_REQUEST
+    return status, {"success": success, "message": message, **extra}
+
+class RetailServer:
+    def __init__(self, host: str = "127.0.0.1", port: int = 8080, workers: int = 8,
+                 queue_limit: Optional[int] = None):
+        self.host = host
+        self.port = port
+        self.workers = workers
+        self.queue_limit = workers * 4 if queue_limit is None else queue_limit
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._write_locks: Dict[str, asyncio.Lock] = {}
+        # token -> username
+        self._sessions: Dict[str, str] = {}
+        self._server: Optional[asyncio.AbstractServer] = None
+        self._routes = self._build_routes()
+
+    def _build_routes(self) -> List[Route]:
+        def cart(request: Request) -> List[str]:
+            return [f"cart:{request.username}"]
+
+        def checkout(request: Request) -> List[str]:
+            return ["inventory", f"cart:{request.username}", "orders"]
+
+        def inventory(request: Request) -> List[str]:
+            return ["inventory"]
+
+        def users(request: Request) -> List[str]:
+            return ["users"]
+
+        def orders(request: Request) -> List[str]:
+            return ["orders"]
+
+        return [
+            Route("POST", "/login", self._login, None, _reads),
+            Route("POST", "/register", self._register, None, users),
+            Route("POST", "/logout", self._logout, set(), _reads),
+            Route("GET", "/items", self._list_items, set(), _reads),
+            Route("GET", "/items/{item_id}", self._get_item, set(), _reads),
+            Route("GET", "/search", self._search_items, set(), _reads),
+            Route("POST", "/items", self._add_item, INVENTORY_STAFF, inventory),
+            Route("PATCH", "/items/{item_id}", self._update_item, INVENTORY_STAFF, inventory),
+            Route("DELETE", "/items/{item_id}", self._delete_item, INVENTORY_STAFF, inventory),
+            Route("GET", "/cart", self._get_cart, CUSTOMERS, _reads),
+            Route("POST", "/cart", self._add_to_cart, CUSTOMERS, cart),
+            Route("DELETE", "/cart", self._clear_cart, CUSTOMERS, cart),
+            Route("POST", "/checkout", self._checkout, CUSTOMERS, checkout),
+            Route("GET", "/orders", self._get_orders, CUSTOMERS | USER_ADMINS, _reads),
+            Route("GET", "/orders/{order_id}", self._get_order, CUSTOMERS | USER_ADMINS, _reads),
+            Route("PATCH", "/orders/{order_id}", self._update_order, USER_ADMINS, orders),
+            Route("GET", "/users", self._get_users, USER_ADMINS, _reads),
+            Route("PATCH", "/users/{username}", self._update_user, USER_ADMINS, users),
+            Route("GET", "/reports/sales", self._sales_report, REPORT_READERS, _reads),
+            Route("GET", "/reports/inventory", self._inventory_report, REPORT_READERS, _reads),
+            Route("GET", "/reports/top-sellers", self._top_sellers, REPORT_READERS, _reads),
+            Route("GET", "/reports/revenue", self._revenue, REPORT_READERS, _reads),
+            Route("GET", "/reports/stock-health", self._stock_health, REPORT_READERS, _reads),
+            Route("GET", "/metrics", self._metrics, USER_ADMINS, _reads),
+        ]
+
+    # Serving
+
+    async def start(self) -> None:
+        self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="retail-api")
+        self._slots = asyncio.Semaphore(self.workers + self.queue_limit)
+        self._server = await asyncio.start_server(self._handle_connection, self.host, self.port)
+        # Port 0 picks a free port; report the one actually bound
+        self.port = self._server.sockets[0].getsockname()[1]
+
+    async def stop(self) -> None:
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+
+    async def serve_forever(self) -> None:
+        await self.start()
+        print(f"Serving on http://{self.host}:{self.port} with {self.workers} workers")
+        try:
+            await self._server.serve_forever()
+        finally:
+            await self.stop()
+
+    def run(self) -> None:
+        try:
+            asyncio.run(self.serve_forever())
+        except KeyboardInterrupt:
+            pass
+
+    async def _handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            while True:
+                try:
+                    request = await self._read_request(reader)
+                except HTTPError as error:
+                    await self._respond(writer, error.status, {"success": False, "message": error.message}, False)
+                    break
+                if request is None:
+                    break
+
+                keep_alive = request.headers.get("connection", "").lower() != "close"
+                try:
+                    status, payload = await self._dispatch(request)
+                except HTTPError as error:
+                    status, payload = error.status, {"success": False, "message": error.message}
+                except Exception as error:
+                    status, payload = HTTPStatus.INTERNAL_SERVER_ERROR, {"success": False, "message": str(error)}
+                await self._respond(writer, status, payload, keep_alive)
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    async def _read_request(self, reader: asyncio.StreamReader) -> Optional[Request]:
+        try:
+            head = await reader.readuntil(b"\r\n\r\n")
+        except asyncio.IncompleteReadError as error:
+            if error.partial.strip():
+                raise HTTPError(HTTPStatus.BAD_REQUEST, "Incomplete request")
+            return None
+        except asyncio.LimitOverrunError:
+            raise HTTPError(HTTPStatus.REQUEST_HEADER_FIELDS_TOO_LARGE, "Request headers too large")
+        if len(head) > MAX_HEADER_BYTES:
+            raise HTTPError(HTTPStatus.REQUEST_HEADER_FIELDS_TOO_LARGE, "Request headers too large")
+
+        lines = head.decode("latin-1").split("\r\n")
+        try:
+            method, target, _ = lines[0].split(" ", 2)
+        except ValueError:
+            raise HTTPError(HTTPStatus.BAD_REQUEST, "Malformed request line")
+        headers = {}
+        for line in lines[1:]:
+            if line:
+                name, _, value = line.partition(":")
+                headers[name.strip().lower()] = value.strip()
+
+        try:
+            length = int(headers.get("content-length", 0))
+        except ValueError:
+            raise HTTPError(HTTPStatus.BAD_REQUEST, "Invalid Content-Length")
+        if length > MAX_BODY_BYTES:
+            raise HTTPError(HTTPStatus.REQUEST_ENTITY_TOO_LARGE, "Request body too large")
+        body = await reader.readexactly(length) if length else b""
+        return Request(method.upper(), target, headers, body)
+
+    @staticmethod
+    async def _respond(writer: asyncio.StreamWriter, status: HTTPStatus, payload: Any, keep_alive: bool) -> None:
+        # Handlers return text only for formats that are not JSON
+        if isinstance(payload, str):
+            body, content_type = payload.encode(), "text/plain; version=0.0.4"
+        else:
+            body, content_type = json.dumps(payload).encode(), "application/json"
+        head = (
+            f"HTTP/1.1 {status.value} {status.phrase}\r\n"
+            f"Content-Type: {content_type}\r\n"
+            f"Content-Length: {len(body)}\r\n"
+            f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n"
+        )
+        writer.write(head.encode("latin-1") + body)
+        await writer.drain()
+
+    # Dispatch
+
+    def _match(self, request: Request) -> Route:
+        allowed = False
+        for route in self._routes:
+            match = route.pattern.match(request.path)
+            if match:
+                if route.method == request.method:
+                    request.params = match.groupdict()
+                    return route
+                allowed = True
+        if allowed:
+            raise HTTPError(HTTPStatus.METHOD_NOT_ALLOWED, "Method not allowed")
+        raise HTTPError(HTTPStatus.NOT_FOUND, "Not found")
+
+    async def _dispatch(self, request: Request) -> Tuple[HTTPStatus, Any]:
+        route = self._match(request)
+        if route.roles is not None:
+            request.username = self._sessions.get(request.token())
+            if request.username is None:
+                raise HTTPError(HTTPStatus.UNAUTHORIZED, "Login required")
+
+        async with AsyncExitStack() as stack:
+            # Sorted, so requests writing overlapping resources cannot deadlock
+            for resource in sorted(set(route.writes(request))):
+                await stack.enter_async_context(self._write_locks.setdefault(resource, asyncio.Lock()))
+            async with self._slots:
+                loop = asyncio.get_running_loop()
+                return await loop.run_in_executor(self._executor, partial(self._run, route, request))
+
+    def _run(self, route: Route, request: Request) -> Tuple[HTTPStatus, Any]:
+        # Runs on a worker thread
+        if route.roles is None:
+            return route.handler(request, None)
+
+        # Checked on every request so bans and role changes apply to open sessions
+        user_data = UserRepository.get(request.username)
+        user = User.from_dict(user_data) if user_data else None
+        if user is None or (user.role != UserRole.MANAGER and user.status != UserStatus.APPROVED):
+            self._sessions.pop(request.token(), None)
+            raise HTTPError(HTTPStatus.UNAUTHORIZED, "Login required")
+        if route.roles and user.role not in route.roles:
+            raise HTTPError(HTTPStatus.FORBIDDEN, "Not allowed for your role")
+        return route.handler(request, user)
+
+    # Handlers, called on worker threads
+
+    def _login(self, request: Request, user: None) -> Tuple[HTTPStatus, Dict]:
+        data = request.json()
+        success, message, user = AuthService.login(
+            _field(data, "username", str), _field(data, "password", str)
+        )
+        if not success:
+            return HTTPStatus.UNAUTHORIZED, {"success": False, "message": message}
+        token = secrets.token_urlsafe(24)
+        self._sessions[token] = user.username
+        return _result(True, message, token=token, username=user.username, role=user.role.value)
+
+    def _register(self, request: Request, user: None) -> Tuple[HTTPStatus, Dict]:
+        data = request.json()
+        return _result(*AuthService.register(
+            _field(data, "username", str), _field(data, "password", str), _field(data, "role", str)
+        ))
+
+    def _logout(self, request: Request, user: User) -> Tuple[HTTPStatus, Dict]:
+        self._sessions.pop(request.token(), None)
+        return _result(True, "Logged out")
+
+    def _list_items(self, request: Request, user: User) -> Tuple[HTTPStatus, Dict]:
+        try:
+            items, next_cursor = InventoryService.get_items_page(**_page_args(request.query))
+        except ValueError as e:
+            raise HTTPError(HTTPStatus.BAD_REQUEST, str(e))
+        return _page([item.to_dict() for item in items], next_cursor)
+
+    def _search_items(self, request: Request, user: User) -> Tuple[HTTPStatus, List[Dict]]:
+        query = request.query
+        items = InventoryService.search_items(
+            _field(query, "q", str),
+            limit=_field(query, "limit", int, required=False) or 20,
+            min_price=_field(query, "min_price", float, required=False),
+            max_price=_field(query, "max_price", float, required=False),
+            in_stock_only=query.get("in_stock") in ("1", "true")
+        )
+        return HTTPStatus.OK, [item.to_dict() for item in items]
+
+    def _get_item(self, request: Request, user: User) -> Tuple[HTTPStatus, Dict]:
+        item = InventoryService.get_item(request.params["item_id"])
+        if not item:
+            raise HTTPError(HTTPStatus.NOT_FOUND, "Item not found")
+        return HTTPStatus.OK, item.to_dict()
+
+    def _add_item(self, request: Request, user: User) -> Tuple[HTTPStatus, Dict]:
+        data = request.json()
+        item = Item(
+            _field(data, "item_id", str), _field(data, "name", str), _field(data, "price", float),
+            _field(data, "quantity", int), _field(data, "description", str, required=False) or ""
+        )
+        return _result(*InventoryService.add_item(item))
+
+    def _update_item(self, request: Request, user: User) -> Tuple[HTTPStatus, Dict]:
+        data = request.json()
+        changes = {
+            "price": _field(data, "price", float, required=False),
+            "quantity_change": _field(data, "quantity_change", int, required=False),
+            "reorder_point": _field(data, "reorder_point", int, required=False),
+        }
+        if all(value is None for value in changes.values()):
+            raise HTTPError(HTTPStatus.BAD_REQUEST, "Nothing to update: send price, quantity_change or reorder_point")
+        # All or nothing: one invalid field leaves the item unchanged
+        return _result(*InventoryService.update_item(request.params["item_id"], **changes))
+
+    def _delete_item(self, request: Request, user: User) -> Tuple[HTTPStatus, Dict]:
+        return _result(*InventoryService.delete_item(request.params["item_id"]))
+
+    def _get_cart(self, request: Request, user: User) -> Tuple[HTTPStatus, List[Dict]]:
+        return HTTPStatus.OK, OrderService.get_cart(user.username)
+
+    def _add_to_cart(self, request: Request, user: User) -> Tuple[HTTPStatus, Dict]:
+        data = request.json()
+        return _result(*OrderService.add_to_cart(user, _field(data, "item_id", str), _field(data, "quantity", int)))
+
+    def _clear_cart(self, request: Request, user: User) -> Tuple[HTTPStatus, Dict]:
+        OrderService.clear_cart(user.username)
+        return _result(True, "Cart cleared")
+
+    def _checkout(self, request: Request, user: User) -> Tuple[HTTPStatus, Dict]:
+        return _result(*OrderService.checkout(user.username))
+
+    def _get_orders(self, request: Request, user: User) -> Tuple[HTTPStatus, Dict]:
+        # Customers only ever see their own orders
+        username = user.username if user.role == UserRole.CUSTOMER else request.query.get("username")
+        try:
+            orders, next_cursor = OrderService.get_orders_page(username, **_page_args(request.query))
+        except ValueError as e:
+            raise HTTPError(HTTPStatus.BAD_REQUEST, str(e))
+        return _page(orders, next_cursor)
+
+    def _get_order(self, request: Request, user: User) -> Tuple[HTTPStatus, Dict]:
+        order = OrderService.get_order(_field(request.params, "order_id", int))
+        # Someone else's order is reported as missing to a customer
+        if not order or (user.role == UserRole.CUSTOMER and order["username"] != user.username):
+            raise HTTPError(HTTPStatus.NOT_FOUND, "Order not found")
+        return HTTPStatus.OK, order
+
+    def _update_order(self, request: Request, user: User) -> Tuple[HTTPStatus, Dict]:
+        order_id = _field(request.params, "order_id", int)
+        if not OrderService.get_order(order_id):
+            raise HTTPError(HTTPStatus.NOT_FOUND, "Order not found")
+        return _result(*OrderService.update_order_status(order_id, _field(request.json(), "status", str)))
+
+    def _get_users(self, request: Request, user: User) -> Tuple[HTTPStatus, List[Dict]]:
+        users = AuthService.get_all_users()
+        # Never send passwords over the API
+        return HTTPStatus.OK, [{key: value for key, value in u.items() if key != "password"} for u in users]
+
+    def _update_user(self, request: Request, user: User) -> Tuple[HTTPStatus, Dict]:
+        data = request.json()
+        try:
+            status = UserStatus(_field(data, "status", str))
+        except ValueError:
+            raise HTTPError(HTTPStatus.BAD_REQUEST, "Invalid status")
+        return _result(*AuthService.update_user_status(request.params["username"], status, user))
+
+    def _sales_report(self, request: Request, user: User) -> Tuple[HTTPStatus, Dict]:
+        sales = OrderService.get_sales_aggregates()
+        return HTTPStatus.OK, {"total_sales": sales["total_sales"], "order_count": sales["order_count"]}
+
+    def _inventory_report(self, request: Request, user: User) -> Tuple[HTTPStatus, Dict]:
+        items = InventoryService.get_all_items()
+        return HTTPStatus.OK, {
+            "total_in_stock": sum(item.quantity for item in items),
+            "low_stock": [item.to_dict() for item in InventoryService.get_low_stock_items()]
+        }
+
+    @staticmethod
+    def _require_analytics() -> None:
+        if not AnalyticsService.available():
+            raise HTTPError(HTTPStatus.SERVICE_UNAVAILABLE, "This report requires numpy")
+
+    def _top_sellers(self, request: Request, user: User) -> Tuple[HTTPStatus, List[Dict]]:
+        self._require_analytics()
+        limit = _field(request.query, "limit", int, required=False) or 10
+        return HTTPStatus.OK, AnalyticsService.top_sellers(limit)
+
+    def _revenue(self, request: Request, user: User) -> Tuple[HTTPStatus, Dict]:
+        self._require_analytics()
+        return HTTPStatus.OK, {
+            "by_item": AnalyticsService.revenue_by_item(),
+            "by_day": AnalyticsService.revenue_by_day()
+        }
+
+    def _stock_health(self, request: Request, user: User) -> Tuple[HTTPStatus, List[Dict]]:
+        self._require_analytics()
+        health = AnalyticsService.stock_health()
+        for item in health:
+            # JSON has no infinity; items that never sold have no days of cover
+            if item["days_of_cover"] == float("inf"):
+                item["days_of_cover"] = None
+        return HTTPStatus.OK, health
+
+    def _metrics(self, request: Request, user: User) -> Tuple[HTTPStatus, Any]:
+        if request.query.get("format") == "prometheus":
+            return HTTPStatus.OK, Instrumentation.to_prometheus()
+        return HTTPStatus.OK, Instrumentation.snapshot()
@@ -0,0 +1,33 @@
+import os
+
+# Storage backend used by FileHandler: "json" (the data/*.txt files) or "sqlite"
+STORAGE_BACKEND = os.environ.get("RETAIL_STORAGE_BACKEND", "json")
+
+# Database file used when STORAGE_BACKEND is "sqlite"
+SQLITE_PATH = os.environ.get("RETAIL_SQLITE_PATH", "data/retail.db")
+
+# How the JSON backend serializes data files: "json" (indented), "compact" or "binary".
+# RETAIL_FILE_FORMATS overrides it per file, e.g. "data/inventory.txt=binary,data/users.txt=compact".
+# Files are recognised whatever format they were written in, so this can be changed at any time.
+FILE_FORMAT = os.environ.get("RETAIL_FILE_FORMAT", "json")
+FILE_FORMATS = dict(
+    entry.split("=", 1) for entry in os.environ.get("RETAIL_FILE_FORMATS", "").split(",") if entry
+)
+
+# Inventory storage: "records" keeps items in the storage backend like every other
+# collection; "mmap" uses fixed-width records at INVENTORY_MMAP_PATH(.dat/.heap)
+# so stock and price changes are written in place
+INVENTORY_ENGINE = os.environ.get("RETAIL_INVENTORY_ENGINE", "records")
+INVENTORY_MMAP_PATH = os.environ.get("RETAIL_INVENTORY_MMAP_PATH", "data/inventory")
+
+# Record call timings and file I/O from startup (see src/utils/instrumentation.py).
+# It can also be switched on and off from the admin menu.
+INSTRUMENTATION = os.environ.get("RETAIL_INSTRUMENTATION", "").lower() in ("1", "true", "yes")
+
+# Log every change to the JSON data files in a write-ahead log (WAL_PATH) instead of
+# rewriting them; the files are brought up to date when the log passes
+# WAL_COMPACT_BYTES (0 disables that) or by "python main.py compact-log".
+# Only applies to the json backend: SQLite keeps its own log.
+WAL = os.environ.get("RETAIL_WAL", "").lower() in ("1", "true", "yes")
+WAL_PATH = os.environ.get("RETAIL_WAL_PATH", "data/wal.log")
+WAL_COMPACT_BYTES = int(os.environ.get("RETAIL_WAL_COMPACT_BYTES", 16 * 1024 * 1024))
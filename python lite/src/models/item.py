@@ -1,12 +1,20 @@
-from typing import Dict
+from typing import Dict, Iterable, List
 
 class Item:
-    def __init__(self, item_id: str, name: str, price: float, quantity: int, description: str = ""):
+    # No per-instance __dict__: listings can hold many items at once
+    __slots__ = ("item_id", "name", "price", "quantity", "description", "reorder_point")
+
+    # Stock level below which an item is reported as low on stock
+    DEFAULT_REORDER_POINT = 5
+
+    def __init__(self, item_id: str, name: str, price: float, quantity: int, description: str = "",
+                 reorder_point: int = DEFAULT_REORDER_POINT):
         self.item_id = item_id
         self.name = name
         self.price = price
         self.quantity = quantity
         self.description = description
+        self.reorder_point = reorder_point
 
     def to_dict(self) -> Dict:
         return {
@@ -14,7 +22,8 @@ class Item:
             "name": self.name,
             "price": self.price,
             "quantity": self.quantity,
-            "description": self.description
+            "description": self.description,
+            "reorder_point": self.reorder_point
         }
 
     @classmethod
@@ -24,5 +33,24 @@ class Item:
             name=data["name"],
             price=float(data["price"]),
             quantity=int(data["quantity"]),
-            description=data.get("description", "")
-        ) 
\ No newline at end of file
+            description=data.get("description", ""),
+            reorder_point=int(data.get("reorder_point", cls.DEFAULT_REORDER_POINT))
+        )
+
+    @classmethod
+    def from_records(cls, records: Iterable[Dict]) -> List['Item']:
+        """Decode a whole collection in one pass, skipping per-record __init__ calls"""
+        new = cls.__new__
+        default_reorder_point = cls.DEFAULT_REORDER_POINT
+        items = []
+        append = items.append
+        for data in records:
+            item = new(cls)
+            item.item_id = data["item_id"]
+            item.name = data["name"]
+            item.price = float(data["price"])
+            item.quantity = int(data["quantity"])
+            item.description = data.get("description", "")
+            item.reorder_point = int(data.get("reorder_point", default_reorder_point))
+            append(item)
+        return items 
\ No newline at end of file
@@ -1,5 +1,5 @@
 from enum import Enum
-from typing import List, Dict
+from typing import Iterable, List, Dict
 
 class UserRole(Enum):
     CUSTOMER = "customer"
@@ -12,7 +12,14 @@ class UserStatus(Enum):
     APPROVED = "approved"
     BANNED = "banned"
 
+# Stored value -> member, so decoding reuses the shared members without going
+# through Enum's value lookup for every record
+_ROLES = {role.value: role for role in UserRole}
+_STATUSES = {status.value: status for status in UserStatus}
+
 class User:
+    __slots__ = ("username", "password", "role", "status")
+
     def __init__(self, username: str, password: str, role: UserRole, status: UserStatus = UserStatus.PENDING):
         self.username = username
         self.password = password
@@ -32,6 +39,21 @@ class User:
         return cls(
             username=data["username"],
             password=data["password"],
-            role=UserRole(data["role"]),
-            status=UserStatus(data["status"])
-        ) 
\ No newline at end of file
+            role=_ROLES.get(data["role"]) or UserRole(data["role"]),
+            status=_STATUSES.get(data["status"]) or UserStatus(data["status"])
+        )
+
+    @classmethod
+    def from_records(cls, records: Iterable[Dict]) -> List['User']:
+        """Decode a whole collection in one pass, skipping per-record __init__ calls"""
+        new = cls.__new__
+        users = []
+        append = users.append
+        for data in records:
+            user = new(cls)
+            user.username = data["username"]
+            user.password = data["password"]
+            user.role = _ROLES.get(data["role"]) or UserRole(data["role"])
+            user.status = _STATUSES.get(data["status"]) or UserStatus(data["status"])
+            append(user)
+        return users 
\ No newline at end of file
@@ -0,0 +1,201 @@
+import threading
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Set
+from urllib.parse import quote
+
+from ..utils.file_handler import FileHandler
+
+class CartRepository:
+    """
+    One small collection per customer cart, so reading or changing a cart only
+    touches that customer's lines. INDEX_FILE maps each item_id to the customers
+    holding it in their cart; it only changes when an item enters or leaves a
+    cart, not when a quantity changes.
+    """
+
+    CART_DIR = "data/carts"
+    INDEX_FILE = "data/cart_index.txt"
+
+    # item_id -> usernames, rebuilt only when the index file changes
+    _index: Dict[str, Set[str]] = {}
+    _generation: Optional[int] = None
+    # Held while the index above is loaded, read or changed, always inside any file lock
+    _lock = threading.RLock()
+
+    @classmethod
+    def shard(cls, username: str) -> str:
+        # Quote so any username maps to a single safe file name
+        return f"{cls.CART_DIR}/{quote(username, safe='')}.txt"
+
+    @classmethod
+    def get(cls, username: str) -> List[Dict]:
+        return FileHandler.read_data(cls.shard(username))
+
+    @classmethod
+    def add(cls, username: str, item_id: str, quantity: int) -> None:
+        """Add quantity of item_id, merging with an existing line for the same item"""
+        shard = cls.shard(username)
+        with FileHandler.locked(shard):
+            lines = FileHandler.read_data(shard)
+            for i, line in enumerate(lines):
+                if line["item_id"] == item_id:
+                    lines[i] = {
+                        **line,
+                        "quantity": line["quantity"] + quantity,
+                        "timestamp": datetime.now().isoformat()
+                    }
+                    break
+            else:
+                lines.append({
+                    "username": username,
+                    "item_id": item_id,
+                    "quantity": quantity,
+                    "timestamp": datetime.now().isoformat()
+                })
+            cls.replace(username, lines)
+
+    @classmethod
+    def replace(cls, username: str, lines: List[Dict]) -> None:
+        shard = cls.shard(username)
+        with FileHandler.locked(shard):
+            before = {line["item_id"] for line in FileHandler.read_data(shard)}
+            FileHandler.write_data(shard, lines)
+            after = {line["item_id"] for line in lines}
+            if before != after:
+                cls._update_index(username, before - after, after - before)
+
+    @classmethod
+    def clear(cls, username: str) -> None:
+        cls.replace(username, [])
+
+    @classmethod
+    def _load_index(cls) -> Dict[str, Set[str]]:
+        # The caller holds _lock
+        generation = FileHandler.generation(cls.INDEX_FILE)
+        if generation != cls._generation:
+            cls._index = {
+                entry["item_id"]: set(entry["usernames"]) for entry in FileHandler.read_data(cls.INDEX_FILE)
+            }
+            cls._generation = generation
+        return cls._index
+
+    @classmethod
+    def holders(cls, item_id: str) -> List[str]:
+        """Usernames whose cart currently contains item_id"""
+        with cls._lock:
+            return sorted(cls._load_index().get(item_id, ()))
+
+    @classmethod
+    def lines_for_item(cls, item_id: str) -> Dict[str, Dict]:
+        """username -> cart line for every cart holding item_id, reading only those carts"""
+        result = {}
+        for username in cls.holders(item_id):
+            line = next((l for l in cls.get(username) if l["item_id"] == item_id), None)
+            if line:
+                result[username] = line
+        return result
+
+    @classmethod
+    def remove_item(cls, item_id: str) -> List[str]:
+        """Drop item_id from every cart holding it; returns the usernames whose cart changed"""
+        affected = []
+        for username in cls.holders(item_id):
+            shard = cls.shard(username)
+            with FileHandler.locked(shard):
+                lines = FileHandler.read_data(shard)
+                remaining = [line for line in lines if line["item_id"] != item_id]
+                if len(remaining) != len(lines):
+                    cls.replace(username, remaining)
+                    affected.append(username)
+        return affected
+
+    @classmethod
+    def _update_index(cls, username: str, removed: Iterable[str], added: Iterable[str]) -> None:
+        # Always the innermost lock taken: callers hold the shard lock first
+        with FileHandler.locked(cls.INDEX_FILE), cls._lock:
+            index = cls._load_index()
+            upserts, deletes = [], []
+            for item_id in removed:
+                holders = index.get(item_id)
+                if holders is None or username not in holders:
+                    continue
+                holders.discard(username)
+                if holders:
+                    upserts.append({"item_id": item_id, "usernames": sorted(holders)})
+                else:
+                    del index[item_id]
+                    deletes.append(item_id)
+            for item_id in added:
+                holders = index.setdefault(item_id, set())
+                holders.add(username)
+                upserts.append({"item_id": item_id, "usernames": sorted(holders)})
+            try:
+                # Only the entries of the items that changed are written
+                FileHandler.update_records(cls.INDEX_FILE, "item_id", upserts, deletes)
+            except Exception:
+                cls._generation = None
+                raise
+            cls._generation = FileHandler.generation(cls.INDEX_FILE)
+
+    @classmethod
+    def _index_from_carts(cls, usernames: Iterable[str]) -> Dict[str, Set[str]]:
+        index: Dict[str, Set[str]] = {}
+        for username in usernames:
+            for line in cls.get(username):
+                index.setdefault(line["item_id"], set()).add(username)
+        return index
+
+    @classmethod
+    def rebuild_index(cls, usernames: Iterable[str]) -> int:
+        """Recreate the item index from the given customers' carts. Returns the number of items indexed"""
+        with FileHandler.locked(cls.INDEX_FILE):
+            index = cls._index_from_carts(usernames)
+            FileHandler.write_data(
+                cls.INDEX_FILE,
+                [{"item_id": item_id, "usernames": sorted(holders)} for item_id, holders in index.items()]
+            )
+        return len(index)
+
+    @classmethod
+    def check_index(cls, usernames: Iterable[str]) -> List[str]:
+        """Compare the item index with the given customers' carts; returns the differences found"""
+        with FileHandler.locked(cls.INDEX_FILE):
+            with cls._lock:
+                stored = {item_id: set(holders) for item_id, holders in cls._load_index().items()}
+            expected = cls._index_from_carts(usernames)
+        differences = []
+        for item_id in sorted(set(stored) | set(expected)):
+            listed, held = stored.get(item_id, set()), expected.get(item_id, set())
+            if listed != held:
+                differences.append(
+                    f"{item_id}: index lists {', '.join(sorted(listed)) or 'nobody'}, "
+                    f"carts held by {', '.join(sorted(held)) or 'nobody'}"
+                )
+        return differences
+
+    @classmethod
+    def import_legacy(cls, filename: str) -> int:
+        """
+        Split a single shared cart file into per-user carts, merging repeated
+        items, then empty it. Returns the number of carts written.
+        """
+        with FileHandler.locked(filename):
+            carts: Dict[str, Dict[str, Dict]] = {}
+            for line in FileHandler.iter_data(filename):
+                cart = carts.get(line["username"])
+                if cart is None:
+                    # Merge into whatever the customer already has in their own cart
+                    cart = carts[line["username"]] = {
+                        existing["item_id"]: dict(existing) for existing in cls.get(line["username"])
+                    }
+                if line["item_id"] in cart:
+                    cart[line["item_id"]]["quantity"] += line["quantity"]
+                else:
+                    cart[line["item_id"]] = dict(line)
+
+            for username, lines in carts.items():
+                cls.replace(username, list(lines.values()))
+
+            if carts:
+                FileHandler.write_data(filename, [])
+            return len(carts)
@@ -0,0 +1,231 @@
+import heapq
+import os
+import threading
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+from .. import config
+from ..storage.mmap_inventory import MmapInventoryStore
+from ..utils.file_handler import FileHandler
+from .low_stock_index import LowStockIndex, stock_margin
+from .search_index import SearchIndex
+
+class InventoryRepository:
+    INVENTORY_FILE = "data/inventory.txt"
+
+    # item_id -> record, rebuilt only when the inventory file changes
+    _index: Dict[str, Dict] = {}
+    _generation: Optional[int] = None
+    # Maintained alongside _index
+    _low_stock: LowStockIndex = LowStockIndex()
+    # Built on the first search and then maintained alongside _index
+    _search: Optional[SearchIndex] = None
+    # Sort name -> (generation, sort keys, records in key order), for paging
+    _sorted: Dict[str, Tuple[int, List[Tuple], List[Dict]]] = {}
+    # Open when config.INVENTORY_ENGINE is "mmap"
+    _store: Optional[MmapInventoryStore] = None
+    # Guards the state above, which readers use without the file lock. Writers take
+    # it inside the file lock, and it is never held while waiting for a file lock.
+    _lock = threading.RLock()
+
+    @classmethod
+    def store(cls) -> Optional[MmapInventoryStore]:
+        """The fixed-width inventory store, or None when items are kept in the storage backend"""
+        if config.INVENTORY_ENGINE != "mmap":
+            return None
+        if cls._store is None:
+            with FileHandler.locked(cls.INVENTORY_FILE):
+                is_new = not os.path.exists(config.INVENTORY_MMAP_PATH + ".dat")
+                store = MmapInventoryStore(config.INVENTORY_MMAP_PATH)
+                store.recover()
+                if is_new:
+                    # Start from the items kept so far in the storage backend
+                    store.replace_all(FileHandler.read_data(cls.INVENTORY_FILE))
+            cls._store = store
+        return cls._store
+
+    @classmethod
+    def export_store(cls) -> Optional[int]:
+        """
+        Copy the items in the mmap store to INVENTORY_FILE, which is not written
+        while the store is in use. If the engine has been turned off since, the
+        store's files are then removed, so turning it on again starts from
+        INVENTORY_FILE. Returns the number of items copied, None if there is no store.
+        """
+        with FileHandler.locked(cls.INVENTORY_FILE):
+            store = cls.store()
+            retired = store is None
+            if retired:
+                if not os.path.exists(config.INVENTORY_MMAP_PATH + ".dat"):
+                    return None
+                store = MmapInventoryStore(config.INVENTORY_MMAP_PATH)
+                store.recover()
+            records = store.records()
+            FileHandler.write_data(cls.INVENTORY_FILE, records)
+            if retired:
+                store.close()
+                for path in (store.data_path, store.heap_path, store.journal_path):
+                    if os.path.exists(path):
+                        os.remove(path)
+        return len(records)
+
+    @classmethod
+    def generation(cls) -> int:
+        """Counter that changes whenever the inventory may have changed"""
+        store = cls.store()
+        return store.version() if store else FileHandler.generation(cls.INVENTORY_FILE)
+
+    @classmethod
+    @contextmanager
+    def _current(cls) -> Iterator[Dict[str, Dict]]:
+        """Hold _lock over the item index, brought up to date with the file"""
+        # Opening the store takes the file lock, so it must happen before _lock is held
+        cls.store()
+        with cls._lock:
+            yield cls._load()
+
+    @classmethod
+    def _load(cls) -> Dict[str, Dict]:
+        # The caller holds _lock
+        store = cls.store()
+        generation = cls.generation()
+        if generation != cls._generation:
+            if store:
+                generation, records = store.snapshot()
+            else:
+                records = FileHandler.read_data(cls.INVENTORY_FILE)
+            cls._index = {record["item_id"]: record for record in records}
+            cls._low_stock = LowStockIndex(records)
+            cls._search = None
+            cls._generation = generation
+        return cls._index
+
+    @classmethod
+    def _save(cls, changed: Iterable[Dict] = (), deleted: Iterable[str] = ()) -> None:
+        # Both the mmap store and the storage backend are given only the changed items
+        store = cls.store()
+        try:
+            if store:
+                with store.writing():
+                    for item_id in deleted:
+                        store.delete(item_id)
+                    for record in changed:
+                        store.put(record)
+            else:
+                FileHandler.update_records(cls.INVENTORY_FILE, "item_id", changed, deleted)
+        except Exception:
+            # The index no longer matches the file; rebuild it on next access
+            cls._generation = None
+            raise
+        cls._generation = cls.generation()
+
+    @classmethod
+    def compact(cls) -> bool:
+        """Reclaim space left by deleted items and replaced strings in the mmap store"""
+        store = cls.store()
+        if not store:
+            return False
+        with FileHandler.locked(cls.INVENTORY_FILE), cls._lock:
+            store.compact()
+            cls._generation = None
+        return True
+
+    @classmethod
+    def get(cls, item_id: str) -> Optional[Dict]:
+        with cls._current() as index:
+            return index.get(item_id)
+
+    @classmethod
+    def get_many(cls, item_ids: Iterable[str]) -> Dict[str, Dict]:
+        with cls._current() as index:
+            return {item_id: index[item_id] for item_id in item_ids if item_id in index}
+
+    @classmethod
+    def all(cls) -> List[Dict]:
+        with cls._current() as index:
+            return list(index.values())
+
+    @classmethod
+    def sorted_by(cls, name: str, key: Callable[[Dict], Tuple]) -> Tuple[List[Tuple], List[Dict]]:
+        """Sort keys and records ordered by key, kept under name until the inventory changes"""
+        with cls._current() as index:
+            cached = cls._sorted.get(name)
+            if cached is None or cached[0] != cls._generation:
+                keyed = sorted((key(record), record) for record in index.values())
+                cached = cls._sorted[name] = (
+                    cls._generation, [pair[0] for pair in keyed], [pair[1] for pair in keyed]
+                )
+        # Never changed once built, so they are safe to use after _lock is released
+        return cached[1], cached[2]
+
+    @classmethod
+    def upsert(cls, record: Dict) -> None:
+        cls.upsert_many([record])
+
+    @classmethod
+    def upsert_many(cls, records: Iterable[Dict]) -> None:
+        with FileHandler.locked(cls.INVENTORY_FILE), cls._current() as index:
+            now = datetime.now().isoformat()
+            changed = []
+            for record in records:
+                # Store a copy so records handed out earlier are never changed under the caller
+                record = dict(record)
+                cls._stamp_low_stock(index.get(record["item_id"]), record, now)
+                index[record["item_id"]] = record
+                cls._low_stock.update(record)
+                if cls._search is not None:
+                    cls._search.update(record)
+                changed.append(record)
+            cls._save(changed=changed)
+
+    @classmethod
+    def delete(cls, item_id: str) -> bool:
+        with FileHandler.locked(cls.INVENTORY_FILE), cls._current() as index:
+            if item_id not in index:
+                return False
+            del index[item_id]
+            cls._low_stock.remove(item_id)
+            if cls._search is not None:
+                cls._search.remove(item_id)
+            cls._save(deleted=[item_id])
+            return True
+
+    @staticmethod
+    def _stamp_low_stock(old: Optional[Dict], record: Dict, now: str) -> None:
+        # Record when an item drops below its reorder point; clear it once restocked
+        if stock_margin(record) >= 0:
+            record.pop("low_stock_since", None)
+        elif old is not None and stock_margin(old) < 0 and "low_stock_since" in old:
+            record["low_stock_since"] = old["low_stock_since"]
+        else:
+            record["low_stock_since"] = now
+
+    @classmethod
+    def search(cls, query: str, prefix: bool = False, accept: Optional[Callable[[Dict], bool]] = None,
+               limit: Optional[int] = None) -> List[Dict]:
+        """
+        Items whose name or description match query (see SearchIndex.search) and
+        accept, most relevant first with ties in item_id order
+        """
+        with cls._current() as index:
+            if cls._search is None:
+                cls._search = SearchIndex(index.values())
+            scores = cls._search.search(query, prefix)
+            if accept is not None:
+                scores = {item_id: score for item_id, score in scores.items() if accept(index[item_id])}
+
+            def rank(item_id: str) -> Tuple[float, str]:
+                return -scores[item_id], item_id
+
+            ranked = sorted(scores, key=rank) if limit is None else heapq.nsmallest(limit, scores, key=rank)
+            return [index[item_id] for item_id in ranked]
+
+    @classmethod
+    def most_critical(cls, limit: Optional[int] = None) -> List[Dict]:
+        with cls._current() as index:
+            return [index[item_id] for item_id in cls._low_stock.most_critical(limit)]
+
+    @classmethod
+    def crossed_threshold_since(cls, since: str) -> List[Dict]:
+        with cls._current() as index:
+            return [index[item_id] for item_id in cls._low_stock.crossed_since(since)]
@@ -0,0 +1,59 @@
+from bisect import bisect_left, insort
+from typing import Dict, Iterable, List, Optional, Tuple
+from ..models.item import Item
+
+def stock_margin(record: Dict) -> int:
+    """Units above the item's reorder point; negative means the item is low on stock"""
+    return record["quantity"] - record.get("reorder_point", Item.DEFAULT_REORDER_POINT)
+
+class LowStockIndex:
+    """
+    Items ordered by stock margin, plus the currently-low items ordered by when
+    they went low. Both are sorted lists kept up to date one item at a time, so
+    queries read only the entries they return.
+    """
+
+    def __init__(self, records: Iterable[Dict] = ()):
+        self._margins: Dict[str, int] = {}
+        self._low_since: Dict[str, str] = {}
+        by_margin, by_time = [], []
+        for record in records:
+            margin = stock_margin(record)
+            self._margins[record["item_id"]] = margin
+            by_margin.append((margin, record["item_id"]))
+            if margin < 0 and "low_stock_since" in record:
+                self._low_since[record["item_id"]] = record["low_stock_since"]
+                by_time.append((record["low_stock_since"], record["item_id"]))
+        self._by_margin: List[Tuple[int, str]] = sorted(by_margin)
+        self._by_time: List[Tuple[str, str]] = sorted(by_time)
+
+    def update(self, record: Dict) -> None:
+        self.remove(record["item_id"])
+        margin = stock_margin(record)
+        self._margins[record["item_id"]] = margin
+        insort(self._by_margin, (margin, record["item_id"]))
+        if margin < 0 and "low_stock_since" in record:
+            self._low_since[record["item_id"]] = record["low_stock_since"]
+            insort(self._by_time, (record["low_stock_since"], record["item_id"]))
+
+    def remove(self, item_id: str) -> None:
+        margin = self._margins.pop(item_id, None)
+        if margin is not None:
+            del self._by_margin[bisect_left(self._by_margin, (margin, item_id))]
+        since = self._low_since.pop(item_id, None)
+        if since is not None:
+            del self._by_time[bisect_left(self._by_time, (since, item_id))]
+
+    def most_critical(self, limit: Optional[int] = None) -> List[str]:
+        """Ids of low-stock items, furthest below their reorder point first"""
+        result = []
+        for margin, item_id in self._by_margin:
+            if margin >= 0 or (limit is not None and len(result) >= limit):
+                break
+            result.append(item_id)
+        return result
+
+    def crossed_since(self, since: str) -> List[str]:
+        """Ids of items that went low at or after the ISO timestamp since and are still low"""
+        start = bisect_left(self._by_time, (since, ""))
+        return [item_id for _, item_id in self._by_time[start:]]
@@ -0,0 +1,234 @@
+import threading
+from bisect import bisect_left, insort
+from typing import Dict, List, Optional, Tuple
+
+from ..utils.file_handler import FileHandler
+
+# (order IDs in increasing order, their positions, username -> [(timestamp, order_id)] in order)
+Index = Tuple[List[int], List[int], Dict[str, List[Tuple[str, int]]]]
+
+class OrderRepository:
+    """
+    The order history and INDEX_FILE, an index over it with one entry per order:
+
+        {"order_id", "username", "timestamp", "position"}
+
+    position is where the order is stored in ORDERS_FILE, as returned by
+    FileHandler.scan (a byte offset into the JSON Lines file). Order IDs are
+    handed out in increasing order as orders are appended, so an order is found
+    by binary search over the IDs, a customer's orders by binary search over
+    their timestamps, and only the orders found are read.
+
+    Every order read is checked to carry the ID looked up; if the history was
+    rewritten under the index (by migrating it to another backend, say) the
+    index is rebuilt. Orders appended by a process that stopped before indexing
+    them are indexed on the next load.
+    """
+
+    ORDERS_FILE = "data/orders.txt"
+    INDEX_FILE = "data/order_index.txt"
+    # Fields the index is built from, which update() therefore cannot change
+    INDEXED_FIELDS = ("order_id", "username", "timestamp")
+
+    _index: Index = ([], [], {})
+    _generation: Optional[int] = None
+    # Version of ORDERS_FILE the index was last checked against
+    _orders_version: Optional[int] = None
+    # Held while the index is read or changed. Writers take it inside both file
+    # locks; readers release it before _catch_up takes those locks.
+    _lock = threading.RLock()
+
+    @staticmethod
+    def _entry(position: int, order: Dict) -> Dict:
+        return {"order_id": order["order_id"], "username": order["username"], "timestamp": order["timestamp"],
+                "position": position}
+
+    @classmethod
+    def _load(cls) -> None:
+        with cls._lock:
+            if FileHandler.generation(cls.INDEX_FILE) != cls._generation:
+                cls._read_index()
+            behind = FileHandler.version(cls.ORDERS_FILE) != cls._orders_version
+        if behind:
+            cls._catch_up()
+
+    @classmethod
+    def _read_index(cls) -> None:
+        # The caller holds _lock
+        generation = FileHandler.generation(cls.INDEX_FILE)
+        ids, positions, by_user = [], [], {}
+        for entry in FileHandler.read_data(cls.INDEX_FILE):
+            ids.append(entry["order_id"])
+            positions.append(entry["position"])
+            by_user.setdefault(entry["username"], []).append((entry["timestamp"], entry["order_id"]))
+        for entries in by_user.values():
+            entries.sort()
+        cls._index = (ids, positions, by_user)
+        cls._generation = generation
+        cls._orders_version = None
+
+    @classmethod
+    def _add(cls, entry: Dict) -> None:
+        # The caller holds _lock
+        ids, positions, by_user = cls._index
+        positions.append(entry["position"])
+        ids.append(entry["order_id"])
+        insort(by_user.setdefault(entry["username"], []), (entry["timestamp"], entry["order_id"]))
+
+    @classmethod
+    def _catch_up(cls) -> None:
+        """Index the orders appended after the last indexed one, or rebuild if the history no longer matches"""
+        with FileHandler.locked(cls.INDEX_FILE, cls.ORDERS_FILE), cls._lock:
+            if FileHandler.generation(cls.INDEX_FILE) != cls._generation:
+                cls._read_index()
+            version = FileHandler.version(cls.ORDERS_FILE)
+            ids, positions, _ = cls._index
+            if not ids:
+                cls.rebuild()
+                return
+
+            entries = []
+            try:
+                orders = FileHandler.scan(cls.ORDERS_FILE, positions[-1])
+                if next(orders, (None, {}))[1].get("order_id") != ids[-1]:
+                    raise ValueError("Last indexed order moved")
+                last_id = ids[-1]
+                for position, order in orders:
+                    if order.get("order_id", 0) <= last_id:
+                        raise ValueError("Order without a new order ID")
+                    entries.append(cls._entry(position, order))
+                    last_id = order["order_id"]
+            except ValueError:
+                cls.rebuild()
+                return
+
+            for entry in entries:
+                FileHandler.append_data(cls.INDEX_FILE, entry)
+                cls._add(entry)
+            cls._generation = FileHandler.generation(cls.INDEX_FILE)
+            cls._orders_version = version
+
+    @classmethod
+    def rebuild(cls) -> int:
+        """
+        Rewrite the index from the order history, first numbering any orders placed
+        before orders had IDs. Returns the number of orders indexed.
+        """
+        with FileHandler.locked(cls.INDEX_FILE, cls.ORDERS_FILE), cls._lock:
+            orders = list(FileHandler.scan(cls.ORDERS_FILE))
+            if any("order_id" not in order for _, order in orders):
+                next_id = max((order.get("order_id", 0) for _, order in orders), default=0) + 1
+                numbered = []
+                for _, order in orders:
+                    if "order_id" not in order:
+                        order = {"order_id": next_id, **order}
+                        next_id += 1
+                    numbered.append(order)
+                FileHandler.write_data(cls.ORDERS_FILE, numbered)
+                orders = list(FileHandler.scan(cls.ORDERS_FILE))
+
+            entries = sorted((cls._entry(position, order) for position, order in orders),
+                             key=lambda entry: entry["order_id"])
+            FileHandler.write_data(cls.INDEX_FILE, entries)
+            cls._read_index()
+            cls._orders_version = FileHandler.version(cls.ORDERS_FILE)
+        return len(entries)
+
+    @classmethod
+    def ensure(cls) -> None:
+        """Bring the index up to date with the order history, building it the first time"""
+        cls._load()
+
+    @classmethod
+    def _read(cls, position: int) -> Optional[Dict]:
+        try:
+            for _, order in FileHandler.scan(cls.ORDERS_FILE, position):
+                return order
+        except ValueError:
+            pass
+        return None
+
+    @classmethod
+    def _locate(cls, order_ids: List[int]) -> List[Tuple[int, int]]:
+        """(order_id, position) for those of order_ids that are indexed"""
+        cls._load()
+        with cls._lock:
+            ids, positions, _ = cls._index
+            located = []
+            for order_id in order_ids:
+                i = bisect_left(ids, order_id)
+                if i < len(ids) and ids[i] == order_id:
+                    located.append((order_id, positions[i]))
+            return located
+
+    @classmethod
+    def _fetch(cls, order_ids: List[int]) -> List[Dict]:
+        """Those of order_ids that exist, each read on its own from its indexed position"""
+        orders = []
+        for attempt in range(2):
+            orders = []
+            for order_id, position in cls._locate(order_ids):
+                order = cls._read(position)
+                if order is None or order.get("order_id") != order_id:
+                    break
+                orders.append(order)
+            else:
+                return orders
+            if attempt == 0:
+                # The history was rewritten under the index
+                cls.rebuild()
+        return orders
+
+    @classmethod
+    def get(cls, order_id: int) -> Optional[Dict]:
+        orders = cls._fetch([order_id])
+        return orders[0] if orders else None
+
+    @classmethod
+    def for_user(cls, username: str, since: Optional[str] = None, until: Optional[str] = None) -> List[Dict]:
+        """username's orders placed at or after since and before until (ISO timestamps), oldest first"""
+        cls._load()
+        with cls._lock:
+            entries = cls._index[2].get(username, [])
+            start = 0 if since is None else bisect_left(entries, (since,))
+            end = len(entries) if until is None else bisect_left(entries, (until,))
+            order_ids = [order_id for _, order_id in entries[start:end]]
+        return cls._fetch(order_ids)
+
+    @classmethod
+    def append(cls, order: Dict) -> Dict:
+        """Store order under the next order ID and index it. Returns the order as stored"""
+        with FileHandler.locked(cls.INDEX_FILE, cls.ORDERS_FILE):
+            cls._load()
+            with cls._lock:
+                ids = cls._index[0]
+                order = {"order_id": ids[-1] + 1 if ids else 1, **order}
+                FileHandler.append_data(cls.ORDERS_FILE, order)
+                # The index is derived from the history: if this fails, the next load indexes the order
+                try:
+                    position, _ = next(FileHandler.scan(cls.ORDERS_FILE, reverse=True))
+                    entry = cls._entry(position, order)
+                    FileHandler.append_data(cls.INDEX_FILE, entry)
+                    cls._add(entry)
+                    cls._generation = FileHandler.generation(cls.INDEX_FILE)
+                    cls._orders_version = FileHandler.version(cls.ORDERS_FILE)
+                except OSError:
+                    pass
+        return order
+
+    @classmethod
+    def update(cls, order_id: int, changes: Dict) -> Optional[Dict]:
+        """
+        Apply changes to the order's fields, rewriting only that order. Returns the
+        updated order, or None if there is no such order.
+        """
+        if any(field in changes for field in cls.INDEXED_FIELDS):
+            raise ValueError(f"Indexed order fields cannot be changed: {', '.join(cls.INDEXED_FIELDS)}")
+        with FileHandler.locked(cls.INDEX_FILE, cls.ORDERS_FILE):
+            order = cls.get(order_id)
+            if order is None:
+                return None
+            _, position = cls._locate([order_id])[0]
+            order = {**order, **changes}
+            FileHandler.update_at(cls.ORDERS_FILE, position, order)
+        return order
@@ -0,0 +1,94 @@
+from typing import Dict, Iterable, List
+
+from ..utils.file_handler import FileHandler
+
+class SalesRepository:
+    """
+    Running sales totals kept up to date by checkout, so reports never have to
+    scan the order history. The aggregates are a single record:
+
+        {"total_sales", "order_count",
+         "items": {item_id: {"units", "revenue"}},
+         "days": {"YYYY-MM-DD": {"orders", "sales"}}}
+
+    Revenue per item needs the unit price stored on each order line; lines from
+    orders placed before prices were recorded only count towards units.
+    """
+
+    AGGREGATES_FILE = "data/sales_aggregates.txt"
+
+    @staticmethod
+    def empty() -> Dict:
+        return {"total_sales": 0.0, "order_count": 0, "items": {}, "days": {}}
+
+    @staticmethod
+    def fold(aggregates: Dict, order: Dict) -> None:
+        """Add one order into aggregates in place"""
+        aggregates["total_sales"] += order["total"]
+        aggregates["order_count"] += 1
+
+        for line in order["items"]:
+            item = aggregates["items"].setdefault(line["item_id"], {"units": 0, "revenue": 0.0})
+            item["units"] += line["quantity"]
+            if "price" in line:
+                item["revenue"] += line["price"] * line["quantity"]
+
+        day = aggregates["days"].setdefault(order["timestamp"][:10], {"orders": 0, "sales": 0.0})
+        day["orders"] += 1
+        day["sales"] += order["total"]
+
+    @classmethod
+    def compute(cls, orders: Iterable[Dict]) -> Dict:
+        aggregates = cls.empty()
+        for order in orders:
+            cls.fold(aggregates, order)
+        return aggregates
+
+    @classmethod
+    def get(cls) -> Dict:
+        records = FileHandler.read_data(cls.AGGREGATES_FILE)
+        return records[0] if records else cls.empty()
+
+    @classmethod
+    def record_order(cls, order: Dict) -> None:
+        # The order's own totals are added to the stored ones, so only they are written
+        FileHandler.accumulate(cls.AGGREGATES_FILE, cls.compute([order]))
+
+    @classmethod
+    def rebuild(cls, orders_file: str) -> Dict:
+        """Recompute the aggregates from the full order history"""
+        with FileHandler.locked(orders_file, cls.AGGREGATES_FILE):
+            aggregates = cls.compute(FileHandler.iter_data(orders_file))
+            FileHandler.write_data(cls.AGGREGATES_FILE, [aggregates])
+        return aggregates
+
+    @classmethod
+    def ensure(cls, orders_file: str) -> bool:
+        """Build the aggregates from history if they have never been stored. Returns True if built"""
+        if FileHandler.read_data(cls.AGGREGATES_FILE):
+            return False
+        cls.rebuild(orders_file)
+        return True
+
+    @classmethod
+    def check(cls, orders_file: str) -> List[str]:
+        """Compare the stored aggregates with a full recompute; returns the differences found"""
+        with FileHandler.locked(orders_file, cls.AGGREGATES_FILE):
+            stored = cls.get()
+            expected = cls.compute(FileHandler.iter_data(orders_file))
+        return cls._diff(stored, expected, "")
+
+    @classmethod
+    def _diff(cls, stored, expected, path: str) -> List[str]:
+        if isinstance(expected, dict) and isinstance(stored, dict):
+            differences = []
+            for key in sorted(set(stored) | set(expected)):
+                differences += cls._diff(stored.get(key), expected.get(key), f"{path}/{key}")
+            return differences
+        if isinstance(expected, float) or isinstance(stored, float):
+            # Sums of prices are compared to the cent
+            if stored is not None and expected is not None and round(stored - expected, 2) == 0:
+                return []
+        elif stored == expected:
+            return []
+        return [f"{path or '/'}: stored {stored!r}, expected {expected!r}"]
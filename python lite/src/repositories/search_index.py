@@ -0,0 +1,116 @@
+import math
+import re
+from bisect import bisect_left, insort
+from typing import Dict, Iterable, List, Optional, Tuple
+
+TOKEN = re.compile(r"\w+")
+# Query terms, each optionally marked as a prefix with a trailing "*"
+QUERY_TERM = re.compile(r"(\w+)(\*?)")
+
+# A word in the name counts this many times as much as one in the description
+NAME_WEIGHT = 3.0
+# Score multiplier for a token matched only by prefix rather than exactly
+PREFIX_FACTOR = 0.5
+
+def tokenize(text: str) -> List[str]:
+    return TOKEN.findall(text.lower())
+
+class SearchIndex:
+    """
+    Inverted index over item names and descriptions: token -> item id -> weight,
+    plus the sorted vocabulary for prefix lookups. Items are added and removed
+    one at a time, so keeping it current costs only the changed item's tokens.
+    """
+
+    def __init__(self, records: Iterable[Dict] = ()):
+        self._postings: Dict[str, Dict[str, float]] = {}
+        # item_id -> tokens indexed for it, to find its postings again on removal
+        self._tokens: Dict[str, Tuple[str, ...]] = {}
+        # (name, description) last indexed per item, so unchanged text is skipped
+        self._text: Dict[str, Tuple[str, str]] = {}
+        for record in records:
+            self._add(record)
+        self._vocabulary: List[str] = sorted(self._postings)
+
+    def _add(self, record: Dict) -> List[str]:
+        """Index record; returns tokens that had no postings before"""
+        item_id = record["item_id"]
+        name, description = record.get("name", ""), record.get("description", "")
+        weights: Dict[str, float] = {}
+        for token in tokenize(name):
+            weights[token] = weights.get(token, 0.0) + NAME_WEIGHT
+        for token in tokenize(description):
+            weights[token] = weights.get(token, 0.0) + 1.0
+
+        new_tokens = []
+        for token, weight in weights.items():
+            postings = self._postings.get(token)
+            if postings is None:
+                postings = self._postings[token] = {}
+                new_tokens.append(token)
+            postings[item_id] = weight
+        self._tokens[item_id] = tuple(weights)
+        self._text[item_id] = (name, description)
+        return new_tokens
+
+    def update(self, record: Dict) -> None:
+        item_id = record["item_id"]
+        if self._text.get(item_id) == (record.get("name", ""), record.get("description", "")):
+            return
+        self.remove(item_id)
+        for token in self._add(record):
+            insort(self._vocabulary, token)
+
+    def remove(self, item_id: str) -> None:
+        self._text.pop(item_id, None)
+        for token in self._tokens.pop(item_id, ()):
+            postings = self._postings[token]
+            del postings[item_id]
+            if not postings:
+                del self._postings[token]
+                del self._vocabulary[bisect_left(self._vocabulary, token)]
+
+    def _expand(self, term: str) -> List[str]:
+        """Indexed tokens starting with term"""
+        tokens = []
+        for i in range(bisect_left(self._vocabulary, term), len(self._vocabulary)):
+            if not self._vocabulary[i].startswith(term):
+                break
+            tokens.append(self._vocabulary[i])
+        return tokens
+
+    def search(self, query: str, prefix: bool = False) -> Dict[str, float]:
+        """
+        item_id -> relevance for items matching every term of query. A term ending
+        in "*", or every term with prefix, also matches longer tokens it starts.
+        Each term scores its best matching token by weight and rarity (idf).
+        """
+        terms = []
+        for term, star in QUERY_TERM.findall(query.lower()):
+            tokens = self._expand(term) if prefix or star else [term] if term in self._postings else []
+            if not tokens:
+                return {}
+            terms.append((sum(len(self._postings[token]) for token in tokens), term, tokens))
+
+        # Rarest term first, so each later term only has to check the candidates left
+        scores: Optional[Dict[str, float]] = None
+        for _, term, tokens in sorted(terms):
+            term_scores: Dict[str, float] = {}
+            for token in tokens:
+                postings = self._postings[token]
+                factor = math.log(1 + len(self._tokens) / len(postings))
+                if token != term:
+                    factor *= PREFIX_FACTOR
+                candidates = postings if scores is None or len(postings) < len(scores) else scores
+                for item_id in candidates:
+                    weight = postings.get(item_id)
+                    if weight is not None and (scores is None or item_id in scores):
+                        score = weight * factor
+                        if score > term_scores.get(item_id, 0.0):
+                            term_scores[item_id] = score
+            scores = term_scores if scores is None else {
+                item_id: scores[item_id] + score for item_id, score in term_scores.items()
+            }
+            if not scores:
+                break
+        return scores or {}
@@ -0,0 +1,100 @@
+import threading
+from typing import Dict, List, Optional
+from ..utils.file_handler import FileHandler
+
+class UserRepository:
+    USER_FILE = "data/users.txt"
+
+    # username -> record and normalized username -> record, rebuilt only when the users file changes
+    _by_username: Dict[str, Dict] = {}
+    _by_normalized: Dict[str, Dict] = {}
+    _generation: Optional[int] = None
+    # Held while the maps above are loaded, read or changed; writers take it inside USER_FILE's lock
+    _lock = threading.RLock()
+
+    @staticmethod
+    def normalize(username: str) -> str:
+        return username.lower()
+
+    @classmethod
+    def _load(cls) -> None:
+        # The caller holds _lock
+        generation = FileHandler.generation(cls.USER_FILE)
+        if generation != cls._generation:
+            records = FileHandler.read_data(cls.USER_FILE)
+            cls._by_username = {record["username"]: record for record in records}
+            cls._by_normalized = {}
+            for record in records:
+                # Keep the first of any names that only differ by case
+                cls._by_normalized.setdefault(cls.normalize(record["username"]), record)
+            cls._generation = generation
+
+    @classmethod
+    def _index(cls, record: Dict) -> None:
+        cls._by_username[record["username"]] = record
+        normalized = cls.normalize(record["username"])
+        current = cls._by_normalized.get(normalized)
+        if current is None or current["username"] == record["username"]:
+            cls._by_normalized[normalized] = record
+
+    @classmethod
+    def _written(cls) -> None:
+        cls._generation = FileHandler.generation(cls.USER_FILE)
+
+    @classmethod
+    def get(cls, username: str) -> Optional[Dict]:
+        """Exact (case-sensitive) lookup"""
+        with cls._lock:
+            cls._load()
+            return cls._by_username.get(username)
+
+    @classmethod
+    def find(cls, username: str) -> Optional[Dict]:
+        """Case-insensitive lookup"""
+        with cls._lock:
+            cls._load()
+            return cls._by_normalized.get(cls.normalize(username))
+
+    @classmethod
+    def all(cls) -> List[Dict]:
+        with cls._lock:
+            cls._load()
+            return list(cls._by_username.values())
+
+    @classmethod
+    def add(cls, record: Dict) -> None:
+        with FileHandler.locked(cls.USER_FILE), cls._lock:
+            cls._load()
+            try:
+                FileHandler.append_data(cls.USER_FILE, record)
+            except Exception:
+                cls._generation = None
+                raise
+            cls._index(dict(record))
+            cls._written()
+
+    @classmethod
+    def update(cls, username: str, changes: Dict) -> bool:
+        return bool(cls.update_many({username: changes}))
+
+    @classmethod
+    def update_many(cls, changes: Dict[str, Dict]) -> List[str]:
+        """Apply each user's changes with a single write. Returns the usernames found and updated"""
+        with FileHandler.locked(cls.USER_FILE), cls._lock:
+            cls._load()
+            records = [
+                {**cls._by_username[username], **fields}
+                for username, fields in changes.items() if username in cls._by_username
+            ]
+            if not records:
+                return []
+            for record in records:
+                cls._index(record)
+            try:
+                FileHandler.update_records(cls.USER_FILE, "username", records)
+            except Exception:
+                # The index no longer matches the file; rebuild it on next access
+                cls._generation = None
+                raise
+            cls._written()
+            return [record["username"] for record in records]
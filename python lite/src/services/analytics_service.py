@@ -0,0 +1,150 @@
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from ..repositories.inventory_repository import InventoryRepository
+from ..utils.file_handler import FileHandler
+from .order_service import OrderService
+
+try:
+    import numpy as np
+except ImportError:  # Analytics reports are unavailable without numpy
+    np = None
+
+class SalesFrame:
+    """
+    Orders and inventory flattened into parallel NumPy columns. Each order line
+    becomes one row of the line_* columns; item and day strings are replaced by
+    integer codes into item_ids / days so group-bys are plain bincounts.
+    """
+
+    def __init__(self, orders: Iterable[Dict], items: Iterable[Dict]):
+        item_codes: Dict[str, int] = {}
+        day_codes: Dict[str, int] = {}
+        line_items, line_quantities, line_prices, line_orders = [], [], [], []
+        order_totals, order_days = [], []
+        for order_index, order in enumerate(orders):
+            order_totals.append(order["total"])
+            order_days.append(day_codes.setdefault(order["timestamp"][:10], len(day_codes)))
+            for line in order["items"]:
+                line_items.append(item_codes.setdefault(line["item_id"], len(item_codes)))
+                line_quantities.append(line["quantity"])
+                # Lines from before prices were recorded on orders carry no revenue
+                line_prices.append(line.get("price", 0.0))
+                line_orders.append(order_index)
+
+        # Every SKU that was sold or is stocked gets a code
+        stocked, stock_quantities = [], []
+        for item in items:
+            stocked.append(item_codes.setdefault(item["item_id"], len(item_codes)))
+            stock_quantities.append(item["quantity"])
+
+        self.item_ids = np.array(list(item_codes), dtype=str)
+        self.line_item = np.array(line_items, dtype=np.int64)
+        self.line_quantity = np.array(line_quantities, dtype=np.int64)
+        self.line_revenue = self.line_quantity * np.array(line_prices, dtype=np.float64)
+        self.line_order = np.array(line_orders, dtype=np.int64)
+
+        self.on_hand = np.zeros(len(self.item_ids), dtype=np.int64)
+        self.on_hand[np.array(stocked, dtype=np.int64)] = stock_quantities
+
+        # Renumber days so codes follow calendar order
+        day_names = np.array(list(day_codes), dtype=str)
+        chronological = np.argsort(day_names)
+        rank = np.empty_like(chronological)
+        rank[chronological] = np.arange(len(chronological))
+        self.days = day_names[chronological]
+        self.order_day = rank[np.array(order_days, dtype=np.int64)]
+        self.order_total = np.array(order_totals, dtype=np.float64)
+
+    @property
+    def order_count(self) -> int:
+        return len(self.order_total)
+
+class AnalyticsService:
+    _frame: Optional[SalesFrame] = None
+    _frame_generations: Optional[Tuple[int, int]] = None
+
+    @classmethod
+    def available(cls) -> bool:
+        return np is not None
+
+    @classmethod
+    def load(cls) -> SalesFrame:
+        """Columnar view of the order history and inventory, rebuilt only when either changes"""
+        generations = (
+            FileHandler.generation(OrderService.ORDERS_FILE),
+            InventoryRepository.generation()
+        )
+        if cls._frame is None or generations != cls._frame_generations:
+            cls._frame = SalesFrame(FileHandler.iter_data(OrderService.ORDERS_FILE), InventoryRepository.all())
+            cls._frame_generations = generations
+        return cls._frame
+
+    @classmethod
+    def _units_and_revenue(cls, frame: SalesFrame):
+        size = len(frame.item_ids)
+        units = np.bincount(frame.line_item, weights=frame.line_quantity, minlength=size)
+        revenue = np.bincount(frame.line_item, weights=frame.line_revenue, minlength=size)
+        return units, revenue
+
+    @classmethod
+    def top_sellers(cls, limit: int = 10, frame: SalesFrame = None) -> List[Dict]:
+        frame = frame or cls.load()
+        units, revenue = cls._units_and_revenue(frame)
+        # Most units first, revenue breaking ties
+        order = np.lexsort((-revenue, -units))[:limit]
+        return [
+            {"item_id": str(frame.item_ids[i]), "units": int(units[i]), "revenue": float(revenue[i])}
+            for i in order if units[i] > 0
+        ]
+
+    @classmethod
+    def revenue_by_item(cls, frame: SalesFrame = None) -> Dict[str, float]:
+        frame = frame or cls.load()
+        _, revenue = cls._units_and_revenue(frame)
+        sold = np.nonzero(revenue)[0]
+        return {str(frame.item_ids[i]): float(revenue[i]) for i in sold}
+
+    @classmethod
+    def revenue_by_day(cls, frame: SalesFrame = None) -> List[Dict]:
+        frame = frame or cls.load()
+        size = len(frame.days)
+        sales = np.bincount(frame.order_day, weights=frame.order_total, minlength=size)
+        orders = np.bincount(frame.order_day, minlength=size)
+        return [
+            {"day": str(frame.days[i]), "orders": int(orders[i]), "sales": float(sales[i])}
+            for i in range(size)
+        ]
+
+    @classmethod
+    def stock_health(cls, frame: SalesFrame = None) -> List[Dict]:
+        """
+        Per SKU: sell-through rate (units sold / (units sold + on hand)) and days of
+        cover (on hand / average units sold per day over the days covered by the
+        order history). Items that never sold have infinite cover.
+        """
+        frame = frame or cls.load()
+        units, _ = cls._units_and_revenue(frame)
+
+        received = units + frame.on_hand
+        sell_through = np.divide(units, received, out=np.zeros_like(units), where=received > 0)
+
+        if len(frame.days):
+            first, last = np.datetime64(str(frame.days[0])), np.datetime64(str(frame.days[-1]))
+            period_days = int((last - first) / np.timedelta64(1, "D")) + 1
+        else:
+            period_days = 1
+        daily_rate = units / period_days
+        cover = np.divide(
+            frame.on_hand, daily_rate, out=np.full(len(units), np.inf), where=daily_rate > 0
+        )
+
+        return [
+            {
+                "item_id": str(frame.item_ids[i]),
+                "units_sold": int(units[i]),
+                "on_hand": int(frame.on_hand[i]),
+                "sell_through": float(sell_through[i]),
+                "days_of_cover": float(cover[i])
+            }
+            for i in np.argsort(cover, kind="stable")
+        ]
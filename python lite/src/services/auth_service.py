@@ -1,9 +1,10 @@
 from typing import Optional, Tuple, List, Dict
 from ..models.user import User, UserRole, UserStatus
+from ..repositories.user_repository import UserRepository
 from ..utils.file_handler import FileHandler
 
 class AuthService:
-    USER_FILE = "data/users.txt"
+    USER_FILE = UserRepository.USER_FILE
 
     @classmethod
     def register(cls, username: str, password: str, role: str) -> Tuple[bool, str]:
@@ -20,87 +21,97 @@ class AuthService:
         if len(password) < 4:
             return False, "Password must be at least 4 characters long"
 
-        users = FileHandler.read_data(cls.USER_FILE)
-        
-        # Check if username already exists (case-insensitive)
-        if any(user["username"].lower() == username.lower() for user in users):
-            return False, "Username already exists. Please choose a different username"
-
-        # Validate role
-        try:
-            user_role = UserRole(role)
-        except ValueError:
-            return False, "Invalid role"
-
-        # Manager role is not allowed for registration
-        if user_role == UserRole.MANAGER:
-            return False, "Cannot register as Manager"
-
-        # Create new user
-        user = User(username, password, user_role)
-        FileHandler.append_data(cls.USER_FILE, user.to_dict())
+        # Check and insert under the lock so two sessions cannot claim the same name
+        with FileHandler.locked(cls.USER_FILE):
+            # Check if username already exists (case-insensitive)
+            if UserRepository.find(username):
+                return False, "Username already exists. Please choose a different username"
+
+            # Validate role
+            try:
+                user_role = UserRole(role)
+            except ValueError:
+                return False, "Invalid role"
+
+            # Manager role is not allowed for registration
+            if user_role == UserRole.MANAGER:
+                return False, "Cannot register as Manager"
+
+            # Create new user
+            user = User(username, password, user_role)
+            UserRepository.add(user.to_dict())
         return True, "Registration successful. Waiting for approval."
 
     @classmethod
     def register_manager(cls, manager: User) -> None:
-        users = FileHandler.read_data(cls.USER_FILE)
-        if not any(user["username"] == manager.username for user in users):
-            FileHandler.append_data(cls.USER_FILE, manager.to_dict())
+        with FileHandler.locked(cls.USER_FILE):
+            if not UserRepository.get(manager.username):
+                UserRepository.add(manager.to_dict())
 
     @classmethod
     def login(cls, username: str, password: str) -> Tuple[bool, str, Optional[User]]:
-        users = FileHandler.read_data(cls.USER_FILE)
-        
-        for user_data in users:
-            if user_data["username"] == username:
-                user = User.from_dict(user_data)
-                if user.password == password:
-                    # Manager can always login regardless of status
-                    if user.role == UserRole.MANAGER:
-                        return True, "Login successful", user
-                    
-                    if user.status == UserStatus.BANNED:
-                        return False, "Your account has been banned", None
-                    if user.status == UserStatus.PENDING:
-                        return False, "Your account is pending approval", None
-                    return True, "Login successful", user
-                return False, "Invalid password", None
-                
-        return False, "User not found", None
+        user_data = UserRepository.get(username)
+        if not user_data:
+            return False, "User not found", None
+
+        user = User.from_dict(user_data)
+        if user.password != password:
+            return False, "Invalid password", None
+
+        # Manager can always login regardless of status
+        if user.role == UserRole.MANAGER:
+            return True, "Login successful", user
+
+        if user.status == UserStatus.BANNED:
+            return False, "Your account has been banned", None
+        if user.status == UserStatus.PENDING:
+            return False, "Your account is pending approval", None
+        return True, "Login successful", user
 
     @classmethod
     def get_all_users(cls) -> List[Dict]:
-        users = FileHandler.read_data(cls.USER_FILE)
+        users = UserRepository.all()
         # Filter out manager from the list for display
         return [user for user in users if user["role"] != UserRole.MANAGER.value]
 
     @classmethod
     def update_user_status(cls, username: str, new_status: UserStatus, actor: User) -> Tuple[bool, str]:
-        if not isinstance(new_status, UserStatus):
-            return False, "Invalid status"
+        return cls.update_user_statuses({username: new_status}, actor)[username]
 
-        def update_condition(user):
-            return user["username"] == username
+    @classmethod
+    def update_user_statuses(cls, changes: Dict[str, UserStatus], actor: User) -> Dict[str, Tuple[bool, str]]:
+        """
+        Set the status of every user in changes with a single write. Each change
+        is checked as update_user_status would; the valid ones are applied and
+        (success, message) is returned per username.
+        """
+        results: Dict[str, Tuple[bool, str]] = {}
+        with FileHandler.locked(cls.USER_FILE):
+            updates = {}
+            for username, new_status in changes.items():
+                error = cls._status_change_error(UserRepository.get(username), new_status, actor)
+                if error:
+                    results[username] = (False, error)
+                else:
+                    updates[username] = {"status": new_status.value}
+                    results[username] = (True, "Status updated successfully")
+            UserRepository.update_many(updates)
+        return results
 
-        users = FileHandler.read_data(cls.USER_FILE)
-        target_user = next((User.from_dict(u) for u in users if u["username"] == username), None)
-        
-        if not target_user:
-            return False, "User not found"
+    @staticmethod
+    def _status_change_error(target_data: Optional[Dict], new_status: UserStatus, actor: User) -> Optional[str]:
+        if not isinstance(new_status, UserStatus):
+            return "Invalid status"
+        if not target_data:
+            return "User not found"
+        target_user = User.from_dict(target_data)
 
         # Prevent modifying manager account
         if target_user.role == UserRole.MANAGER:
-            return False, "Cannot modify Manager account"
+            return "Cannot modify Manager account"
 
         # Check permissions
         if actor.role == UserRole.ADMIN:
             if target_user.role in [UserRole.MANAGER, UserRole.ADMIN]:
-                return False, "Admins cannot modify Manager or other Admin accounts"
-        
-        success = FileHandler.update_data(
-            cls.USER_FILE,
-            update_condition,
-            {"status": new_status.value}
-        )
-        
-        return success, "Status updated successfully" if success else "Failed to update status" 
\ No newline at end of file
+                return "Admins cannot modify Manager or other Admin accounts"
+        return None 
\ No newline at end of file
@@ -1,36 +1,42 @@
-from typing import List, Tuple, Optional
+import math
+from typing import Dict, Iterable, List, Tuple, Optional
 from ..models.item import Item
+from ..repositories.inventory_repository import InventoryRepository
 from ..utils.file_handler import FileHandler
+from ..utils.pagination import keyset_page
 
 class InventoryService:
-    INVENTORY_FILE = "data/inventory.txt"
+    INVENTORY_FILE = InventoryRepository.INVENTORY_FILE
+    # Counts are stored as signed 64-bit integers by the fixed-width inventory store
+    MAX_COUNT = 2 ** 63 - 1
+    # Sort orders for get_items_page; item_id breaks ties so every key is unique
+    SORT_KEYS = {
+        "item_id": lambda record: (record["item_id"],),
+        "name": lambda record: (record["name"].lower(), record["item_id"]),
+        "price": lambda record: (record["price"], record["item_id"]),
+        "quantity": lambda record: (record["quantity"], record["item_id"]),
+    }
 
     @classmethod
     def add_item(cls, item: Item) -> Tuple[bool, str]:
-        items = FileHandler.read_data(cls.INVENTORY_FILE)
-        
-        # Check if item ID already exists
-        if any(i["item_id"] == item.item_id for i in items):
-            return False, "Item ID already exists"
+        with FileHandler.locked(cls.INVENTORY_FILE):
+            # Check if item ID already exists
+            if InventoryRepository.get(item.item_id):
+                return False, "Item ID already exists"
 
-        FileHandler.append_data(cls.INVENTORY_FILE, item.to_dict())
+            InventoryRepository.upsert(item.to_dict())
         return True, "Item added successfully"
 
     @classmethod
     def delete_item(cls, item_id: str) -> Tuple[bool, str]:
-        items = FileHandler.read_data(cls.INVENTORY_FILE)
-        
-        # Check if item exists
-        if not any(i["item_id"] == item_id for i in items):
-            return False, "Item not found"
-
         # Remove item from inventory
-        updated_items = [item for item in items if item["item_id"] != item_id]
-        FileHandler.write_data(cls.INVENTORY_FILE, updated_items)
+        if not InventoryRepository.delete(item_id):
+            return False, "Item not found"
 
         # Import here to avoid circular import
         from .order_service import OrderService
-        # Remove item from all customer carts
+        # Remove item from all customer carts. Each cart is locked on its own after
+        # the inventory lock is released, keeping lock order consistent with checkout.
         OrderService.remove_item_from_all_carts(item_id)
         
         return True, "Item deleted successfully and removed from all carts"
@@ -40,45 +46,241 @@ class InventoryService:
         if new_price < 0:
             return False, "Price cannot be negative"
 
-        def update_condition(item):
-            return item["item_id"] == item_id
+        with FileHandler.locked(cls.INVENTORY_FILE):
+            item = InventoryRepository.get(item_id)
+            if not item:
+                return False, "Item not found"
 
-        success = FileHandler.update_data(
-            cls.INVENTORY_FILE,
-            update_condition,
-            {"price": new_price}
-        )
-        return success, "Price updated successfully" if success else "Item not found"
+            InventoryRepository.upsert({**item, "price": new_price})
+        return True, "Price updated successfully"
+
+    @classmethod
+    def update_item(cls, item_id: str, price: Optional[float] = None, quantity_change: Optional[int] = None,
+                    reorder_point: Optional[int] = None) -> Tuple[bool, str]:
+        """Apply every given change to the item with one write, or none of them if any is invalid"""
+        if price is not None and price < 0:
+            return False, "Price cannot be negative"
+        if reorder_point is not None and reorder_point < 0:
+            return False, "Reorder point cannot be negative"
+
+        with FileHandler.locked(cls.INVENTORY_FILE):
+            item = InventoryRepository.get(item_id)
+            if not item:
+                return False, "Item not found"
+            if quantity_change is not None and item["quantity"] + quantity_change < 0:
+                return False, "Insufficient quantity"
+
+            changes = {"price": price, "reorder_point": reorder_point}
+            if quantity_change is not None:
+                changes["quantity"] = item["quantity"] + quantity_change
+            InventoryRepository.upsert({**item, **{key: value for key, value in changes.items() if value is not None}})
+        return True, "Item updated successfully"
 
     @classmethod
     def update_item_quantity(cls, item_id: str, quantity_change: int) -> Tuple[bool, str]:
-        items = FileHandler.read_data(cls.INVENTORY_FILE)
-        item = next((i for i in items if i["item_id"] == item_id), None)
-        
-        if not item:
-            return False, "Item not found"
+        return cls.adjust_quantities({item_id: quantity_change})[item_id]
+
+    @classmethod
+    def adjust_quantities(cls, changes: Dict[str, int]) -> Dict[str, Tuple[bool, str]]:
+        """
+        Add each change to its item's quantity with a single write, e.g. after a
+        stock-take. Changes for unknown items or that would leave negative stock
+        are rejected; the rest are applied. Returns (success, message) per item_id.
+        """
+        results: Dict[str, Tuple[bool, str]] = {}
+        with FileHandler.locked(cls.INVENTORY_FILE):
+            items = InventoryRepository.get_many(changes)
+            updated = []
+            for item_id, quantity_change in changes.items():
+                item = items.get(item_id)
+                if not item:
+                    results[item_id] = (False, "Item not found")
+                elif item["quantity"] + quantity_change < 0:
+                    results[item_id] = (False, "Insufficient quantity")
+                else:
+                    updated.append({**item, "quantity": item["quantity"] + quantity_change})
+                    results[item_id] = (True, "Quantity updated successfully")
+            if updated:
+                InventoryRepository.upsert_many(updated)
+        return results
+
+    @classmethod
+    def bulk_upsert(cls, rows: Iterable[Optional[Dict]], strict: bool = False,
+                    first_row: int = 1) -> Tuple[bool, str, List[str]]:
+        """
+        Add or update many items with a single write. Each row holds Item fields
+        (strings are converted); fields a row leaves out or empty keep their current
+        value, so new items need at least item_id, name, price and quantity. Rows
+        are numbered from first_row in the returned errors. Invalid rows are
+        skipped, or with strict nothing is written if any row is invalid.
+        """
+        errors: List[Tuple[int, str]] = []
+        # item_id -> (row number, fields); a later row for the same item wins
+        pending: Dict[str, Tuple[int, Dict]] = {}
+        for row_number, row in enumerate(rows, first_row):
+            fields, error = cls._parse_row(row)
+            if error:
+                errors.append((row_number, error))
+            else:
+                previous = pending.get(fields["item_id"], (row_number, {}))[1]
+                pending[fields["item_id"]] = (row_number, {**previous, **fields})
 
-        new_quantity = item["quantity"] + quantity_change
-        if new_quantity < 0:
-            return False, "Insufficient quantity"
+        with FileHandler.locked(cls.INVENTORY_FILE):
+            existing = InventoryRepository.get_many(pending)
+            records = []
+            for item_id, (row_number, fields) in pending.items():
+                record = {**existing[item_id], **fields} if item_id in existing else fields
+                missing = [field for field in ("name", "price", "quantity") if field not in record]
+                if missing:
+                    errors.append((row_number, f"new item {item_id} needs {', '.join(missing)}"))
+                else:
+                    records.append(Item.from_dict(record).to_dict() if item_id not in existing else record)
 
-        def update_condition(item):
-            return item["item_id"] == item_id
+            if errors and strict:
+                return False, f"{len(errors)} invalid rows, nothing imported", cls._format_errors(errors)
+            if records:
+                InventoryRepository.upsert_many(records)
 
-        success = FileHandler.update_data(
-            cls.INVENTORY_FILE,
-            update_condition,
-            {"quantity": new_quantity}
+        added = sum(1 for record in records if record["item_id"] not in existing)
+        return (
+            True,
+            f"Imported {len(records)} items ({added} new, {len(records) - added} updated), "
+            f"{len(errors)} rows rejected",
+            cls._format_errors(errors)
         )
-        return success, "Quantity updated successfully" if success else "Failed to update quantity"
+
+    @staticmethod
+    def _format_errors(errors: List[Tuple[int, str]]) -> List[str]:
+        return [f"row {row_number}: {error}" for row_number, error in sorted(errors)]
+
+    @staticmethod
+    def _parse_row(row: Optional[Dict]) -> Tuple[Optional[Dict], Optional[str]]:
+        if not isinstance(row, dict):
+            return None, "not a valid record"
+        # Empty CSV cells mean "leave unchanged"
+        row = {key: value for key, value in row.items() if value is not None and value != ""}
+
+        item_id = str(row.get("item_id", "")).strip()
+        if not item_id:
+            return None, "item_id is required"
+        fields: Dict = {"item_id": item_id}
+
+        for name in ("name", "description"):
+            if name in row:
+                fields[name] = str(row[name])
+        if "name" in fields and not fields["name"].strip():
+            return None, "name cannot be blank"
+
+        try:
+            if "price" in row:
+                fields["price"] = float(row["price"])
+        except (TypeError, ValueError):
+            return None, f"price must be a number, got {row['price']!r}"
+        # float() accepts "nan" and "inf", which compare false against any bound
+        if not math.isfinite(fields.get("price", 0)):
+            return None, f"price must be a finite number, got {row['price']!r}"
+        if fields.get("price", 0) < 0:
+            return None, "price cannot be negative"
+
+        for name in ("quantity", "reorder_point"):
+            if name not in row:
+                continue
+            value = row[name]
+            try:
+                # int("2.5") fails, so fractional counts are rejected rather than truncated
+                fields[name] = value if type(value) is int else int(str(value).strip())
+            except ValueError:
+                return None, f"{name} must be a whole number, got {value!r}"
+            if fields[name] < 0:
+                return None, f"{name} cannot be negative"
+            if fields[name] > InventoryService.MAX_COUNT:
+                return None, f"{name} cannot exceed {InventoryService.MAX_COUNT}"
+        return fields, None
+
+    @classmethod
+    def update_reorder_point(cls, item_id: str, reorder_point: int) -> Tuple[bool, str]:
+        if reorder_point < 0:
+            return False, "Reorder point cannot be negative"
+
+        with FileHandler.locked(cls.INVENTORY_FILE):
+            item = InventoryRepository.get(item_id)
+            if not item:
+                return False, "Item not found"
+
+            InventoryRepository.upsert({**item, "reorder_point": reorder_point})
+        return True, "Reorder point updated successfully"
+
+    @classmethod
+    def get_low_stock_items(cls, limit: Optional[int] = None) -> List[Item]:
+        """Items below their reorder point, most critical first"""
+        return Item.from_records(InventoryRepository.most_critical(limit))
+
+    @classmethod
+    def get_items_low_since(cls, since: str) -> List[Item]:
+        """Items still below their reorder point that dropped below it at or after since (ISO timestamp)"""
+        return Item.from_records(InventoryRepository.crossed_threshold_since(since))
 
     @classmethod
     def get_all_items(cls) -> List[Item]:
-        items = FileHandler.read_data(cls.INVENTORY_FILE)
-        return [Item.from_dict(item) for item in items]
+        return Item.from_records(InventoryRepository.all())
+
+    @classmethod
+    def get_items_page(cls, page_size: int = 20, cursor: Optional[str] = None, sort: str = "item_id",
+                       min_price: Optional[float] = None, max_price: Optional[float] = None,
+                       in_stock_only: bool = False) -> Tuple[List[Item], Optional[str]]:
+        """
+        One page of items and the cursor of the next page, None on the last page.
+        sort is a SORT_KEYS name, prefixed with "-" for descending order; pass the
+        returned cursor back with the same sort and filters to continue. Raises
+        ValueError for an unknown sort or a cursor made for another sort.
+        """
+        field = sort[1:] if sort.startswith("-") else sort
+        if field not in cls.SORT_KEYS:
+            raise ValueError(f"Unknown sort key: {field}")
+
+        def accept(record: Dict) -> bool:
+            return cls._in_range(record, min_price, max_price, in_stock_only)
+
+        keys, records = InventoryRepository.sorted_by(field, cls.SORT_KEYS[field])
+        page, next_cursor = keyset_page(keys, records, sort, page_size, cursor, sort.startswith("-"), accept)
+        return Item.from_records(page), next_cursor
+
+    @classmethod
+    def search_items(cls, query: str, limit: Optional[int] = 20, prefix: bool = True,
+                     min_price: Optional[float] = None, max_price: Optional[float] = None,
+                     in_stock_only: bool = False) -> List[Item]:
+        """
+        Items whose name or description contain every word of query, most relevant
+        first. With prefix, words also match the start of longer words ("lap"
+        finds "laptop"); otherwise only a word ending in "*" does. limit=None
+        returns every match.
+        """
+        def accept(record: Dict) -> bool:
+            return cls._in_range(record, min_price, max_price, in_stock_only)
+
+        filtered = min_price is not None or max_price is not None or in_stock_only
+        return Item.from_records(InventoryRepository.search(query, prefix, accept if filtered else None, limit))
+
+    @staticmethod
+    def _in_range(record: Dict, min_price: Optional[float], max_price: Optional[float],
+                  in_stock_only: bool) -> bool:
+        return (
+            (min_price is None or record["price"] >= min_price)
+            and (max_price is None or record["price"] <= max_price)
+            and (not in_stock_only or record["quantity"] > 0)
+        )
 
     @classmethod
     def get_item(cls, item_id: str) -> Optional[Item]:
-        items = FileHandler.read_data(cls.INVENTORY_FILE)
-        item_data = next((i for i in items if i["item_id"] == item_id), None)
-        return Item.from_dict(item_data) if item_data else None 
\ No newline at end of file
+        item_data = InventoryRepository.get(item_id)
+        return Item.from_dict(item_data) if item_data else None 
+
+    @classmethod
+    def get_items(cls, item_ids: Iterable[str]) -> Dict[str, Item]:
+        """item_id -> Item for each of item_ids in the inventory, read in one pass"""
+        return {item_id: Item.from_dict(record) for item_id, record in cls.get_item_records(item_ids).items()}
+
+    @classmethod
+    def get_item_records(cls, item_ids: Iterable[str]) -> Dict[str, Dict]:
+        """As get_items, but the stored records, for callers that write them back"""
+        return InventoryRepository.get_many(item_ids)
@@ -0,0 +1,62 @@
+import csv
+import json
+import os
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from ..repositories.inventory_repository import InventoryRepository
+from .inventory_service import InventoryService
+
+class InventoryTransfer:
+    """Streaming CSV and JSON Lines import/export of the inventory"""
+
+    FIELDS = ["item_id", "name", "price", "quantity", "description", "reorder_point"]
+    FORMATS = ("csv", "jsonl")
+
+    @classmethod
+    def detect_format(cls, path: str, fmt: Optional[str] = None) -> str:
+        fmt = fmt or os.path.splitext(path)[1].lstrip(".").lower()
+        if fmt == "json":
+            fmt = "jsonl"
+        if fmt not in cls.FORMATS:
+            raise ValueError(f"Unknown import/export format {fmt!r}; use csv or jsonl")
+        return fmt
+
+    @classmethod
+    def read_rows(cls, path: str, fmt: str) -> Iterator[Optional[Dict]]:
+        """One row at a time; None for a JSON Lines row that cannot be parsed"""
+        if fmt == "csv":
+            with open(path, newline="", encoding="utf-8-sig") as file:
+                yield from csv.DictReader(file)
+            return
+        with open(path, encoding="utf-8") as file:
+            for line in file:
+                if not line.strip():
+                    continue
+                try:
+                    yield json.loads(line)
+                except json.JSONDecodeError:
+                    yield None
+
+    @classmethod
+    def import_file(cls, path: str, fmt: Optional[str] = None, strict: bool = False) -> Tuple[bool, str, List[str]]:
+        """Add or update the items in a CSV (with a header row) or JSON Lines file with one write"""
+        fmt = cls.detect_format(path, fmt)
+        # Data rows of a CSV file start on line 2
+        return InventoryService.bulk_upsert(cls.read_rows(path, fmt), strict=strict, first_row=2 if fmt == "csv" else 1)
+
+    @classmethod
+    def export_file(cls, path: str, fmt: Optional[str] = None) -> int:
+        """Write every item to path, one row at a time. Returns the number of items written"""
+        fmt = cls.detect_format(path, fmt)
+        count = 0
+        with open(path, "w", newline="", encoding="utf-8") as file:
+            if fmt == "csv":
+                writer = csv.DictWriter(file, fieldnames=cls.FIELDS, extrasaction="ignore")
+                writer.writeheader()
+            for record in InventoryRepository.all():
+                if fmt == "csv":
+                    writer.writerow(record)
+                else:
+                    file.write(json.dumps(record) + "\n")
+                count += 1
+        return count
@@ -1,13 +1,22 @@
-from typing import List, Tuple, Dict
+from typing import List, Tuple, Dict, Optional
 from datetime import datetime
 from ..models.user import User
 from ..models.item import Item
 from ..utils.file_handler import FileHandler
+from ..utils.instrumentation import Instrumentation
+from ..utils.pagination import decode_cursor, encode_cursor, keyset_page
+from ..repositories.cart_repository import CartRepository
+from ..repositories.inventory_repository import InventoryRepository
+from ..repositories.order_repository import OrderRepository
+from ..repositories.sales_repository import SalesRepository
+from ..repositories.user_repository import UserRepository
 from .inventory_service import InventoryService
 
 class OrderService:
+    # Shared cart file from before carts were stored per user; only read to import it
     CART_FILE = "data/cart.txt"
-    ORDERS_FILE = "data/orders.txt"
+    ORDERS_FILE = OrderRepository.ORDERS_FILE
+    ORDER_STATUSES = ("processing", "shipped", "delivered")
 
     @classmethod
     def add_to_cart(cls, user: User, item_id: str, quantity: int) -> Tuple[bool, str]:
@@ -21,74 +30,225 @@ class OrderService:
         if item.quantity < quantity:
             return False, "Insufficient stock"
 
-        cart_data = {
-            "username": user.username,
-            "item_id": item_id,
-            "quantity": quantity,
-            "timestamp": datetime.now().isoformat()
-        }
-
-        FileHandler.append_data(cls.CART_FILE, cart_data)
+        CartRepository.add(user.username, item_id, quantity)
         return True, "Item added to cart"
 
     @classmethod
     def get_cart(cls, username: str) -> List[Dict]:
-        all_cart_items = FileHandler.read_data(cls.CART_FILE)
-        return [item for item in all_cart_items if item["username"] == username]
+        return CartRepository.get(username)
+
+    @classmethod
+    def price_cart(cls, cart_items: List[Dict], stock: Optional[Dict[str, Dict]] = None) -> Tuple[List[Dict], float]:
+        """
+        Each cart line with the item's name, unit price and subtotal, and the cart
+        total, all from one inventory snapshot: stock (item_id -> record) if given,
+        otherwise one read now. Lines for items no longer stocked are left out.
+        """
+        if stock is None:
+            stock = InventoryService.get_item_records(cart_item["item_id"] for cart_item in cart_items)
+        lines = []
+        total = 0
+        for cart_item in cart_items:
+            item = stock.get(cart_item["item_id"])
+            if not item:
+                continue
+            subtotal = item["price"] * cart_item["quantity"]
+            lines.append({**cart_item, "name": item["name"], "price": item["price"], "subtotal": subtotal})
+            total += subtotal
+        return lines, total
 
     @classmethod
     def checkout(cls, username: str) -> Tuple[bool, str]:
+        # Hold every file checkout touches so concurrent sessions cannot oversell
+        try:
+            with FileHandler.locked(
+                InventoryRepository.INVENTORY_FILE, CartRepository.shard(username), cls.ORDERS_FILE,
+                OrderRepository.INDEX_FILE
+            ):
+                return cls._checkout(username)
+        except OSError as e:
+            # With the write-ahead log the block's changes are written when it exits.
+            # If logging them failed they were discarded and the cart is unchanged;
+            # if only the fsync after it failed, the order was placed but may not survive a crash
+            if cls.get_cart(username):
+                return False, f"Checkout failed, no changes were made: {e}"
+            return False, f"Order placed but not confirmed on disk: {e}. Check your orders before checking out again"
+
+    @classmethod
+    def _checkout(cls, username: str) -> Tuple[bool, str]:
         cart_items = cls.get_cart(username)
         if not cart_items:
             return False, "Cart is empty"
 
-        # Verify stock and calculate total
-        total = 0
+        # Verify stock and price the cart against a single inventory snapshot,
+        # accumulating repeated lines for the same item
+        stock = InventoryService.get_item_records(cart_item["item_id"] for cart_item in cart_items)
+        updated_stock = {}
         for cart_item in cart_items:
-            item = InventoryService.get_item(cart_item["item_id"])
-            if not item or item.quantity < cart_item["quantity"]:
-                return False, f"Insufficient stock for item {cart_item['item_id']}"
-            total += item.price * cart_item["quantity"]
+            item_id = cart_item["item_id"]
+            item = updated_stock.get(item_id) or stock.get(item_id)
+            if not item or item["quantity"] < cart_item["quantity"]:
+                return False, f"Insufficient stock for item {item_id}"
+            updated_stock[item_id] = {**item, "quantity": item["quantity"] - cart_item["quantity"]}
+
+        lines, total = cls.price_cart(cart_items, stock)
+        # Record the unit price charged so revenue per item can be reported later
+        order_items = [{**cart_item, "price": line["price"]} for cart_item, line in zip(cart_items, lines)]
 
         # Create order
         order = {
             "username": username,
-            "items": cart_items,
+            "items": order_items,
             "total": total,
             "status": "processing",
             "timestamp": datetime.now().isoformat()
         }
 
-        # Update inventory
-        for cart_item in cart_items:
-            success, msg = InventoryService.update_item_quantity(
-                cart_item["item_id"],
-                -cart_item["quantity"]
+        # Commit with one write per file, undoing earlier steps if a later one fails
+        steps_done = []
+        try:
+            InventoryRepository.upsert_many(updated_stock.values())
+            steps_done.append("inventory")
+            cls.clear_cart(username)
+            steps_done.append("cart")
+            order = OrderRepository.append(order)
+        except Exception as e:
+            cls._rollback_checkout(username, steps_done, stock, cart_items)
+            return False, f"Checkout failed, no changes were made: {e}"
+
+        # The aggregates are derived data and no failure here, even from a malformed
+        # aggregates record, may undo or hide a placed order
+        try:
+            SalesRepository.record_order(order)
+        except Exception as e:
+            Instrumentation.record_failure(
+                "sales_aggregates", e,
+                "Run 'python main.py check-sales' to compare the totals and 'python main.py rebuild-sales' to fix them"
             )
-            if not success:
-                return False, f"Failed to update inventory: {msg}"
 
-        # Save order and clear cart
-        FileHandler.append_data(cls.ORDERS_FILE, order)
-        cls.clear_cart(username)
-        return True, f"Order placed successfully. Total: ${total:.2f}"
+        return True, f"Order #{order['order_id']} placed successfully. Total: ${total:.2f}"
+
+    @classmethod
+    def _rollback_checkout(cls, username: str, steps_done: List[str], stock: Dict[str, Dict],
+                           cart_items: List[Dict]) -> None:
+        if "cart" in steps_done:
+            CartRepository.replace(username, cart_items)
+        if "inventory" in steps_done:
+            InventoryRepository.upsert_many(stock.values())
 
     @classmethod
     def clear_cart(cls, username: str) -> None:
-        cart_items = FileHandler.read_data(cls.CART_FILE)
-        updated_cart = [item for item in cart_items if item["username"] != username]
-        FileHandler.write_data(cls.CART_FILE, updated_cart)
+        CartRepository.clear(username)
 
     @classmethod
     def get_orders(cls, username: str = None) -> List[Dict]:
-        orders = FileHandler.read_data(cls.ORDERS_FILE)
         if username:
-            return [order for order in orders if order["username"] == username]
-        return orders
+            # Read through the order index, without loading anyone else's orders
+            return OrderRepository.for_user(username)
+        return FileHandler.read_data(cls.ORDERS_FILE)
+
+    @classmethod
+    def get_order(cls, order_id: int) -> Optional[Dict]:
+        return OrderRepository.get(order_id)
+
+    @classmethod
+    def get_user_orders(cls, username: str, since: Optional[str] = None, until: Optional[str] = None) -> List[Dict]:
+        """username's orders placed at or after since and before until (ISO timestamps), oldest first"""
+        return OrderRepository.for_user(username, since, until)
+
+    @classmethod
+    def update_order_status(cls, order_id: int, status: str) -> Tuple[bool, str]:
+        if status not in cls.ORDER_STATUSES:
+            return False, f"Invalid status. Choose from: {', '.join(cls.ORDER_STATUSES)}"
+        if OrderRepository.update(order_id, {"status": status}) is None:
+            return False, "Order not found"
+        return True, f"Order #{order_id} marked as {status}"
+
+    @classmethod
+    def rebuild_order_index(cls) -> int:
+        return OrderRepository.rebuild()
+
+    @classmethod
+    def get_orders_page(cls, username: Optional[str] = None, page_size: int = 20, cursor: Optional[str] = None,
+                        sort: str = "-timestamp", status: Optional[str] = None, since: Optional[str] = None,
+                        until: Optional[str] = None) -> Tuple[List[Dict], Optional[str]]:
+        """
+        One page of orders and the cursor of the next page, None on the last page.
+        sort is "timestamp" or "total", prefixed with "-" for descending order.
+        Filters: username, status, and placed at or after since and before until
+        (ISO timestamps). Pass the returned cursor back with the same sort and
+        filters to continue; raises ValueError for an unknown sort or a cursor
+        that no longer matches the order history.
+
+        Orders are appended as they are placed, so timestamp order is storage
+        order: those pages are read from the cursor's position onwards and only
+        as far as the page needs. Sorting by total reads the whole history.
+        """
+        if page_size <= 0:
+            raise ValueError("Page size must be positive")
+        descending = sort.startswith("-")
+
+        def accept(order: Dict) -> bool:
+            return (
+                (username is None or order["username"] == username)
+                and (status is None or order["status"] == status)
+                and (since is None or order["timestamp"] >= since)
+                and (until is None or order["timestamp"] < until)
+            )
+
+        if sort in ("total", "-total"):
+            keyed = sorted(
+                ((order["total"], position), order)
+                for position, order in FileHandler.scan(cls.ORDERS_FILE) if accept(order)
+            )
+            return keyset_page([pair[0] for pair in keyed], [pair[1] for pair in keyed], sort, page_size,
+                               cursor, descending)
+        if sort not in ("timestamp", "-timestamp"):
+            raise ValueError(f"Unknown sort key: {sort}")
+
+        start = None if cursor is None else decode_cursor(cursor, sort)[0]
+        page = []
+        for position, order in FileHandler.scan(cls.ORDERS_FILE, start, reverse=descending):
+            # Past the end of the time window there is nothing more to find
+            if (until is not None and not descending and order["timestamp"] >= until) or \
+                    (since is not None and descending and order["timestamp"] < since):
+                break
+            if accept(order):
+                if len(page) == page_size:
+                    return page, encode_cursor(sort, position)
+                page.append(order)
+        return page, None
+
+    @classmethod
+    def get_sales_aggregates(cls) -> Dict:
+        return SalesRepository.get()
+
+    @classmethod
+    def rebuild_sales_aggregates(cls) -> Dict:
+        return SalesRepository.rebuild(cls.ORDERS_FILE)
+
+    @classmethod
+    def check_sales_aggregates(cls) -> List[str]:
+        return SalesRepository.check(cls.ORDERS_FILE)
+
+    @classmethod
+    def rebuild_cart_index(cls) -> int:
+        return CartRepository.rebuild_index(user["username"] for user in UserRepository.all())
+
+    @classmethod
+    def check_cart_index(cls) -> List[str]:
+        return CartRepository.check_index(user["username"] for user in UserRepository.all())
 
     @classmethod
     def remove_item_from_all_carts(cls, item_id: str) -> None:
-        cart_items = FileHandler.read_data(cls.CART_FILE)
-        # Remove the item from all carts
-        updated_cart = [item for item in cart_items if item["item_id"] != item_id]
-        FileHandler.write_data(cls.CART_FILE, updated_cart) 
\ No newline at end of file
+        CartRepository.remove_item(item_id)
+
+    @classmethod
+    def get_carts_with_item(cls, item_id: str) -> Dict[str, Dict]:
+        """username -> cart line for each customer with item_id in their cart"""
+        return CartRepository.lines_for_item(item_id)
+
+# Orders, their index and the legacy shared cart are appended to rather than rewritten, so store them as JSON Lines
+FileHandler.use_json_lines(OrderService.CART_FILE)
+FileHandler.use_json_lines(OrderService.ORDERS_FILE)
+FileHandler.use_json_lines(OrderRepository.INDEX_FILE)
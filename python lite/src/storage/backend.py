@@ -0,0 +1,160 @@
+from contextlib import contextmanager
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+def apply_update(records: List[Dict], key: str, upserts: Iterable[Dict] = (), deletes: Iterable[Any] = ()) -> None:
+    """
+    Apply keyed changes to records in place: each upsert replaces the record with
+    the same key or is appended, and each key in deletes removes its record.
+    Keys are expected to be unique.
+    """
+    positions: Dict[Any, int] = {}
+    for i, record in enumerate(records):
+        positions.setdefault(record.get(key), i)
+    for record in upserts:
+        i = positions.get(record[key])
+        if i is None:
+            positions[record[key]] = len(records)
+            records.append(record)
+        else:
+            records[i] = record
+    deleted = {positions[value] for value in deletes if value in positions}
+    if deleted:
+        records[:] = [record for i, record in enumerate(records) if i not in deleted]
+
+def add_deltas(record: Dict, deltas: Dict) -> Dict:
+    """Copy of record with each number in deltas added to it, recursing into nested dicts"""
+    result = dict(record)
+    for name, delta in deltas.items():
+        if isinstance(delta, dict):
+            result[name] = add_deltas(record.get(name) or {}, delta)
+        else:
+            result[name] = record.get(name, 0) + delta
+    return result
+
+class StorageBackend:
+    """
+    Record storage used by FileHandler. Collections are still addressed by their
+    data file name (e.g. "data/users.txt") whatever the backend keeps them in.
+    """
+
+    def __init__(self):
+        self._lock_stats: Dict[str, float] = {
+            "acquisitions": 0,
+            "contended": 0,
+            "total_wait_seconds": 0.0,
+            "max_wait_seconds": 0.0
+        }
+
+    def initialize(self, filenames: Iterable[str]) -> None:
+        """Create empty collections for any of filenames that don't exist yet"""
+        raise NotImplementedError
+
+    def read_data(self, filename: str) -> List[Dict]:
+        raise NotImplementedError
+
+    def iter_data(self, filename: str) -> Iterator[Dict]:
+        yield from self.read_data(filename)
+
+    def scan(self, filename: str, start: Optional[int] = None, reverse: bool = False) -> Iterator[Tuple[int, Dict]]:
+        """
+        (position, record) pairs in storage order, or last to first with reverse,
+        beginning with the record at position start (the first or last record if
+        None). Positions stay valid while records are only appended, so a reader
+        can stop and later resume where it left off.
+        """
+        records = self.read_data(filename)
+        if reverse:
+            first = len(records) - 1 if start is None else min(start, len(records) - 1)
+            positions = range(first, -1, -1)
+        else:
+            positions = range(start or 0, len(records))
+        for position in positions:
+            yield position, records[position]
+
+    def write_data(self, filename: str, data: List[Dict]) -> None:
+        raise NotImplementedError
+
+    def append_data(self, filename: str, data: Dict) -> None:
+        raise NotImplementedError
+
+    def update_records(self, filename: str, key: str, upserts: Iterable[Dict] = (),
+                       deletes: Iterable[Any] = ()) -> None:
+        """Insert or replace upserts and remove the records whose key is in deletes (see apply_update)"""
+        with self.locked(filename):
+            records = self.read_data(filename)
+            apply_update(records, key, upserts, deletes)
+            self.write_data(filename, records)
+
+    def update_at(self, filename: str, position: int, record: Dict) -> None:
+        """
+        Replace the record at scan position (see scan) with record. Raises
+        ValueError if no record starts there.
+        """
+        with self.locked(filename):
+            records = self.read_data(filename)
+            if not 0 <= position < len(records):
+                raise ValueError(f"Position {position} is not the start of a record in {filename}")
+            records[position] = record
+            self.write_data(filename, records)
+
+    def accumulate(self, filename: str, deltas: Dict) -> None:
+        """Add deltas to the numbers in the collection's single record (see add_deltas), creating it if needed"""
+        with self.locked(filename):
+            records = self.read_data(filename)
+            self.write_data(filename, [add_deltas(records[0] if records else {}, deltas)] + records[1:])
+
+    def version(self, filename: str) -> int:
+        """Persistent counter bumped by every write to filename"""
+        raise NotImplementedError
+
+    def generation(self, filename: str) -> int:
+        """Counter that changes whenever the contents of filename may have changed"""
+        return self.version(filename)
+
+    @contextmanager
+    def locked(self, *filenames: str) -> Iterator[None]:
+        """Exclusive, re-entrant lock over filenames for the duration of the block"""
+        raise NotImplementedError
+        yield
+
+    def _record_lock_wait(self, wait: float, contended: bool) -> None:
+        stats = self._lock_stats
+        stats["acquisitions"] += 1
+        stats["total_wait_seconds"] += wait
+        stats["max_wait_seconds"] = max(stats["max_wait_seconds"], wait)
+        if contended:
+            stats["contended"] += 1
+
+    def lock_stats(self) -> Dict[str, float]:
+        """
+        Lock acquisitions and waits. Every read-check-write cycle runs under
+        locked(), so a writer that would have conflicted with another waits for
+        it instead of retrying: "contended" counts those writers.
+        """
+        return dict(self._lock_stats)
+
+    def cache_stats(self) -> Dict[str, Any]:
+        return {}
+
+    def clear_cache(self) -> None:
+        pass
+
+    def recover(self) -> Optional[Dict[str, Any]]:
+        """Bring storage back to its last committed state after a crash. Returns recovery statistics, if any"""
+        return None
+
+    def compact_log(self) -> Optional[List[str]]:
+        """Fold a write-ahead log into the data files. Returns the files rewritten, or None without a log"""
+        return None
+
+def create_backend(name: str, **options: Any) -> StorageBackend:
+    if name == "json":
+        if options.get("wal"):
+            from .wal_backend import WalBackend
+            return WalBackend(options.get("wal_path"))
+        from .json_backend import JsonFileBackend
+        return JsonFileBackend()
+    if name == "sqlite":
+        from .sqlite_backend import SQLiteBackend
+        return SQLiteBackend(options.get("path"))
+    raise ValueError(f"Unknown storage backend: {name}")
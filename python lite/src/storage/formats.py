@@ -0,0 +1,86 @@
+"""
+Serialization formats of the JSON file backend. Each format is recognisable
+from the start of the file, so a file is read correctly whatever format it was
+last written in and switching formats only affects future writes.
+"""
+import json
+import marshal
+from typing import Dict, Iterable, Iterator, List, Optional
+
+# Indented JSON array, as the data files have always been written
+JSON = "json"
+# JSON array without indentation or padding
+COMPACT = "compact"
+# marshal-encoded list of records behind a versioned header
+BINARY = "binary"
+# One JSON record per line; used for append-heavy files (see FileHandler.use_json_lines)
+JSON_LINES = "jsonl"
+
+# Formats that can be selected for a file
+FORMATS = (JSON, COMPACT, BINARY)
+
+# Binary files start with MAGIC followed by a one-byte format version. 0x93 can
+# never begin a JSON document.
+MAGIC = b"\x93RTL"
+BINARY_VERSION = 1
+
+def encode(records: List[Dict], fmt: str) -> bytes:
+    if fmt == JSON:
+        return json.dumps(records, indent=4).encode()
+    if fmt == COMPACT:
+        return json.dumps(records, separators=(",", ":")).encode()
+    if fmt == BINARY:
+        return MAGIC + bytes([BINARY_VERSION]) + marshal.dumps(records)
+    if fmt == JSON_LINES:
+        return "".join(json.dumps(record) + "\n" for record in records).encode()
+    raise ValueError(f"Unknown file format: {fmt}")
+
+def detect(head: bytes) -> Optional[str]:
+    """
+    Format of data starting with head: BINARY, JSON (any JSON array, indented or
+    not) or JSON_LINES. None if head is empty or only whitespace.
+    """
+    if head.startswith(MAGIC):
+        return BINARY
+    head = head.lstrip()
+    if not head:
+        return None
+    return JSON if head[:1] == b"[" else JSON_LINES
+
+def decode(raw: bytes) -> List[Dict]:
+    fmt = detect(raw)
+    if fmt is None:
+        return []
+    if fmt == BINARY:
+        version = raw[len(MAGIC)] if len(raw) > len(MAGIC) else None
+        if version != BINARY_VERSION:
+            raise ValueError(f"Unsupported binary data file version: {version}")
+        return marshal.loads(raw[len(MAGIC) + 1:])
+    if fmt == JSON:
+        return json.loads(raw)
+    return list(_decode_lines(raw.splitlines()))
+
+def decode_lines(lines: Iterable[bytes]) -> Iterator[Dict]:
+    """Records from JSON Lines, skipping blank and torn lines"""
+    return _decode_lines(lines)
+
+def decode_line(line: bytes) -> Optional[Dict]:
+    """One JSON Lines record, or None for a blank or torn line"""
+    return _decode_line(line)
+
+def _decode_line(line: bytes) -> Optional[Dict]:
+    # Used by decode_lines too, so instrumenting decode_line doesn't count their lines twice
+    line = line.strip()
+    if not line:
+        return None
+    try:
+        return json.loads(line)
+    except json.JSONDecodeError:
+        # A torn final line from an interrupted append
+        return None
+
+def _decode_lines(lines):
+    for line in lines:
+        record = _decode_line(line)
+        if record is not None:
+            yield record
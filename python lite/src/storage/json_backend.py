@@ -0,0 +1,357 @@
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import List, Dict, Any, Optional, Tuple, Iterator, Iterable
+
+from . import formats
+from .backend import StorageBackend
+from .. import config
+
+try:
+    import fcntl
+except ImportError:  # Windows: only threads within this process are serialized
+    fcntl = None
+
+# Bytes read at a time when scanning a JSON Lines file backwards
+SCAN_BLOCK_SIZE = 64 * 1024
+
+class JsonFileBackend(StorageBackend):
+    """One JSON (or JSON Lines) file per collection, as in the original data/ layout"""
+
+    # Files stored as append-only JSON Lines (one record per line) instead of a JSON array.
+    # Shared by every instance so registrations survive switching backends.
+    json_lines_files: set = set()
+    # Serialization per file (see formats.FORMATS); files not listed use config.FILE_FORMAT
+    file_formats: Dict[str, str] = dict(config.FILE_FORMATS)
+
+    def __init__(self):
+        super().__init__()
+        # Parsed file contents keyed by filename: ((mtime_ns, size, version), records)
+        self._cache: Dict[str, Tuple[Tuple[int, int, int], List[Dict]]] = {}
+        self._stats: Dict[str, int] = {"hits": 0, "misses": 0}
+        # Bumped every time a file's cached contents are reloaded or written
+        self._generations: Dict[str, int] = {}
+        # filename -> {"lock": RLock, "fd": lock file descriptor, "owner": thread id, "depth": re-entry count}
+        self._locks: Dict[str, Dict[str, Any]] = {}
+        self._locks_guard = threading.Lock()
+
+    def initialize(self, filenames: Iterable[str]) -> None:
+        for filename in filenames:
+            if not os.path.exists(filename):
+                with open(filename, 'wb') as file:
+                    # JSON Lines files start out empty rather than as an empty array
+                    if not self.is_json_lines(filename):
+                        file.write(formats.encode([], self.format_of(filename)))
+            elif self.is_json_lines(filename):
+                # One-time conversion of files written before the JSON Lines format
+                self.migrate_to_json_lines(filename)
+
+    def _stat(self, filename: str) -> Optional[Tuple[int, int, int]]:
+        try:
+            st = os.stat(filename)
+        except OSError:
+            return None
+        # mtime comes from a coarse clock, so two quick same-size writes can share it;
+        # the write counter tells them apart
+        return st.st_mtime_ns, st.st_size, self.version(filename)
+
+    def is_json_lines(self, filename: str) -> bool:
+        return filename in self.json_lines_files
+
+    def format_of(self, filename: str) -> str:
+        """Format filename is written in"""
+        if self.is_json_lines(filename):
+            return formats.JSON_LINES
+        return self.file_formats.get(filename, config.FILE_FORMAT)
+
+    @staticmethod
+    def _detect(filename: str) -> Optional[str]:
+        """Format the file is currently stored in, or None if it is empty"""
+        with open(filename, 'rb') as file:
+            head = b""
+            while True:
+                chunk = file.read(64)
+                head += chunk
+                fmt = formats.detect(head)
+                if fmt is not None or not chunk:
+                    return fmt
+
+    def iter_data(self, filename: str) -> Iterator[Dict]:
+        """Stream records one at a time; JSON Lines files are read line by line, other formats whole"""
+        if not os.path.exists(filename):
+            return
+        if self._detect(filename) == formats.JSON_LINES:
+            with open(filename, 'rb') as file:
+                yield from formats.decode_lines(file)
+        else:
+            yield from self._load(filename)
+
+    def scan(self, filename: str, start: Optional[int] = None, reverse: bool = False) -> Iterator[Tuple[int, Dict]]:
+        """
+        Positions in JSON Lines files are byte offsets: reading seeks straight to
+        start and parses only the lines actually consumed, in either direction.
+        Other formats are loaded whole and positions are list indexes.
+        """
+        if not os.path.exists(filename) or self._detect(filename) != formats.JSON_LINES:
+            yield from super().scan(filename, start, reverse)
+            return
+        with open(filename, 'rb') as file:
+            if start is not None and not self._is_line_start(file, start):
+                raise ValueError(f"Position {start} is not the start of a record in {filename}")
+            lines = self._lines_backward(file, start) if reverse else self._lines_forward(file, start or 0)
+            for position, line in lines:
+                record = formats.decode_line(line)
+                if record is not None:
+                    yield position, record
+
+    @staticmethod
+    def _is_line_start(file, offset: int) -> bool:
+        # Offsets handed out earlier stop lining up with records once the file is rewritten
+        if offset == 0:
+            return True
+        if not 0 < offset < os.fstat(file.fileno()).st_size:
+            return False
+        file.seek(offset - 1)
+        return file.read(1) == b"\n"
+
+    @staticmethod
+    def _lines_forward(file, start: int) -> Iterator[Tuple[int, bytes]]:
+        file.seek(start)
+        position = start
+        for line in file:
+            yield position, line
+            position += len(line)
+
+    @staticmethod
+    def _lines_backward(file, start: Optional[int]) -> Iterator[Tuple[int, bytes]]:
+        if start is None:
+            end = os.fstat(file.fileno()).st_size
+        else:
+            file.seek(start)
+            end = start + len(file.readline())
+
+        # Read blocks from the end; the partial line at the front of each block is
+        # carried over and completed by the block before it
+        position, carried = end, b""
+        while position > 0:
+            size = min(SCAN_BLOCK_SIZE, position)
+            position -= size
+            file.seek(position)
+            lines = (file.read(size) + carried).split(b"\n")
+            offsets, offset = [], position
+            for line in lines:
+                offsets.append(offset)
+                offset += len(line) + 1
+            for i in range(len(lines) - 1, 0, -1):
+                yield offsets[i], lines[i]
+            carried = lines[0]
+        yield 0, carried
+
+    @staticmethod
+    def _load(filename: str) -> List[Dict]:
+        try:
+            with open(filename, 'rb') as file:
+                return formats.decode(file.read())
+        except json.JSONDecodeError:
+            return []
+
+    def _records(self, filename: str) -> List[Dict]:
+        # Returns the cached list itself; callers outside this class get a copy via read_data
+        stamp = self._stat(filename)
+        if stamp is None:
+            if self._cache.pop(filename, None) is not None:
+                self._bump(filename)
+            return []
+
+        cached = self._cache.get(filename)
+        if cached and cached[0] == stamp:
+            self._stats["hits"] += 1
+            return cached[1]
+
+        self._stats["misses"] += 1
+        data = self._load(filename)
+        self._cache[filename] = (stamp, data)
+        self._bump(filename)
+        return data
+
+    def _bump(self, filename: str) -> None:
+        self._generations[filename] = self._generations.get(filename, 0) + 1
+
+    def generation(self, filename: str) -> int:
+        self._records(filename)
+        return self._generations.get(filename, 0)
+
+    def read_data(self, filename: str) -> List[Dict]:
+        return list(self._records(filename))
+
+    def write_data(self, filename: str, data: List[Dict]) -> None:
+        os.makedirs(os.path.dirname(filename), exist_ok=True)
+        with self.locked(filename):
+            # Write a temporary file and swap it in, so readers that don't take
+            # the lock never see a half-written file
+            temp_filename = filename + ".tmp"
+            with open(temp_filename, 'wb') as file:
+                file.write(formats.encode(data, self.format_of(filename)))
+            os.replace(temp_filename, filename)
+            self._bump_version(filename)
+            # Write-through: keep what we just wrote so the next read skips parsing
+            stamp = self._stat(filename)
+            if stamp is not None:
+                self._cache[filename] = (stamp, list(data))
+            self._bump(filename)
+
+    def append_data(self, filename: str, data: Dict) -> None:
+        with self.locked(filename):
+            if self.is_json_lines(filename):
+                self._append_line(filename, data)
+            else:
+                self.write_data(filename, self.read_data(filename) + [data])
+
+    def _append_line(self, filename: str, data: Dict) -> None:
+        self.migrate_to_json_lines(filename)
+        before = self._stat(filename)
+        with open(filename, 'ab') as file:
+            file.write(formats.encode([data], formats.JSON_LINES))
+        self._bump_version(filename)
+
+        # Extend the cached copy only if it was current before our append
+        cached = self._cache.get(filename)
+        after = self._stat(filename)
+        if cached and before and cached[0] == before and after:
+            cached[1].append(data)
+            self._cache[filename] = (after, cached[1])
+        else:
+            self._cache.pop(filename, None)
+        self._bump(filename)
+
+    def update_at(self, filename: str, position: int, record: Dict) -> None:
+        """
+        In a JSON Lines file the record's line is overwritten in place, padded with
+        spaces to its old length, so no other record moves. A record too long for
+        its line rewrites the file instead, which moves every record after it.
+        """
+        with self.locked(filename):
+            if not os.path.exists(filename) or self._detect(filename) != formats.JSON_LINES:
+                super().update_at(filename, position, record)
+                return
+            line = formats.encode([record], formats.JSON_LINES)
+            with open(filename, 'r+b') as file:
+                if not self._is_line_start(file, position):
+                    raise ValueError(f"Position {position} is not the start of a record in {filename}")
+                file.seek(position)
+                old_line = file.readline()
+                fits = old_line.endswith(b"\n") and len(line) <= len(old_line)
+                if fits:
+                    file.seek(position)
+                    file.write(line[:-1] + b" " * (len(old_line) - len(line)) + b"\n")
+            if not fits:
+                records = [record if at == position else existing for at, existing in self.scan(filename)]
+                self.write_data(filename, records)
+                return
+            self._bump_version(filename)
+            self._cache.pop(filename, None)
+            self._bump(filename)
+
+    def migrate_to_json_lines(self, filename: str) -> bool:
+        """Rewrite a JSON array or binary file as JSON Lines. Returns True if the file was converted"""
+        if not os.path.exists(filename) or self._detect(filename) in (None, formats.JSON_LINES):
+            return False
+        records = self._load(filename)
+        self.json_lines_files.add(filename)
+        self.write_data(filename, records)
+        return True
+
+    @staticmethod
+    def _lock_path(filename: str) -> str:
+        return filename + ".lock"
+
+    @contextmanager
+    def locked(self, *filenames: str) -> Iterator[None]:
+        """
+        Hold an exclusive advisory lock on each file for the duration of the block.
+        Locks are re-entrant within a thread and always taken in sorted order so
+        that callers locking overlapping sets of files cannot deadlock.
+        """
+        acquired = []
+        try:
+            for filename in sorted(set(filenames)):
+                self._acquire(filename)
+                acquired.append(filename)
+            yield
+        finally:
+            for filename in reversed(acquired):
+                self._release(filename)
+
+    def _acquire(self, filename: str) -> None:
+        with self._locks_guard:
+            state = self._locks.setdefault(
+                filename, {"lock": threading.RLock(), "fd": None, "owner": None, "depth": 0}
+            )
+
+        start = time.perf_counter()
+        contended = not state["lock"].acquire(blocking=False)
+        if contended:
+            state["lock"].acquire()
+
+        if state["depth"] == 0:
+            directory = os.path.dirname(filename)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            fd = os.open(self._lock_path(filename), os.O_RDWR | os.O_CREAT, 0o644)
+            if fcntl:
+                try:
+                    fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                except BlockingIOError:
+                    contended = True
+                    fcntl.flock(fd, fcntl.LOCK_EX)
+            state["fd"] = fd
+            state["owner"] = threading.get_ident()
+        state["depth"] += 1
+
+        self._record_lock_wait(time.perf_counter() - start, contended)
+
+    def _release(self, filename: str) -> None:
+        state = self._locks[filename]
+        state["depth"] -= 1
+        if state["depth"] == 0:
+            fd, state["fd"], state["owner"] = state["fd"], None, None
+            if fcntl:
+                fcntl.flock(fd, fcntl.LOCK_UN)
+            os.close(fd)
+        state["lock"].release()
+
+    def version(self, filename: str) -> int:
+        # Stored in the file's lock file
+        state = self._locks.get(filename)
+        try:
+            if state and state["owner"] == threading.get_ident():
+                os.lseek(state["fd"], 0, os.SEEK_SET)
+                raw = os.read(state["fd"], 32)
+            else:
+                with open(self._lock_path(filename), 'rb') as file:
+                    raw = file.read(32)
+            return int(raw or 0)
+        except (OSError, ValueError):
+            return 0
+
+    def _bump_version(self, filename: str) -> None:
+        # Only called with the lock held
+        fd = self._locks[filename]["fd"]
+        version = self.version(filename) + 1
+        os.ftruncate(fd, 0)
+        os.lseek(fd, 0, os.SEEK_SET)
+        os.write(fd, str(version).encode())
+
+    def cache_stats(self) -> Dict[str, Any]:
+        return {
+            "hits": self._stats["hits"],
+            "misses": self._stats["misses"],
+            "files": len(self._cache)
+        }
+
+    def clear_cache(self) -> None:
+        self._cache.clear()
+        self._stats["hits"] = 0
+        self._stats["misses"] = 0
@@ -0,0 +1,15 @@
+from typing import Dict, Iterable
+
+from .backend import StorageBackend
+from .json_backend import JsonFileBackend
+
+def import_json_files(target: StorageBackend, filenames: Iterable[str]) -> Dict[str, int]:
+    """Copy each JSON / JSON Lines data file into target, replacing what it held. Returns record counts"""
+    source = JsonFileBackend()
+    counts = {}
+    with target.locked(*filenames):
+        for filename in filenames:
+            records = list(source.iter_data(filename))
+            target.write_data(filename, records)
+            counts[filename] = len(records)
+    return counts
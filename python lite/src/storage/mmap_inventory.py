@@ -0,0 +1,352 @@
+import json
+import mmap
+import os
+import struct
+import threading
+import time
+import zlib
+from contextlib import contextmanager
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+# <path>.dat: a header followed by one fixed-width slot per item, accessed through mmap
+HEADER = struct.Struct("<8sQQ")  # magic, version, slots used
+MAGIC = b"RTLINV\x00\x01"
+# live flag, quantity, price, reorder point (-1 if the record has none), then (offset, length) into the heap
+# for item_id, name, description and a JSON object holding any other fields
+SLOT = struct.Struct("<B7xqdqQIQIQIQI")
+STRING_FIELDS = ("item_id", "name", "description")
+FIXED_FIELDS = ("quantity", "price", "reorder_point")
+INITIAL_SLOTS = 64
+# <path>.journal: the last batch of slot writes, synced before any of them is made to <path>.dat.
+# Version and slots used after the batch, number of slots, whether a new heap follows and its length;
+# then each slot number with its SLOT bytes, the heap if any, and a CRC-32 of everything before it.
+JOURNAL = struct.Struct("<QQQBQ")
+JOURNAL_SLOT = struct.Struct("<Q")
+CRC = struct.Struct("<I")
+
+class MmapInventoryStore:
+    """
+    Inventory records as fixed-width slots in a memory-mapped file, with an
+    item_id -> slot index kept in memory. Changing an item's quantity, price or
+    reorder point overwrites its slot in place; strings live in an append-only
+    heap file (<path>.heap) and are only appended to when they change.
+
+    Writers must hold the inventory lock (FileHandler.locked on the inventory
+    file). Slot writes are collected until the outermost writing() block ends,
+    then written to a journal (<path>.journal) and synced, and only then made
+    to the mapped slots, which are synced in turn. recover() replays a journal
+    left complete by a crashed writer and ignores a torn one, so a batch of
+    writes survives an OS crash entirely or not at all. Readers take no lock:
+    the header version is odd while a batch is being made, and snapshot()
+    retries until it reads a stable version.
+    """
+
+    def __init__(self, path: str):
+        self.data_path = path + ".dat"
+        self.heap_path = path + ".heap"
+        self.journal_path = path + ".journal"
+        directory = os.path.dirname(self.data_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self._fd = os.open(self.data_path, os.O_RDWR | os.O_CREAT, 0o644)
+        if os.fstat(self._fd).st_size == 0:
+            os.ftruncate(self._fd, HEADER.size + INITIAL_SLOTS * SLOT.size)
+            os.write(self._fd, HEADER.pack(MAGIC, 0, 0))
+        self._map = mmap.mmap(self._fd, 0)
+        magic, _, _ = HEADER.unpack_from(self._map, 0)
+        if magic != MAGIC:
+            raise ValueError(f"{self.data_path} is not an inventory data file")
+
+        self._heap = open(self.heap_path, "a+b")
+        self._heap_lock = threading.Lock()
+        # item_id -> slot number, valid for _indexed_version
+        self._slots: Dict[str, int] = {}
+        self._indexed_version: Optional[int] = None
+        self._write_depth = 0
+        # The open batch: slot -> SLOT bytes to write, the slots used after it and,
+        # when replace_all rebuilds the heap, the new heap
+        self._pending: Dict[int, bytes] = {}
+        self._pending_used = 0
+        self._new_heap: Optional[bytearray] = None
+
+    def close(self) -> None:
+        self._map.close()
+        os.close(self._fd)
+        self._heap.close()
+
+    def version(self) -> int:
+        """Bumped by every write"""
+        return HEADER.unpack_from(self._map, 0)[1]
+
+    def _used(self) -> int:
+        return HEADER.unpack_from(self._map, 0)[2]
+
+    def _set_header(self, version: int, used: int) -> None:
+        HEADER.pack_into(self._map, 0, MAGIC, version, used)
+
+    def _ensure_mapped(self, slots: int) -> None:
+        """Remap if the file holds more slots than the current mapping covers, growing it if needed"""
+        needed = HEADER.size + slots * SLOT.size
+        size = os.fstat(self._fd).st_size
+        if size < needed:
+            # Double the capacity so appends stay amortized O(1)
+            size = max(needed, HEADER.size + 2 * (size - HEADER.size))
+            os.ftruncate(self._fd, size)
+        if len(self._map) < size:
+            # The old mapping is left for the garbage collector: a reader may still be using it
+            self._map = mmap.mmap(self._fd, 0)
+
+    # Heap
+
+    def _heap_append(self, raw: bytes) -> Tuple[int, int]:
+        if self._new_heap is not None:
+            offset = len(self._new_heap)
+            self._new_heap += raw
+            return offset, len(raw)
+        with self._heap_lock:
+            self._heap.seek(0, os.SEEK_END)
+            offset = self._heap.tell()
+            self._heap.write(raw)
+            self._heap.flush()
+        return offset, len(raw)
+
+    def _heap_read(self, offset: int, length: int) -> bytes:
+        if self._new_heap is not None:
+            return bytes(self._new_heap[offset:offset + length])
+        with self._heap_lock:
+            self._heap.seek(offset)
+            return self._heap.read(length)
+
+    def _heap_all(self) -> bytes:
+        with self._heap_lock:
+            self._heap.seek(0)
+            return self._heap.read()
+
+    # Slots
+
+    def _slot_offset(self, slot: int) -> int:
+        return HEADER.size + slot * SLOT.size
+
+    def _slot_bytes(self, slot: int) -> bytes:
+        """The slot as the open batch leaves it"""
+        raw = self._pending.get(slot)
+        if raw is None:
+            offset = self._slot_offset(slot)
+            raw = bytes(self._map[offset:offset + SLOT.size])
+        return raw
+
+    def _decode(self, values: Tuple, heap: bytes) -> Dict:
+        live, quantity, price, reorder_point = values[:4]
+        refs = values[4:]
+        strings = [heap[offset:offset + length].decode() for offset, length in zip(refs[0::2], refs[1::2])]
+        record = {
+            "item_id": strings[0],
+            "name": strings[1],
+            "price": price,
+            "quantity": quantity,
+            "description": strings[2]
+        }
+        if reorder_point >= 0:
+            record["reorder_point"] = reorder_point
+        if strings[3]:
+            record.update(json.loads(strings[3]))
+        return record
+
+    def snapshot(self) -> Tuple[int, List[Dict]]:
+        """(version, live records in slot order) read at one consistent version"""
+        for _ in range(1000):
+            version = self.version()
+            if version % 2 == 0:
+                used = self._used()
+                self._ensure_mapped(used)
+                heap = self._heap_all()
+                slots = [SLOT.unpack_from(self._map, self._slot_offset(slot)) for slot in range(used)]
+                if self.version() == version:
+                    return version, [self._decode(values, heap) for values in slots if values[0]]
+            time.sleep(0.001)
+        raise TimeoutError(f"{self.data_path} kept changing while being read")
+
+    def recover(self) -> bool:
+        """
+        With the lock held: finish the batch a crashed writer had journaled, or mark
+        one it had not as done (none of it was written). Returns True if a batch was replayed.
+        """
+        batch = self._read_journal()
+        if batch is not None:
+            self._apply(*batch)
+            self._indexed_version = None
+        elif self.version() % 2:
+            self._set_header(self.version() + 1, self._used())
+        self._clear_journal()
+        return batch is not None
+
+    def records(self) -> List[Dict]:
+        return self.snapshot()[1]
+
+    def _index(self) -> Dict[str, int]:
+        # Another process may have added or deleted items since we last looked
+        version = self.version()
+        if version != self._indexed_version:
+            used = self._used()
+            self._ensure_mapped(used)
+            heap = self._heap_all()
+            self._slots = {}
+            for slot in range(used):
+                values = SLOT.unpack_from(self._map, self._slot_offset(slot))
+                if values[0]:
+                    offset, length = values[4], values[5]
+                    self._slots[heap[offset:offset + length].decode()] = slot
+            self._indexed_version = version
+        return self._slots
+
+    @contextmanager
+    def writing(self) -> Iterator[None]:
+        """Group writes so they are made, and survive a crash, all together or not at all"""
+        if self._write_depth == 0:
+            self._index()
+            self._pending = {}
+            self._pending_used = self._used()
+        self._write_depth += 1
+        try:
+            yield
+        except BaseException:
+            if self._write_depth == 1:
+                # Nothing was written to the slots; _slots may already hold the dropped changes
+                self._pending, self._new_heap = {}, None
+                self._indexed_version = None
+            raise
+        finally:
+            self._write_depth -= 1
+        if self._write_depth == 0:
+            self._commit()
+
+    def _commit(self) -> None:
+        pending, heap = self._pending, self._new_heap
+        self._pending, self._new_heap = {}, None
+        if not pending and heap is None:
+            return
+        version = self.version() + 2
+        # Heap strings first (the slots point into them), then the journal; from there the batch is durable
+        with self._heap_lock:
+            self._heap.flush()
+            os.fsync(self._heap.fileno())
+        try:
+            self._write_journal(version, self._pending_used, pending, heap)
+            self._apply(version, self._pending_used, pending, heap)
+        except BaseException:
+            # Left to recover(); _slots may not match the slots any more
+            self._indexed_version = None
+            raise
+        self._indexed_version = version
+        self._clear_journal()
+
+    def _apply(self, version: int, used: int, slots: Dict[int, bytes], heap: Optional[bytes]) -> None:
+        """Make a journaled batch to the files, leaving version and used in the header"""
+        # Odd while the slots change, so readers wait for the batch to be complete
+        self._set_header(version - 1, self._used())
+        if heap is not None:
+            with self._heap_lock:
+                self._heap.truncate(0)
+                self._heap.write(heap)
+                self._heap.flush()
+                os.fsync(self._heap.fileno())
+        self._ensure_mapped(used)
+        for slot, raw in slots.items():
+            offset = self._slot_offset(slot)
+            self._map[offset:offset + SLOT.size] = raw
+        self._set_header(version, used)
+        self._map.flush()
+
+    def _write_journal(self, version: int, used: int, slots: Dict[int, bytes], heap: Optional[bytes]) -> None:
+        parts = [JOURNAL.pack(version, used, len(slots), heap is not None, len(heap or b""))]
+        for slot, raw in slots.items():
+            parts += (JOURNAL_SLOT.pack(slot), raw)
+        parts.append(bytes(heap or b""))
+        payload = b"".join(parts)
+        with open(self.journal_path, "wb") as journal:
+            journal.write(payload + CRC.pack(zlib.crc32(payload)))
+            journal.flush()
+            os.fsync(journal.fileno())
+
+    def _read_journal(self) -> Optional[Tuple[int, int, Dict[int, bytes], Optional[bytes]]]:
+        """The journaled batch, or None if there is none or it was torn before being synced"""
+        try:
+            with open(self.journal_path, "rb") as journal:
+                raw = journal.read()
+        except FileNotFoundError:
+            return None
+        if len(raw) < JOURNAL.size + CRC.size:
+            return None
+        payload, (crc,) = raw[:-CRC.size], CRC.unpack(raw[-CRC.size:])
+        if zlib.crc32(payload) != crc:
+            return None
+        version, used, count, has_heap, heap_length = JOURNAL.unpack_from(payload, 0)
+        offset = JOURNAL.size
+        slots = {}
+        for _ in range(count):
+            (slot,) = JOURNAL_SLOT.unpack_from(payload, offset)
+            offset += JOURNAL_SLOT.size
+            slots[slot] = payload[offset:offset + SLOT.size]
+            offset += SLOT.size
+        return version, used, slots, payload[offset:offset + heap_length] if has_heap else None
+
+    def _clear_journal(self) -> None:
+        # Replaying the last batch again is harmless, so this need not be synced
+        try:
+            os.truncate(self.journal_path, 0)
+        except FileNotFoundError:
+            pass
+
+    def put(self, record: Dict) -> None:
+        """Insert or overwrite the item in place; only changed strings are appended to the heap"""
+        with self.writing():
+            slot = self._slots.get(record["item_id"])
+            if slot is None:
+                slot = self._pending_used
+                self._pending_used += 1
+                self._slots[record["item_id"]] = slot
+                old_refs = None
+            else:
+                old_refs = SLOT.unpack(self._slot_bytes(slot))[4:]
+
+            extra = {key: value for key, value in record.items() if key not in STRING_FIELDS + FIXED_FIELDS}
+            strings = [str(record.get(field, "")).encode() for field in STRING_FIELDS]
+            strings.append(json.dumps(extra).encode() if extra else b"")
+
+            refs = []
+            for i, raw in enumerate(strings):
+                if old_refs is not None and self._heap_read(old_refs[2 * i], old_refs[2 * i + 1]) == raw:
+                    refs += old_refs[2 * i:2 * i + 2]
+                elif raw:
+                    refs += self._heap_append(raw)
+                else:
+                    refs += (0, 0)
+
+            self._pending[slot] = SLOT.pack(
+                1, int(record["quantity"]), float(record["price"]), int(record.get("reorder_point", -1)), *refs
+            )
+
+    def delete(self, item_id: str) -> bool:
+        with self.writing():
+            slot = self._slots.pop(item_id, None)
+            if slot is None:
+                return False
+            # Only the live flag is cleared; compact() reclaims the slot
+            self._pending[slot] = b"\x00" + self._slot_bytes(slot)[1:]
+            return True
+
+    def replace_all(self, records: Iterable[Dict]) -> None:
+        """Rewrite both files from scratch with records, dropping deleted slots and unused heap strings"""
+        records = list(records)
+        with self.writing():
+            # The new heap is built in memory and journaled with the slots, since it replaces the old one
+            self._new_heap = bytearray()
+            self._slots = {}
+            self._pending = {}
+            self._pending_used = 0
+            for record in records:
+                self.put(record)
+
+    def compact(self) -> None:
+        self.replace_all(self.records())
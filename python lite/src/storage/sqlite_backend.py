@@ -0,0 +1,318 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+from urllib.parse import unquote
+
+from .backend import StorageBackend
+from .. import config
+
+# Data file path -> (table, [(column, type)], indexed columns). Column type "JSON"
+# is stored as TEXT and encoded/decoded with json.
+TABLES: Dict[str, Tuple[str, List[Tuple[str, str]], List[str]]] = {
+    "data/users.txt": (
+        "users",
+        [("username", "TEXT"), ("password", "TEXT"), ("role", "TEXT"), ("status", "TEXT")],
+        ["username", "role"]
+    ),
+    "data/inventory.txt": (
+        "items",
+        [("item_id", "TEXT"), ("name", "TEXT"), ("price", "REAL"), ("quantity", "INTEGER"),
+         ("description", "TEXT")],
+        ["item_id"]
+    ),
+    "data/orders.txt": (
+        "orders",
+        [("username", "TEXT"), ("items", "JSON"), ("total", "REAL"), ("status", "TEXT"),
+         ("timestamp", "TEXT")],
+        ["username", "timestamp"]
+    ),
+}
+
+# Directory of per-user data files -> (table, [(column, type)], indexed columns, owner
+# column). Each file in the directory is the rows of the table whose owner column is
+# the file's name without ".txt", unquoted, so the files share one indexed table.
+SHARDED_TABLES: Dict[str, Tuple[str, List[Tuple[str, str]], List[str], str]] = {
+    "data/carts": (
+        "carts",
+        [("username", "TEXT"), ("item_id", "TEXT"), ("quantity", "INTEGER"), ("timestamp", "TEXT")],
+        ["username", "item_id"],
+        "username"
+    ),
+}
+
+# A table, its columns and, for a file in SHARDED_TABLES, (owner column, owner)
+Spec = Tuple[str, List[Tuple[str, str]], Optional[Tuple[str, str]]]
+
+class SQLiteBackend(StorageBackend):
+    """
+    Keeps every collection in one SQLite database in WAL mode. Users, items,
+    orders and the per-user carts get real tables with indexes; fields a table
+    has no column for are kept in its "extra" JSON column. Any other collection
+    is stored as JSON documents in the generic "documents" table.
+    """
+
+    def __init__(self, path: Optional[str] = None):
+        super().__init__()
+        self.path = path or config.SQLITE_PATH
+        self._local = threading.local()
+        self._lock = threading.RLock()
+        self._depth = 0
+        self._create_schema()
+
+    def _connection(self) -> sqlite3.Connection:
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            # Autocommit mode; transactions are opened explicitly
+            connection = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            self._local.connection = connection
+        return connection
+
+    def _create_schema(self) -> None:
+        connection = self._connection()
+        specs = list(TABLES.values()) + [spec[:3] for spec in SHARDED_TABLES.values()]
+        for table, columns, indexed in specs:
+            column_sql = ", ".join(f"{name} {'TEXT' if kind == 'JSON' else kind}" for name, kind in columns)
+            connection.execute(
+                f"CREATE TABLE IF NOT EXISTS {table} "
+                f"(seq INTEGER PRIMARY KEY AUTOINCREMENT, {column_sql}, extra TEXT)"
+            )
+            for column in indexed:
+                connection.execute(f"CREATE INDEX IF NOT EXISTS idx_{table}_{column} ON {table} ({column})")
+        connection.execute(
+            "CREATE TABLE IF NOT EXISTS documents "
+            "(name TEXT NOT NULL, seq INTEGER NOT NULL, body TEXT NOT NULL, PRIMARY KEY (name, seq))"
+        )
+        connection.execute("CREATE TABLE IF NOT EXISTS versions (name TEXT PRIMARY KEY, version INTEGER NOT NULL)")
+
+    def initialize(self, filenames: Iterable[str]) -> None:
+        # Tables are created with the backend; nothing is needed per collection
+        pass
+
+    @staticmethod
+    def _table(filename: str) -> Optional[Spec]:
+        path = os.path.normpath(filename).replace(os.sep, "/")
+        if path in TABLES:
+            table, columns, _ = TABLES[path]
+            return table, columns, None
+        directory, name = os.path.split(path)
+        if directory in SHARDED_TABLES and name.endswith(".txt"):
+            table, columns, _, owner_column = SHARDED_TABLES[directory]
+            return table, columns, (owner_column, unquote(name[:-len(".txt")]))
+        return None
+
+    @staticmethod
+    def _where(owner: Optional[Tuple[str, str]]) -> Tuple[str, Tuple]:
+        """SQL condition, to follow another one, restricting a table to the file's rows"""
+        return ("", ()) if owner is None else (f"AND {owner[0]} = ?", (owner[1],))
+
+    @staticmethod
+    def _owned(record: Dict, owner: Optional[Tuple[str, str]]) -> Dict:
+        # A row always belongs to the file it was written to
+        return record if owner is None or record.get(owner[0]) == owner[1] else {**record, owner[0]: owner[1]}
+
+    @staticmethod
+    def _to_row(record: Dict, columns: List[Tuple[str, str]]) -> List[Any]:
+        row = []
+        for name, kind in columns:
+            value = record.get(name)
+            row.append(json.dumps(value) if kind == "JSON" and value is not None else value)
+        extra = {key: value for key, value in record.items() if all(key != name for name, _ in columns)}
+        row.append(json.dumps(extra) if extra else None)
+        return row
+
+    @staticmethod
+    def _from_row(row: Tuple, columns: List[Tuple[str, str]]) -> Dict:
+        record = {}
+        for (name, kind), value in zip(columns, row):
+            # NULL means the record never had the field
+            if value is not None:
+                record[name] = json.loads(value) if kind == "JSON" else value
+        if row[-1]:
+            record.update(json.loads(row[-1]))
+        return record
+
+    def iter_data(self, filename: str) -> Iterator[Dict]:
+        connection = self._connection()
+        spec = self._table(filename)
+        if spec is None:
+            cursor = connection.execute("SELECT body FROM documents WHERE name = ? ORDER BY seq", (filename,))
+            for (body,) in cursor:
+                yield json.loads(body)
+            return
+
+        table, columns, owner = spec
+        names = ", ".join(name for name, _ in columns)
+        where, parameters = self._where(owner)
+        for row in connection.execute(f"SELECT {names}, extra FROM {table} WHERE 1 {where} ORDER BY seq", parameters):
+            yield self._from_row(row, columns)
+
+    def read_data(self, filename: str) -> List[Dict]:
+        return list(self.iter_data(filename))
+
+    def scan(self, filename: str, start: Optional[int] = None, reverse: bool = False) -> Iterator[Tuple[int, Dict]]:
+        # Positions are row sequence numbers, so resuming is an index seek on seq
+        connection = self._connection()
+        spec = self._table(filename)
+        order = "DESC" if reverse else "ASC"
+        condition = "" if start is None else f"AND seq {'<=' if reverse else '>='} ?"
+        parameters: Tuple = () if start is None else (start,)
+        if spec is None:
+            cursor = connection.execute(
+                f"SELECT seq, body FROM documents WHERE name = ? {condition} ORDER BY seq {order}",
+                (filename,) + parameters
+            )
+            for seq, body in cursor:
+                yield seq, json.loads(body)
+            return
+
+        table, columns, owner = spec
+        names = ", ".join(name for name, _ in columns)
+        where, owner_parameters = self._where(owner)
+        cursor = connection.execute(
+            f"SELECT seq, {names}, extra FROM {table} WHERE 1 {where} {condition} ORDER BY seq {order}",
+            owner_parameters + parameters
+        )
+        for row in cursor:
+            yield row[0], self._from_row(row[1:], columns)
+
+    def _insert(self, connection: sqlite3.Connection, filename: str, records: List[Dict]) -> None:
+        spec = self._table(filename)
+        if spec is None:
+            start = connection.execute(
+                "SELECT COALESCE(MAX(seq), 0) FROM documents WHERE name = ?", (filename,)
+            ).fetchone()[0]
+            connection.executemany(
+                "INSERT INTO documents (name, seq, body) VALUES (?, ?, ?)",
+                ((filename, start + i, json.dumps(record)) for i, record in enumerate(records, 1))
+            )
+            return
+
+        table, columns, owner = spec
+        names = ", ".join(name for name, _ in columns)
+        placeholders = ", ".join("?" for _ in range(len(columns) + 1))
+        connection.executemany(
+            f"INSERT INTO {table} ({names}, extra) VALUES ({placeholders})",
+            (self._to_row(self._owned(record, owner), columns) for record in records)
+        )
+
+    def write_data(self, filename: str, data: List[Dict]) -> None:
+        with self.locked(filename):
+            connection = self._connection()
+            spec = self._table(filename)
+            if spec is None:
+                connection.execute("DELETE FROM documents WHERE name = ?", (filename,))
+            else:
+                where, parameters = self._where(spec[2])
+                connection.execute(f"DELETE FROM {spec[0]} WHERE 1 {where}", parameters)
+            self._insert(connection, filename, data)
+            self._bump_version(connection, filename)
+
+    def append_data(self, filename: str, data: Dict) -> None:
+        with self.locked(filename):
+            connection = self._connection()
+            self._insert(connection, filename, [data])
+            self._bump_version(connection, filename)
+
+    def update_records(self, filename: str, key: str, upserts: Iterable[Dict] = (),
+                       deletes: Iterable[Any] = ()) -> None:
+        spec = self._table(filename)
+        if spec is None or all(name != key for name, _ in spec[1]):
+            super().update_records(filename, key, upserts, deletes)
+            return
+
+        # Only the rows concerned are touched, the first with each key as in apply_update
+        table, columns, owner = spec
+        assignments = ", ".join(f"{name} = ?" for name, _ in columns)
+        where, owner_parameters = self._where(owner)
+        first = f"seq = (SELECT MIN(seq) FROM {table} WHERE {key} = ? {where})"
+        with self.locked(filename):
+            connection = self._connection()
+            for record in upserts:
+                row = self._to_row(self._owned(record, owner), columns)
+                cursor = connection.execute(
+                    f"UPDATE {table} SET {assignments}, extra = ? WHERE {first}",
+                    row + [record[key], *owner_parameters]
+                )
+                if cursor.rowcount == 0:
+                    self._insert(connection, filename, [record])
+            for value in deletes:
+                connection.execute(f"DELETE FROM {table} WHERE {first}", (value,) + owner_parameters)
+            self._bump_version(connection, filename)
+
+    def update_at(self, filename: str, position: int, record: Dict) -> None:
+        spec = self._table(filename)
+        with self.locked(filename):
+            connection = self._connection()
+            if spec is None:
+                cursor = connection.execute(
+                    "UPDATE documents SET body = ? WHERE name = ? AND seq = ?", (json.dumps(record), filename, position)
+                )
+            else:
+                table, columns, owner = spec
+                assignments = ", ".join(f"{name} = ?" for name, _ in columns)
+                where, parameters = self._where(owner)
+                cursor = connection.execute(
+                    f"UPDATE {table} SET {assignments}, extra = ? WHERE seq = ? {where}",
+                    self._to_row(self._owned(record, owner), columns) + [position, *parameters]
+                )
+            if cursor.rowcount == 0:
+                raise ValueError(f"Position {position} is not the start of a record in {filename}")
+            self._bump_version(connection, filename)
+
+    def version(self, filename: str) -> int:
+        row = self._connection().execute("SELECT version FROM versions WHERE name = ?", (filename,)).fetchone()
+        return row[0] if row else 0
+
+    @staticmethod
+    def _bump_version(connection: sqlite3.Connection, filename: str) -> None:
+        connection.execute(
+            "INSERT INTO versions (name, version) VALUES (?, 1) "
+            "ON CONFLICT(name) DO UPDATE SET version = version + 1",
+            (filename,)
+        )
+
+    @contextmanager
+    def locked(self, *filenames: str) -> Iterator[None]:
+        """
+        The database has a single writer lock, so any set of filenames maps to one
+        BEGIN IMMEDIATE transaction. Nested blocks join the outer transaction, which
+        commits when the outermost block exits and rolls back if it raises.
+        """
+        start = time.perf_counter()
+        contended = not self._lock.acquire(blocking=False)
+        if contended:
+            self._lock.acquire()
+        try:
+            connection = self._connection()
+            outermost = self._depth == 0
+            if outermost:
+                connection.execute("BEGIN IMMEDIATE")
+            self._record_lock_wait(time.perf_counter() - start, contended)
+            self._depth += 1
+            try:
+                yield
+            except BaseException:
+                self._depth -= 1
+                if outermost:
+                    connection.execute("ROLLBACK")
+                raise
+            self._depth -= 1
+            if outermost:
+                connection.execute("COMMIT")
+        finally:
+            self._lock.release()
+
+    def close(self) -> None:
+        connection = getattr(self._local, "connection", None)
+        if connection is not None:
+            connection.close()
+            self._local.connection = None
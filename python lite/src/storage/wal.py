@@ -0,0 +1,251 @@
+"""
+Write-ahead log used by wal_backend.WalBackend. Each line is one committed
+transaction:
+
+    <crc32 of the payload as 8 hex digits> <JSON payload>\\n
+
+The first line of every log is a checkpoint header {"epoch": N, "files": [...]}
+naming the data files the compaction that started this log rewrote. Lines that
+fail their checksum (torn by a crash mid-write) are skipped.
+"""
+import json
+import os
+import threading
+import zlib
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional, Tuple
+
+try:
+    import fcntl
+except ImportError:  # Windows: only threads within this process are serialized
+    fcntl = None
+
+# Bytes read at a time when reading the log
+READ_BLOCK_SIZE = 1024 * 1024
+
+def encode_line(payload: Dict) -> bytes:
+    data = json.dumps(payload, separators=(",", ":")).encode()
+    return b"%08x %s\n" % (zlib.crc32(data), data)
+
+def decode_line(line: bytes) -> Optional[Dict]:
+    """Payload of a log line, or None if it is torn or corrupt"""
+    checksum, _, data = line.rstrip(b"\n").partition(b" ")
+    try:
+        if int(checksum, 16) != zlib.crc32(data):
+            return None
+        return json.loads(data)
+    except ValueError:
+        return None
+
+def fsync_directory(path: str) -> None:
+    """Make a rename in the directory holding path durable"""
+    if os.name == "nt":
+        return
+    fd = os.open(os.path.dirname(os.path.abspath(path)), os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+class WriteAheadLog:
+    """
+    Appends are serialized across processes by an exclusive lock on PATH.lock;
+    replacing the log (see start) takes the same lock, and readers that must not
+    see it replaced hold it shared. Commits are made durable by sync(), which
+    lets concurrent committers share one fsync.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._fd: Optional[int] = None
+        # Bumped every time a different log file is opened, so positions from
+        # an earlier log are recognisable
+        self.file_id = 0
+        self.epoch = 0
+        self.checkpoint_files: List[str] = []
+        # Offset of the first transaction, just past the checkpoint header
+        self.data_start = 0
+
+        self._mutex = threading.RLock()
+        self._owner: Optional[int] = None
+
+        self._sync = threading.Condition()
+        self._syncing = False
+        self._written: Tuple[int, int] = (0, 0)
+        self._synced: Tuple[int, int] = (0, 0)
+        self.stats = {"transactions": 0, "syncs": 0}
+
+    @contextmanager
+    def locked(self, shared: bool = False) -> Iterator[None]:
+        if self._owner == threading.get_ident():
+            # Already held exclusively by this thread
+            yield
+            return
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        if shared:
+            fd = os.open(self.path + ".lock", os.O_RDWR | os.O_CREAT, 0o644)
+            try:
+                if fcntl:
+                    fcntl.flock(fd, fcntl.LOCK_SH)
+                yield
+            finally:
+                os.close(fd)
+            return
+
+        with self._mutex:
+            # Opened per acquisition: flock belongs to the open file, which a forked child would share
+            fd = os.open(self.path + ".lock", os.O_RDWR | os.O_CREAT, 0o644)
+            try:
+                if fcntl:
+                    fcntl.flock(fd, fcntl.LOCK_EX)
+                self._owner = threading.get_ident()
+                yield
+            finally:
+                self._owner = None
+                os.close(fd)
+
+    def open(self) -> None:
+        """Open the log, creating an empty one if there is none"""
+        if self._fd is not None:
+            return
+        if not os.path.exists(self.path):
+            with self.locked():
+                if not os.path.exists(self.path):
+                    self._write_new(0, [])
+        self._open_current()
+
+    def _open_current(self) -> None:
+        fd = os.open(self.path, os.O_RDWR | os.O_APPEND)
+        header = b""
+        while not header.endswith(b"\n"):
+            chunk = os.pread(fd, 4096, len(header))
+            if not chunk:
+                break
+            header += chunk
+        header = header[:header.find(b"\n") + 1]
+        checkpoint = decode_line(header) or {}
+        with self._sync:
+            # A sync still running on the old log must finish before its descriptor is closed
+            while self._syncing:
+                self._sync.wait()
+            if self._fd is not None:
+                os.close(self._fd)
+            self._fd = fd
+            self.file_id += 1
+            # Everything in the previous log reached the data files before it was replaced
+            self._written = self._synced = (self.file_id, 0)
+        self.epoch = checkpoint.get("epoch", 0)
+        self.checkpoint_files = checkpoint.get("files", [])
+        self.data_start = len(header)
+
+    def replaced(self) -> bool:
+        """True if another log has replaced the open one"""
+        try:
+            return os.stat(self.path).st_ino != os.fstat(self._fd).st_ino
+        except OSError:
+            return False
+
+    def reopen(self) -> None:
+        self._open_current()
+
+    def is_current(self, st: os.stat_result) -> bool:
+        return self._fd is not None and st.st_ino == os.fstat(self._fd).st_ino
+
+    def size(self) -> int:
+        return os.fstat(self._fd).st_size
+
+    def read(self, start: int, end: Optional[int] = None) -> Iterator[Tuple[int, Dict]]:
+        """
+        (end offset, payload) for each transaction from start up to end (default:
+        the end of the log). An unterminated last line may still be being
+        written, so reading stops before it.
+        """
+        position, pending = start, b""
+        limit = self.size() if end is None else end
+        while position < limit:
+            chunk = os.pread(self._fd, min(READ_BLOCK_SIZE, limit - position), position)
+            if not chunk:
+                break
+            offset = position - len(pending)
+            position += len(chunk)
+            lines = (pending + chunk).split(b"\n")
+            pending = lines.pop()
+            for line in lines:
+                offset += len(line) + 1
+                payload = decode_line(line)
+                if payload is not None:
+                    yield offset, payload
+
+    def append(self, payload: Dict) -> Tuple[int, int]:
+        """Append a transaction; the caller holds the exclusive lock. Returns its position for sync()"""
+        size = self.size()
+        if size and os.pread(self._fd, 1, size - 1) != b"\n":
+            # Seal a line torn by a crash so the new transaction starts on a line of its own
+            os.write(self._fd, b"\n")
+        os.write(self._fd, encode_line(payload))
+        position = (self.file_id, self.size())
+        self._written = position
+        self.stats["transactions"] += 1
+        return position
+
+    def sync(self, position: Tuple[int, int]) -> None:
+        """
+        Return once the transaction at position is on disk. One caller at a time
+        fsyncs everything written so far; the others wait for it to cover them.
+        """
+        with self._sync:
+            while self._synced < position:
+                if not self._syncing:
+                    self._syncing = True
+                    break
+                self._sync.wait()
+            else:
+                return
+            target, fd = self._written, self._fd
+        synced = False
+        try:
+            os.fsync(fd)
+            self.stats["syncs"] += 1
+            synced = True
+        finally:
+            with self._sync:
+                self._syncing = False
+                # After a failed fsync the waiters try again themselves rather than report success
+                if synced:
+                    self._synced = max(self._synced, target)
+                self._sync.notify_all()
+
+    def repair(self) -> int:
+        """Cut off an unterminated last line left by a crash. The caller holds the exclusive lock"""
+        size = position = self.size()
+        keep = 0
+        while position > 0:
+            start = max(0, position - 4096)
+            newline = os.pread(self._fd, position - start, start).rfind(b"\n")
+            if newline >= 0:
+                keep = start + newline + 1
+                break
+            position = start
+        if keep < size:
+            os.ftruncate(self._fd, keep)
+            os.fsync(self._fd)
+        return size - keep
+
+    def start(self, epoch: int, files: List[str]) -> None:
+        """
+        Replace the log with an empty one whose checkpoint header names files.
+        The caller holds the exclusive lock and has made files durable.
+        """
+        self._write_new(epoch, files)
+        self._open_current()
+
+    def _write_new(self, epoch: int, files: List[str]) -> None:
+        temp_path = self.path + ".tmp"
+        with open(temp_path, "wb") as file:
+            file.write(encode_line({"epoch": epoch, "files": files}))
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(temp_path, self.path)
+        fsync_directory(self.path)
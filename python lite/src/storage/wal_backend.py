@@ -0,0 +1,447 @@
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from . import formats
+from .backend import add_deltas
+from .json_backend import JsonFileBackend
+from .wal import WriteAheadLog, fsync_directory
+from .. import config
+
+class _Table:
+    """One collection as its data file plus the logged operations applied to it"""
+
+    def __init__(self, records: List[Dict]):
+        # Deleted records leave None behind so scan positions stay valid
+        self.records: List[Optional[Dict]] = records
+        self.holes = 0
+        # Position of the first record per value of self._key, built on the first keyed update
+        self._key: Optional[str] = None
+        self._positions: Dict[Any, int] = {}
+
+    def live(self) -> List[Dict]:
+        if not self.holes:
+            return list(self.records)
+        return [record for record in self.records if record is not None]
+
+    def live_index(self, position: int) -> int:
+        """Index among the live records of the record at position"""
+        if not self.holes:
+            return position
+        return position - sum(1 for record in self.records[:position] if record is None)
+
+    def _position(self, live_index: int) -> int:
+        if not self.holes:
+            return live_index
+        for i, record in enumerate(self.records):
+            if record is not None:
+                if live_index == 0:
+                    return i
+                live_index -= 1
+        raise IndexError(live_index)
+
+    def _positions_by(self, key: str) -> Dict[Any, int]:
+        if self._key != key:
+            self._positions = {}
+            for i, record in enumerate(self.records):
+                if record is not None:
+                    self._positions.setdefault(record.get(key), i)
+            self._key = key
+        return self._positions
+
+    def apply(self, op: Dict) -> None:
+        kind = op["op"]
+        if kind == "write":
+            self.records, self.holes, self._key = list(op["records"]), 0, None
+        elif kind == "append":
+            if self._key is not None:
+                self._positions.setdefault(op["record"].get(self._key), len(self.records))
+            self.records.append(op["record"])
+        elif kind == "update":
+            key = op["key"]
+            positions = self._positions_by(key)
+            for record in op["upserts"]:
+                i = positions.get(record[key])
+                if i is None:
+                    positions[record[key]] = len(self.records)
+                    self.records.append(record)
+                else:
+                    self.records[i] = record
+            for value in op["deletes"]:
+                i = positions.pop(value, None)
+                if i is not None:
+                    self.records[i] = None
+                    self.holes += 1
+            if self.holes > len(self.records) // 2:
+                self.records, self.holes, self._key = self.live(), 0, None
+        elif kind == "put":
+            # Addressed by live index: processes that loaded the table at different
+            # times can hold it with different holes
+            i = self._position(op["index"])
+            if self._key is not None and self.records[i].get(self._key) != op["record"].get(self._key):
+                self._key = None
+            self.records[i] = op["record"]
+        elif kind == "accumulate":
+            i = next((i for i, record in enumerate(self.records) if record is not None), None)
+            if i is None:
+                self.records.append(add_deltas({}, op["deltas"]))
+            else:
+                self.records[i] = add_deltas(self.records[i], op["deltas"])
+        else:
+            raise ValueError(f"Unknown log operation: {kind}")
+
+class WalBackend(JsonFileBackend):
+    """
+    JSON file backend that appends each change to a write-ahead log (see wal.py)
+    instead of rewriting its data file, so a change costs the size of the records
+    it touches and a crash can never leave a data file half-written.
+
+    Changes made inside one outermost locked() block are committed together as a
+    single log line, so a multi-file operation such as checkout is either applied
+    completely or not at all. Until then the locks on every file it changed are
+    kept, even when taken in an inner block. Each process applies the operations
+    other processes logged before reading. compact_log() folds the log into new
+    data files and starts an empty one.
+    """
+
+    def __init__(self, path: Optional[str] = None, compact_bytes: Optional[int] = None):
+        super().__init__()
+        self.log = WriteAheadLog(path or config.WAL_PATH)
+        self.compact_bytes = config.WAL_COMPACT_BYTES if compact_bytes is None else compact_bytes
+        self._tables: Dict[str, _Table] = {}
+        # Offset in the current log up to which operations have been applied; None until it is opened
+        self._applied: Optional[int] = None
+        # Files with operations in the current log
+        self._logged: set = set()
+        # Files whose tables hold operations of a transaction not yet committed
+        self._dirty: set = set()
+        # Guards the state above. Taken after file locks and before the log lock.
+        self._guard = threading.RLock()
+        # The calling thread's transaction: depth, ops, files changed, locks held until commit
+        self._local = threading.local()
+
+    @staticmethod
+    def _pending_path(filename: str, epoch: int) -> str:
+        return f"{filename}.wal-{epoch}"
+
+    def _load_snapshot(self, filename: str) -> List[Dict]:
+        # A compaction that started the current log may not have moved its files into place yet
+        path = filename
+        if filename in self.log.checkpoint_files:
+            pending = self._pending_path(filename, self.log.epoch)
+            if os.path.exists(pending):
+                path = pending
+        return self._load(path) if os.path.exists(path) else []
+
+    def _catch_up(self) -> None:
+        """Apply operations other processes have logged since the last call. The caller holds _guard"""
+        if self._applied is None:
+            self.log.open()
+            self._applied = self.log.data_start
+        try:
+            st = os.stat(self.log.path)
+            if st.st_size == self._applied and self.log.is_current(st):
+                return
+        except OSError:
+            pass
+
+        while True:
+            replaced = self.log.replaced()
+            for end, transaction in self.log.read(self._applied):
+                for op in transaction["ops"]:
+                    table = self._tables.get(op["file"])
+                    if table is not None:
+                        table.apply(op)
+                    self._logged.add(op["file"])
+                    self._bump(op["file"])
+                self._applied = end
+            if not replaced:
+                return
+            # The new log starts from data files holding everything read above
+            epoch = self.log.epoch
+            self.log.reopen()
+            self._applied = self.log.data_start
+            self._logged = set()
+            if self.log.epoch != epoch + 1:
+                # A log in between was never read; what it held is only in the data files
+                self._drop_tables()
+
+    def _drop_tables(self) -> None:
+        """Forget loaded tables so they are read again; those holding uncommitted changes stay"""
+        for filename in list(self._tables):
+            if filename not in self._dirty:
+                del self._tables[filename]
+                self._bump(filename)
+
+    def _table(self, filename: str) -> _Table:
+        """The caught-up table for filename, loading it if needed. The caller holds _guard"""
+        self._catch_up()
+        table = self._tables.get(filename)
+        if table is None:
+            # Keeps compaction from replacing the log and data files while they are read
+            with self.log.locked(shared=True):
+                self._catch_up()
+                table = _Table(self._load_snapshot(filename))
+                if filename in self._logged:
+                    for _, transaction in self.log.read(self.log.data_start, self._applied):
+                        for op in transaction["ops"]:
+                            if op["file"] == filename:
+                                table.apply(op)
+            self._tables[filename] = table
+        return table
+
+    def migrate_to_json_lines(self, filename: str) -> bool:
+        # Data files are only rewritten by compaction, which writes them in format_of
+        return False
+
+    def read_data(self, filename: str) -> List[Dict]:
+        with self._guard:
+            return self._table(filename).live()
+
+    def iter_data(self, filename: str) -> Iterator[Dict]:
+        yield from self.read_data(filename)
+
+    def scan(self, filename: str, start: Optional[int] = None, reverse: bool = False) -> Iterator[Tuple[int, Dict]]:
+        """Positions are indexes into the collection, which stay valid while records are only appended"""
+        with self._guard:
+            records = list(self._table(filename).records)
+        if reverse:
+            first = len(records) - 1 if start is None else min(start, len(records) - 1)
+            positions = range(first, -1, -1)
+        else:
+            positions = range(start or 0, len(records))
+        for position in positions:
+            if records[position] is not None:
+                yield position, records[position]
+
+    def generation(self, filename: str) -> int:
+        with self._guard:
+            self._catch_up()
+            return self._generations.get(filename, 0)
+
+    def write_data(self, filename: str, data: List[Dict]) -> None:
+        self._log(filename, {"op": "write", "file": filename, "records": list(data)})
+
+    def append_data(self, filename: str, data: Dict) -> None:
+        self._log(filename, {"op": "append", "file": filename, "record": data})
+
+    def update_records(self, filename: str, key: str, upserts: Iterable[Dict] = (),
+                       deletes: Iterable[Any] = ()) -> None:
+        upserts, deletes = list(upserts), list(deletes)
+        if upserts or deletes:
+            self._log(filename, {"op": "update", "file": filename, "key": key, "upserts": upserts, "deletes": deletes})
+
+    def update_at(self, filename: str, position: int, record: Dict) -> None:
+        with self.locked(filename):
+            with self._guard:
+                table = self._table(filename)
+                if not 0 <= position < len(table.records) or table.records[position] is None:
+                    raise ValueError(f"Position {position} is not the start of a record in {filename}")
+                index = table.live_index(position)
+            self._log(filename, {"op": "put", "file": filename, "index": index, "record": record})
+
+    def accumulate(self, filename: str, deltas: Dict) -> None:
+        self._log(filename, {"op": "accumulate", "file": filename, "deltas": deltas})
+
+    def _log(self, filename: str, op: Dict) -> None:
+        with self.locked(filename):
+            with self._guard:
+                self._table(filename).apply(op)
+                self._dirty.add(filename)
+                self._bump(filename)
+            transaction = self._transaction()
+            transaction["ops"].append(op)
+            transaction["files"].add(filename)
+
+    def _transaction(self) -> Dict[str, Any]:
+        transaction = getattr(self._local, "transaction", None)
+        if transaction is None:
+            transaction = self._local.transaction = {"depth": 0, "ops": [], "files": set(), "held": []}
+        return transaction
+
+    @contextmanager
+    def locked(self, *filenames: str) -> Iterator[None]:
+        """
+        File locks as in JsonFileBackend. The outermost block commits the changes
+        made inside it when it exits, and returns once they are on disk; if it
+        raises, they are discarded.
+        """
+        transaction = self._transaction()
+        transaction["depth"] += 1
+        acquired = []
+        position = None
+        try:
+            for filename in sorted(set(filenames)):
+                self._acquire(filename)
+                acquired.append(filename)
+            try:
+                yield
+                if transaction["depth"] == 1 and transaction["ops"]:
+                    position = self._commit(transaction["ops"], transaction["files"])
+            except BaseException:
+                if transaction["depth"] == 1:
+                    self._abort(transaction["files"])
+                raise
+        finally:
+            transaction["depth"] -= 1
+            for filename in reversed(acquired):
+                if transaction["depth"] and filename in transaction["files"]:
+                    # Changed but not yet committed: hold it until the transaction ends
+                    transaction["held"].append(filename)
+                else:
+                    self._release(filename)
+            if not transaction["depth"]:
+                for filename in transaction["held"]:
+                    self._release(filename)
+                self._local.transaction = None
+
+        if position is not None:
+            self.log.sync(position)
+            self._maybe_compact()
+
+    def _commit(self, ops: List[Dict], files: Iterable[str]) -> Tuple[int, int]:
+        with self._guard, self.log.locked():
+            self._catch_up()
+            position = self.log.append({"ops": ops})
+            self._applied = position[1]
+            self._logged.update(files)
+            self._dirty.difference_update(files)
+        # Only once the operations are in the log, so a reader that saw the old
+        # version (to check a cache against it, say) also read the old records
+        for filename in files:
+            self._bump_version(filename)
+        return position
+
+    def _abort(self, files: Iterable[str]) -> None:
+        # The tables hold the discarded operations; reload them from the log
+        with self._guard:
+            for filename in files:
+                self._tables.pop(filename, None)
+                self._dirty.discard(filename)
+                self._bump(filename)
+
+    def _maybe_compact(self) -> None:
+        if self.compact_bytes <= 0:
+            return
+        with self._guard:
+            if self.log.size() <= self.compact_bytes:
+                return
+        with self._guard, self.log.locked():
+            # Another process may have compacted while this one waited for the lock
+            self._catch_up()
+            if self.log.size() > self.compact_bytes:
+                self.compact_log()
+
+    def _install_checkpoint(self) -> None:
+        """Move the data files written by the compaction that started the current log into place"""
+        directories = {}
+        for filename in self.log.checkpoint_files:
+            pending = self._pending_path(filename, self.log.epoch)
+            if os.path.exists(pending):
+                os.replace(pending, filename)
+                directories[os.path.dirname(os.path.abspath(filename))] = filename
+        for filename in directories.values():
+            fsync_directory(filename)
+
+    def _write_file(self, path: str, records: List[Dict], fmt: str) -> None:
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(path, 'wb') as file:
+            file.write(formats.encode(records, fmt))
+            file.flush()
+            os.fsync(file.fileno())
+
+    def compact_log(self) -> List[str]:
+        """
+        Write each file changed in the log with its changes applied, then start an
+        empty log. New files are written beside the old ones and only moved into
+        place once the new log names them, so a crash at any point leaves either
+        the old files and log or the new ones. Returns the files rewritten.
+        """
+        with self._guard, self.log.locked():
+            self._catch_up()
+            self._install_checkpoint()
+            ops: Dict[str, List[Dict]] = {}
+            for _, transaction in self.log.read(self.log.data_start, self._applied):
+                for op in transaction["ops"]:
+                    ops.setdefault(op["file"], []).append(op)
+            if not ops and self.log.size() == self.log.data_start:
+                return []
+
+            epoch = self.log.epoch + 1
+            directories = {}
+            for filename, file_ops in ops.items():
+                table = _Table(self._load_snapshot(filename))
+                for op in file_ops:
+                    table.apply(op)
+                self._write_file(self._pending_path(filename, epoch), table.live(), self.format_of(filename))
+                directories[os.path.dirname(os.path.abspath(filename))] = filename
+            for filename in directories.values():
+                fsync_directory(filename)
+
+            self.log.start(epoch, sorted(ops))
+            self._applied, self._logged = self.log.data_start, set()
+            self._install_checkpoint()
+            return sorted(ops)
+
+    def recover(self) -> Dict[str, Any]:
+        """
+        Finish an interrupted compaction, cut off a transaction torn by a crash and
+        replay the log into memory. Call at startup, before anything else uses the
+        backend. Returns statistics on the log replayed.
+        """
+        start = time.perf_counter()
+        with self._guard, self.log.locked():
+            self.log.open()
+            if self.log.replaced():
+                self.log.reopen()
+            truncated = self.log.repair()
+            self._install_checkpoint()
+
+            for filename in self._tables:
+                self._bump(filename)
+            self._tables, self._dirty = {}, set()
+            self._applied, self._logged = self.log.data_start, set()
+            transactions = operations = 0
+            for end, transaction in self.log.read(self._applied):
+                for op in transaction["ops"]:
+                    table = self._tables.get(op["file"])
+                    if table is None:
+                        table = self._tables[op["file"]] = _Table(self._load_snapshot(op["file"]))
+                    table.apply(op)
+                    self._logged.add(op["file"])
+                transactions += 1
+                operations += len(transaction["ops"])
+                self._applied = end
+
+            for filename in self._logged:
+                self._bump(filename)
+                # Written by a compaction that crashed before it could start its new log
+                stale = self._pending_path(filename, self.log.epoch + 1)
+                if os.path.exists(stale):
+                    os.remove(stale)
+
+            return {
+                "log_bytes": self.log.size(),
+                "transactions": transactions,
+                "operations": operations,
+                "files": len(self._logged),
+                "truncated_bytes": truncated,
+                "seconds": time.perf_counter() - start
+            }
+
+    def cache_stats(self) -> Dict[str, Any]:
+        with self._guard:
+            return {
+                "tables": len(self._tables),
+                "log_bytes": self.log.size() if self._applied is not None else 0,
+                "logged_files": len(self._logged),
+                **self.log.stats
+            }
+
+    def clear_cache(self) -> None:
+        with self._guard:
+            self._drop_tables()
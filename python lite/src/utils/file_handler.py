@@ -1,36 +1,129 @@
-import json
-import os
-from typing import List, Dict, Any
-
-class FileHandler:
-    @staticmethod
-    def read_data(filename: str) -> List[Dict]:
-        if not os.path.exists(filename):
-            return []
-        try:
-            with open(filename, 'r') as file:
-                return json.load(file)
-        except json.JSONDecodeError:
-            return []
-
-    @staticmethod
-    def write_data(filename: str, data: List[Dict]) -> None:
-        os.makedirs(os.path.dirname(filename), exist_ok=True)
-        with open(filename, 'w') as file:
-            json.dump(data, file, indent=4)
-
-    @staticmethod
-    def append_data(filename: str, data: Dict) -> None:
-        existing_data = FileHandler.read_data(filename)
-        existing_data.append(data)
-        FileHandler.write_data(filename, existing_data)
-
-    @staticmethod
-    def update_data(filename: str, condition: callable, new_data: Dict) -> bool:
-        data = FileHandler.read_data(filename)
-        for i, item in enumerate(data):
-            if condition(item):
-                data[i].update(new_data)
-                FileHandler.write_data(filename, data)
-                return True
-        return False 
\ No newline at end of file
+from contextlib import contextmanager
+from typing import List, Dict, Any, Optional, Tuple, Iterator, Iterable
+
+from .. import config
+from ..storage import formats
+from ..storage.backend import StorageBackend, create_backend
+from ..storage.json_backend import JsonFileBackend
+
+class FileHandler:
+    """
+    Entry point the services use for all persistence. Calls are forwarded to the
+    configured StorageBackend (see src/config.py), so services are unaware of
+    whether records live in the data/*.txt files or in SQLite.
+    """
+
+    _backend: Optional[StorageBackend] = None
+
+    @staticmethod
+    def backend() -> StorageBackend:
+        if FileHandler._backend is None:
+            FileHandler._backend = create_backend(
+                config.STORAGE_BACKEND, path=config.SQLITE_PATH, wal=config.WAL, wal_path=config.WAL_PATH
+            )
+        return FileHandler._backend
+
+    @staticmethod
+    def set_backend(backend: StorageBackend) -> None:
+        FileHandler._backend = backend
+
+    @staticmethod
+    def initialize(filenames: List[str]) -> None:
+        FileHandler.backend().initialize(filenames)
+
+    @staticmethod
+    def use_json_lines(filename: str) -> None:
+        JsonFileBackend.json_lines_files.add(filename)
+
+    @staticmethod
+    def is_json_lines(filename: str) -> bool:
+        return filename in JsonFileBackend.json_lines_files
+
+    @staticmethod
+    def set_format(filename: str, fmt: str) -> None:
+        """Serialization used for future writes of filename by the JSON backend; see storage.formats"""
+        if fmt not in formats.FORMATS:
+            raise ValueError(f"Unknown file format: {fmt}")
+        JsonFileBackend.file_formats[filename] = fmt
+
+    @staticmethod
+    def migrate_to_json_lines(filename: str) -> bool:
+        backend = FileHandler.backend()
+        if isinstance(backend, JsonFileBackend):
+            return backend.migrate_to_json_lines(filename)
+        return False
+
+    @staticmethod
+    def iter_data(filename: str) -> Iterator[Dict]:
+        return FileHandler.backend().iter_data(filename)
+
+    @staticmethod
+    def scan(filename: str, start: Optional[int] = None, reverse: bool = False) -> Iterator[Tuple[int, Dict]]:
+        """(position, record) pairs from start onwards, or backwards with reverse; see StorageBackend.scan"""
+        return FileHandler.backend().scan(filename, start, reverse)
+
+    @staticmethod
+    def read_data(filename: str) -> List[Dict]:
+        return FileHandler.backend().read_data(filename)
+
+    @staticmethod
+    def write_data(filename: str, data: List[Dict]) -> None:
+        FileHandler.backend().write_data(filename, data)
+
+    @staticmethod
+    def append_data(filename: str, data: Dict) -> None:
+        FileHandler.backend().append_data(filename, data)
+
+    @staticmethod
+    def update_records(filename: str, key: str, upserts: Iterable[Dict] = (), deletes: Iterable[Any] = ()) -> None:
+        """Insert or replace upserts by key and remove the records whose key is in deletes"""
+        FileHandler.backend().update_records(filename, key, upserts, deletes)
+
+    @staticmethod
+    def update_at(filename: str, position: int, record: Dict) -> None:
+        """Replace the record at a position returned by scan, leaving every other record where it is"""
+        FileHandler.backend().update_at(filename, position, record)
+
+    @staticmethod
+    def accumulate(filename: str, deltas: Dict) -> None:
+        """Add deltas to the numbers in the collection's single record, such as running totals"""
+        FileHandler.backend().accumulate(filename, deltas)
+
+    @staticmethod
+    def generation(filename: str) -> int:
+        """Counter that changes whenever the contents of filename may have changed"""
+        return FileHandler.backend().generation(filename)
+
+    @staticmethod
+    def version(filename: str) -> int:
+        """Persistent per-file write counter"""
+        return FileHandler.backend().version(filename)
+
+    @staticmethod
+    @contextmanager
+    def locked(*filenames: str) -> Iterator[None]:
+        """Hold an exclusive, re-entrant lock on each file for the duration of the block"""
+        with FileHandler.backend().locked(*filenames):
+            yield
+
+    @staticmethod
+    def lock_stats() -> Dict[str, float]:
+        return FileHandler.backend().lock_stats()
+
+    @staticmethod
+    def cache_stats() -> Dict[str, Any]:
+        return FileHandler.backend().cache_stats()
+
+    @staticmethod
+    def clear_cache() -> None:
+        FileHandler.backend().clear_cache()
+
+    @staticmethod
+    def recover() -> Optional[Dict[str, Any]]:
+        """Replay the write-ahead log after a restart (see StorageBackend.recover)"""
+        return FileHandler.backend().recover()
+
+    @staticmethod
+    def compact_log() -> Optional[List[str]]:
+        """Fold the write-ahead log into the data files; None if the backend keeps no log"""
+        return FileHandler.backend().compact_log()
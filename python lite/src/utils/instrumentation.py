@@ -0,0 +1,324 @@
+import functools
+import json
+import sys
+import threading
+import time
+from bisect import bisect_left
+from typing import Any, Callable, Dict, Iterator, List, Tuple
+
+from ..storage import formats, wal
+
+# Upper bounds in seconds of the latency histogram buckets; one more bucket catches the rest
+BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# FileHandler entry points that read or write records
+FILE_METHODS = (
+    "iter_data", "scan", "read_data", "write_data", "append_data", "update_records", "update_at", "accumulate"
+)
+
+class Histogram:
+    __slots__ = ("counts", "count", "total")
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS) + 1)
+        self.count = 0
+        self.total = 0.0
+
+    def observe(self, seconds: float) -> None:
+        self.counts[bisect_left(BUCKETS, seconds)] += 1
+        self.count += 1
+        self.total += seconds
+
+    def quantile(self, fraction: float) -> float:
+        """Upper bound of the bucket holding the given quantile"""
+        rank = fraction * self.count
+        seen = 0
+        for bound, count in zip(BUCKETS, self.counts):
+            seen += count
+            if seen >= rank:
+                return bound
+        return float("inf")
+
+    def to_dict(self) -> Dict[str, Any]:
+        cumulative, buckets = 0, {}
+        for bound, count in zip(BUCKETS + ("+Inf",), self.counts):
+            cumulative += count
+            buckets[str(bound)] = cumulative
+        return {
+            "count": self.count,
+            "total_seconds": self.total,
+            "mean_seconds": self.total / self.count if self.count else 0.0,
+            "p50_seconds": self.quantile(0.5),
+            "p99_seconds": self.quantile(0.99),
+            "buckets": buckets
+        }
+
+class Instrumentation:
+    """
+    Opt-in call timing for AuthService, InventoryService and OrderService
+    classmethods and FileHandler reads and writes, plus bytes and parse time of
+    the data file codecs. enable() swaps timing wrappers in place of the
+    originals and disable() puts the originals back, so nothing is measured
+    and nothing costs anything while it is off.
+    """
+
+    _enabled = False
+    # (owner, attribute name, original attribute) for every wrapper installed
+    _patched: List[Tuple[Any, str, Any]] = []
+    # (method, file) -> latency histogram; file is "" for service methods
+    _calls: Dict[Tuple[str, str], Histogram] = {}
+    _io: Dict[str, float] = {}
+    # operation -> failures recovered from; counted whether or not recording is enabled
+    _failures: Dict[str, int] = {}
+    _lock = threading.Lock()
+
+    @classmethod
+    def enabled(cls) -> bool:
+        return cls._enabled
+
+    @classmethod
+    def enable(cls) -> None:
+        if cls._enabled:
+            return
+        # Imported here: the services import modules that import this one
+        from ..services.auth_service import AuthService
+        from ..services.inventory_service import InventoryService
+        from ..services.order_service import OrderService
+        from .file_handler import FileHandler
+
+        for service in (AuthService, InventoryService, OrderService):
+            for name, attribute in list(vars(service).items()):
+                if isinstance(attribute, classmethod):
+                    wrapper = cls._timed(f"{service.__name__}.{name}", attribute.__func__, with_file=False)
+                    cls._patch(service, name, classmethod(wrapper))
+        for name in FILE_METHODS:
+            function = vars(FileHandler)[name].__func__
+            wrapper = cls._timed(f"FileHandler.{name}", function, with_file=True)
+            cls._patch(FileHandler, name, staticmethod(wrapper))
+
+        cls._patch(formats, "decode", cls._counted_decode(formats.decode))
+        cls._patch(formats, "decode_lines", cls._counted_decode_lines(formats.decode_lines))
+        cls._patch(formats, "decode_line", cls._counted_decode_line(formats.decode_line, "lines_parsed"))
+        cls._patch(formats, "encode", cls._counted_encode(formats.encode))
+        cls._patch(wal, "decode_line", cls._counted_decode_line(wal.decode_line, "log_lines_read"))
+        cls._patch(wal, "encode_line", cls._counted_encode_line(wal.encode_line))
+        cls._enabled = True
+
+    @classmethod
+    def disable(cls) -> None:
+        for owner, name, original in reversed(cls._patched):
+            setattr(owner, name, original)
+        cls._patched = []
+        cls._enabled = False
+
+    @classmethod
+    def reset(cls) -> None:
+        with cls._lock:
+            cls._calls = {}
+            cls._io = {}
+            cls._failures = {}
+
+    @classmethod
+    def _patch(cls, owner: Any, name: str, replacement: Any) -> None:
+        cls._patched.append((owner, name, vars(owner)[name]))
+        setattr(owner, name, replacement)
+
+    @classmethod
+    def _observe(cls, method: str, file: str, seconds: float) -> None:
+        with cls._lock:
+            histogram = cls._calls.get((method, file))
+            if histogram is None:
+                histogram = cls._calls[(method, file)] = Histogram()
+            histogram.observe(seconds)
+
+    @classmethod
+    def _count(cls, **amounts: float) -> None:
+        with cls._lock:
+            for name, amount in amounts.items():
+                cls._io[name] = cls._io.get(name, 0) + amount
+
+    @classmethod
+    def record_failure(cls, operation: str, error: Exception, hint: str = "") -> None:
+        """Count a failure the caller carries on after, and report it on stderr"""
+        with cls._lock:
+            cls._failures[operation] = cls._failures.get(operation, 0) + 1
+        print(f"Warning: {operation} failed: {error}. {hint}".rstrip(), file=sys.stderr)
+
+    @classmethod
+    def _timed(cls, method: str, function: Callable, with_file: bool) -> Callable:
+        if function.__name__ in ("iter_data", "scan"):
+            # A generator: time how long it takes to consume, not to create
+            @functools.wraps(function)
+            def timed_iter(filename, *args, **kwargs) -> Iterator:
+                start = time.perf_counter()
+                try:
+                    yield from function(filename, *args, **kwargs)
+                finally:
+                    cls._observe(method, filename, time.perf_counter() - start)
+            return timed_iter
+
+        @functools.wraps(function)
+        def timed(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                # FileHandler methods take the file name first; services take cls
+                file = args[0] if with_file and args and isinstance(args[0], str) else ""
+                cls._observe(method, file, time.perf_counter() - start)
+        return timed
+
+    @classmethod
+    def _counted_decode(cls, decode: Callable) -> Callable:
+        @functools.wraps(decode)
+        def counted(raw: bytes):
+            start = time.perf_counter()
+            records = decode(raw)
+            cls._count(bytes_read=len(raw), parse_seconds=time.perf_counter() - start, files_parsed=1)
+            return records
+        return counted
+
+    @classmethod
+    def _counted_decode_lines(cls, decode_lines: Callable) -> Callable:
+        @functools.wraps(decode_lines)
+        def counted(lines):
+            total = 0
+
+            def measured(lines):
+                nonlocal total
+                for line in lines:
+                    total += len(line)
+                    yield line
+
+            # Only time spent producing records counts, not the caller's work between them.
+            # Reading the lines is interleaved with parsing them, so it is included.
+            records = decode_lines(measured(lines))
+            parse_seconds = 0.0
+            try:
+                while True:
+                    start = time.perf_counter()
+                    try:
+                        record = next(records)
+                    except StopIteration:
+                        break
+                    finally:
+                        parse_seconds += time.perf_counter() - start
+                    yield record
+            finally:
+                cls._count(bytes_read=total, parse_seconds=parse_seconds, files_parsed=1)
+        return counted
+
+    @classmethod
+    def _counted_decode_line(cls, decode_line: Callable, counter: str) -> Callable:
+        # One record at a time, as read by scan, paging and write-ahead log replay
+        @functools.wraps(decode_line)
+        def counted(line: bytes):
+            start = time.perf_counter()
+            record = decode_line(line)
+            cls._count(bytes_read=len(line), parse_seconds=time.perf_counter() - start, **{counter: 1})
+            return record
+        return counted
+
+    @classmethod
+    def _counted_encode_line(cls, encode_line: Callable) -> Callable:
+        @functools.wraps(encode_line)
+        def counted(payload):
+            start = time.perf_counter()
+            raw = encode_line(payload)
+            cls._count(bytes_written=len(raw), serialize_seconds=time.perf_counter() - start, log_lines_written=1)
+            return raw
+        return counted
+
+    @classmethod
+    def _counted_encode(cls, encode: Callable) -> Callable:
+        @functools.wraps(encode)
+        def counted(records, fmt):
+            start = time.perf_counter()
+            raw = encode(records, fmt)
+            cls._count(bytes_written=len(raw), serialize_seconds=time.perf_counter() - start, files_written=1)
+            return raw
+        return counted
+
+    @classmethod
+    def snapshot(cls) -> Dict[str, Any]:
+        with cls._lock:
+            calls = [
+                {"method": method, "file": file, **histogram.to_dict()}
+                for (method, file), histogram in sorted(cls._calls.items())
+            ]
+            io = dict(cls._io)
+            failures = dict(cls._failures)
+        # Imported here: the services import modules that import this one
+        from .file_handler import FileHandler
+        return {"enabled": cls._enabled, "calls": calls, "io": io, "failures": failures,
+                "locks": FileHandler.lock_stats()}
+
+    @classmethod
+    def to_json(cls) -> str:
+        return json.dumps(cls.snapshot(), indent=4)
+
+    @classmethod
+    def to_prometheus(cls) -> str:
+        """Prometheus text exposition format"""
+        def labels(**values: str) -> str:
+            escaped = (
+                (name, value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n"))
+                for name, value in values.items() if value
+            )
+            return "{" + ",".join(f'{name}="{value}"' for name, value in escaped) + "}"
+
+        snapshot = cls.snapshot()
+        lines = [
+            "# HELP retail_call_duration_seconds Time spent in service and storage calls",
+            "# TYPE retail_call_duration_seconds histogram"
+        ]
+        for call in snapshot["calls"]:
+            for bound, count in call["buckets"].items():
+                lines.append(
+                    f"retail_call_duration_seconds_bucket{labels(method=call['method'], file=call['file'], le=bound)}"
+                    f" {count}"
+                )
+            series = labels(method=call["method"], file=call["file"])
+            lines.append(f"retail_call_duration_seconds_sum{series} {call['total_seconds']}")
+            lines.append(f"retail_call_duration_seconds_count{series} {call['count']}")
+
+        help_text = {
+            "bytes_read": "Bytes of data files decoded",
+            "bytes_written": "Bytes of data files encoded for writing",
+            "parse_seconds": "Time spent decoding data files",
+            "serialize_seconds": "Time spent encoding data files",
+            "files_parsed": "Data file decodes",
+            "files_written": "Data file encodes",
+            "lines_parsed": "JSON Lines records decoded one at a time by scans and paging",
+            "log_lines_read": "Write-ahead log transactions decoded",
+            "log_lines_written": "Write-ahead log transactions encoded"
+        }
+        for name, text in help_text.items():
+            lines.append(f"# HELP retail_{name}_total {text}")
+            lines.append(f"# TYPE retail_{name}_total counter")
+            lines.append(f"retail_{name}_total {snapshot['io'].get(name, 0)}")
+
+        lines.append("# HELP retail_failures_total Failures recovered from, such as sales totals not updated")
+        lines.append("# TYPE retail_failures_total counter")
+        for operation, count in sorted(snapshot["failures"].items()):
+            lines.append(f"retail_failures_total{labels(operation=operation)} {count}")
+
+        lock_help = {
+            "acquisitions": "File lock acquisitions",
+            "contended": "File lock acquisitions that waited for another writer",
+            "total_wait_seconds": "Time spent waiting for file locks"
+        }
+        for name, text in lock_help.items():
+            metric = f"retail_lock_{name.replace('total_', '')}_total"
+            lines.append(f"# HELP {metric} {text}")
+            lines.append(f"# TYPE {metric} counter")
+            lines.append(f"{metric} {snapshot['locks'][name]}")
+        lines.append("# HELP retail_lock_max_wait_seconds Longest wait for a file lock")
+        lines.append("# TYPE retail_lock_max_wait_seconds gauge")
+        lines.append(f"retail_lock_max_wait_seconds {snapshot['locks']['max_wait_seconds']}")
+        return "\n".join(lines) + "\n"
+
+    @classmethod
+    def dump(cls, path: str, fmt: str = "json") -> None:
+        with open(path, "w") as file:
+            file.write(cls.to_prometheus() if fmt == "prometheus" else cls.to_json())
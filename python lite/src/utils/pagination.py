@@ -0,0 +1,44 @@
+import base64
+import binascii
+import json
+from bisect import bisect_left, bisect_right
+from typing import Any, Callable, List, Optional, Sequence, Tuple
+
+def encode_cursor(sort: str, *key: Any) -> str:
+    """Opaque page cursor holding the sort order and the sort key of the next page's first row"""
+    raw = json.dumps([sort, *key], separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+def decode_cursor(cursor: str, sort: str) -> Tuple:
+    """The key stored in cursor. Raises ValueError if it is malformed or was made for another sort"""
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+    except (binascii.Error, ValueError):
+        raise ValueError("Invalid page cursor")
+    if not isinstance(values, list) or not values or values[0] != sort:
+        raise ValueError(f"Page cursor does not belong to sort order {sort}")
+    return tuple(values[1:])
+
+def keyset_page(keys: Sequence[Tuple], rows: Sequence, sort: str, page_size: int, cursor: Optional[str],
+                descending: bool = False, accept: Callable[[Any], bool] = lambda row: True) -> Tuple[List, Optional[str]]:
+    """
+    One page of rows, which are sorted by their keys, and the cursor of the page
+    after it (None on the last page). The cursor is a key rather than an offset,
+    so rows added or removed since the previous page do not shift it.
+    """
+    if page_size <= 0:
+        raise ValueError("Page size must be positive")
+    if descending:
+        first = len(keys) - 1 if cursor is None else bisect_right(keys, decode_cursor(cursor, sort)) - 1
+        positions = range(first, -1, -1)
+    else:
+        first = 0 if cursor is None else bisect_left(keys, decode_cursor(cursor, sort))
+        positions = range(first, len(keys))
+
+    page = []
+    for position in positions:
+        if accept(rows[position]):
+            if len(page) == page_size:
+                return page, encode_cursor(sort, *keys[position])
+            page.append(rows[position])
+    return page, None
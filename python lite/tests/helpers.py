@@ -0,0 +1,48 @@
+import os
+import tempfile
+import unittest
+
+from src.models.item import Item
+from src.repositories.cart_repository import CartRepository
+from src.repositories.inventory_repository import InventoryRepository
+from src.repositories.order_repository import OrderRepository
+from src.repositories.user_repository import UserRepository
+from src.services.analytics_service import AnalyticsService
+from src.storage.backend import StorageBackend
+from src.storage.json_backend import JsonFileBackend
+from src.utils.file_handler import FileHandler
+
+def item(i: int, quantity: int = 10, price: float = None) -> dict:
+    return Item(f"sku{i}", f"Item {i}", 1.0 + i if price is None else price, quantity, f"Test item {i}").to_dict()
+
+def reset_caches() -> None:
+    """Forget what the repositories cached: their generations restart with each backend"""
+    for repository in (InventoryRepository, UserRepository, CartRepository, OrderRepository):
+        repository._generation = None
+    InventoryRepository._sorted = {}
+    OrderRepository._orders_version = None
+    AnalyticsService._frame = None
+
+class DataDirectoryTestCase(unittest.TestCase):
+    """Runs each test in an empty data/ directory of its own, stored through make_backend()"""
+
+    def make_backend(self) -> StorageBackend:
+        return JsonFileBackend()
+
+    def setUp(self):
+        self._cwd = os.getcwd()
+        self._directory = tempfile.TemporaryDirectory(prefix="retail-test-")
+        os.chdir(self._directory.name)
+        os.makedirs("data")
+        self.use_backend(self.make_backend())
+
+    def tearDown(self):
+        FileHandler.set_backend(None)
+        reset_caches()
+        os.chdir(self._cwd)
+        self._directory.cleanup()
+
+    def use_backend(self, backend: StorageBackend) -> None:
+        """Switch to backend, as a new process would"""
+        FileHandler.set_backend(backend)
+        reset_caches()
@@ -0,0 +1,80 @@
+"""
+API request handling, called the way the server's worker threads call it,
+without a network connection.
+"""
+import json
+import unittest
+from http import HTTPStatus
+from typing import Any, Optional, Tuple
+
+from src.api.server import HTTPError, Request, RetailServer
+from src.models.user import User, UserRole, UserStatus
+from src.repositories.inventory_repository import InventoryRepository
+from src.repositories.order_repository import OrderRepository
+from src.repositories.user_repository import UserRepository
+from tests.helpers import DataDirectoryTestCase, item
+
+class ApiServerTest(DataDirectoryTestCase):
+    def setUp(self):
+        super().setUp()
+        self.server = RetailServer()
+        for username, role in (("alice", UserRole.CUSTOMER), ("bob", UserRole.CUSTOMER), ("admin", UserRole.ADMIN)):
+            UserRepository.add(User(username, "password", role, UserStatus.APPROVED).to_dict())
+        InventoryRepository.upsert_many(item(i) for i in range(5))
+
+    def call(self, method: str, target: str, username: str, body: Optional[dict] = None) -> Tuple[HTTPStatus, Any]:
+        request = Request(method, target, {}, json.dumps(body).encode() if body is not None else b"")
+        request.username = username
+        return self.server._run(self.server._match(request), request)
+
+    def assertRejected(self, method: str, target: str, username: str, body: Optional[dict] = None) -> str:
+        with self.assertRaises(HTTPError) as raised:
+            self.call(method, target, username, body)
+        self.assertEqual(raised.exception.status, HTTPStatus.BAD_REQUEST)
+        return raised.exception.message
+
+    def pages(self, target: str, username: str) -> list:
+        """Follow next_cursor from target to the last page; returns the ids on each page"""
+        pages, cursor = [], None
+        while True:
+            status, page = self.call("GET", target + (f"&cursor={cursor}" if cursor else ""), username)
+            self.assertEqual(status, HTTPStatus.OK)
+            pages.append([row.get("order_id", row.get("item_id")) for row in page["results"]])
+            cursor = page["next_cursor"]
+            if cursor is None:
+                return pages
+
+    def test_booleans_are_not_numbers(self):
+        for quantity in (True, False, 1.5, "two"):
+            with self.subTest(quantity=quantity):
+                self.assertEqual(self.assertRejected("POST", "/cart", "alice", {"item_id": "sku0", "quantity": quantity}),
+                                 "Invalid quantity")
+        status, result = self.call("POST", "/cart", "alice", {"item_id": "sku0", "quantity": 2.0})
+        self.assertTrue(result["success"], result)
+
+    def test_items_are_listed_a_page_at_a_time(self):
+        self.assertEqual(self.pages("/items?limit=2", "alice"), [["sku0", "sku1"], ["sku2", "sku3"], ["sku4"]])
+        status, page = self.call("GET", "/items", "alice")
+        self.assertEqual((len(page["results"]), page["next_cursor"]), (5, None))
+
+    def test_orders_are_listed_newest_first_a_page_at_a_time(self):
+        for i in range(5):
+            OrderRepository.append({"username": "alice" if i != 2 else "bob", "items": [], "total": 1.0,
+                                    "status": "processing", "timestamp": f"2024-01-0{i + 1}T00:00:00"})
+        self.assertEqual(self.pages("/orders?limit=2", "alice"), [[5, 4], [2, 1]])
+        # A customer cannot list someone else's orders
+        self.assertEqual(self.pages("/orders?limit=2&username=bob", "alice"), [[5, 4], [2, 1]])
+        self.assertEqual(self.pages("/orders?limit=2&username=bob", "admin"), [[3]])
+        self.assertEqual(self.pages("/orders?limit=10", "admin"), [[5, 4, 3, 2, 1]])
+
+    def test_invalid_page_arguments_are_rejected(self):
+        self.assertEqual(self.assertRejected("GET", "/items?limit=0", "alice"), "limit must be between 1 and 100")
+        self.assertEqual(self.assertRejected("GET", "/orders?limit=101", "alice"), "limit must be between 1 and 100")
+        self.assertEqual(self.assertRejected("GET", "/items?cursor=!!", "alice"), "Invalid page cursor")
+        # An item cursor does not continue an order listing
+        status, page = self.call("GET", "/items?limit=1", "alice")
+        self.assertEqual(self.assertRejected("GET", f"/orders?cursor={page['next_cursor']}", "alice"),
+                         "Page cursor does not belong to sort order -timestamp")
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,72 @@
+"""
+Per-customer carts and the item -> customers index kept alongside them.
+"""
+import unittest
+
+from src.models.user import User, UserRole, UserStatus
+from src.repositories.cart_repository import CartRepository
+from src.repositories.user_repository import UserRepository
+from src.services.order_service import OrderService
+from src.utils.file_handler import FileHandler
+from tests.helpers import DataDirectoryTestCase
+
+class CartRepositoryTest(DataDirectoryTestCase):
+    def setUp(self):
+        super().setUp()
+        for username in ("alice", "bob", "carol"):
+            UserRepository.add(User(username, "password", UserRole.CUSTOMER, UserStatus.APPROVED).to_dict())
+
+    def quantities(self, username: str) -> dict:
+        return {line["item_id"]: line["quantity"] for line in CartRepository.get(username)}
+
+    def test_repeated_item_is_merged(self):
+        CartRepository.add("alice", "sku1", 1)
+        CartRepository.add("alice", "sku1", 2)
+        self.assertEqual(self.quantities("alice"), {"sku1": 3})
+        self.assertEqual(CartRepository.holders("sku1"), ["alice"])
+
+    def test_index_follows_items_entering_and_leaving_carts(self):
+        CartRepository.add("alice", "sku1", 1)
+        CartRepository.add("bob", "sku1", 1)
+        CartRepository.add("bob", "sku2", 1)
+        self.assertEqual(CartRepository.holders("sku1"), ["alice", "bob"])
+
+        CartRepository.clear("alice")
+        self.assertEqual(CartRepository.holders("sku1"), ["bob"])
+        CartRepository.replace("bob", [line for line in CartRepository.get("bob") if line["item_id"] != "sku2"])
+        self.assertEqual(CartRepository.holders("sku2"), [])
+        self.assertEqual(OrderService.check_cart_index(), [])
+
+    def test_remove_item_changes_only_the_carts_holding_it(self):
+        CartRepository.add("alice", "sku1", 1)
+        CartRepository.add("alice", "sku2", 1)
+        CartRepository.add("bob", "sku2", 1)
+        self.assertEqual(CartRepository.remove_item("sku1"), ["alice"])
+        self.assertEqual(self.quantities("alice"), {"sku2": 1})
+        self.assertEqual(self.quantities("bob"), {"sku2": 1})
+        self.assertEqual(CartRepository.lines_for_item("sku2").keys(), {"alice", "bob"})
+
+    def test_stale_index_is_reported_and_rebuilt(self):
+        CartRepository.add("alice", "sku1", 1)
+        # A crash between writing a cart and updating the index leaves the cart unindexed
+        FileHandler.write_data(CartRepository.shard("carol"), [{"username": "carol", "item_id": "sku1", "quantity": 1}])
+        self.assertEqual(OrderService.check_cart_index(), ["sku1: index lists alice, carts held by alice, carol"])
+
+        self.assertEqual(OrderService.rebuild_cart_index(), 1)
+        self.assertEqual(OrderService.check_cart_index(), [])
+        self.assertEqual(CartRepository.remove_item("sku1"), ["alice", "carol"])
+
+    def test_legacy_cart_file_is_split_per_customer(self):
+        FileHandler.write_data(OrderService.CART_FILE, [
+            {"username": "alice", "item_id": "sku1", "quantity": 1},
+            {"username": "bob", "item_id": "sku2", "quantity": 2},
+            {"username": "alice", "item_id": "sku1", "quantity": 3},
+        ])
+        self.assertEqual(CartRepository.import_legacy(OrderService.CART_FILE), 2)
+        self.assertEqual(self.quantities("alice"), {"sku1": 4})
+        self.assertEqual(self.quantities("bob"), {"sku2": 2})
+        self.assertEqual(FileHandler.read_data(OrderService.CART_FILE), [])
+        self.assertEqual(OrderService.check_cart_index(), [])
+
+if __name__ == "__main__":
+    unittest.main()
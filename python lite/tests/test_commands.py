@@ -0,0 +1,65 @@
+"""
+The maintenance subcommands of main.py, run as `python main.py <command>`.
+"""
+import contextlib
+import io
+import os
+import unittest
+from unittest import mock
+
+import main
+from src.repositories.inventory_repository import InventoryRepository
+from src.repositories.order_repository import OrderRepository
+from src.storage.wal_backend import WalBackend
+from src.utils.file_handler import FileHandler
+from tests.helpers import DataDirectoryTestCase, item
+
+MAINTENANCE_COMMANDS = (
+    "migrate-sqlite", "rebuild-sales", "check-sales", "rebuild-order-index", "rebuild-cart-index",
+    "check-cart-index", "compact-log", "compact-inventory"
+)
+
+class MaintenanceCommandTest(DataDirectoryTestCase):
+    def make_backend(self) -> WalBackend:
+        return WalBackend("data/wal.log", compact_bytes=0)
+
+    def run_command(self, *argv: str) -> str:
+        output = io.StringIO()
+        with contextlib.redirect_stdout(output):
+            try:
+                main.run_command(list(argv))
+            except SystemExit:
+                pass
+        return output.getvalue()
+
+    def test_every_maintenance_command_recovers_first(self):
+        for command in MAINTENANCE_COMMANDS:
+            with self.subTest(command=command):
+                argv = [command, "--db", "data/retail.db"] if command == "migrate-sqlite" else [command]
+                with mock.patch.object(FileHandler, "recover", wraps=FileHandler.recover) as recover:
+                    self.run_command(*argv)
+                recover.assert_called_once_with()
+
+    def test_interrupted_compaction_is_finished_before_rebuilding(self):
+        InventoryRepository.upsert(item(0))
+        OrderRepository.append({"username": "alice", "items": [], "total": 0.0, "status": "processing",
+                                "timestamp": "2024-01-01T00:00:00"})
+        install = WalBackend._install_checkpoint
+
+        def crash_on_second_install(backend):
+            if backend.log.epoch == 1:
+                raise SystemExit("crash")
+            install(backend)
+
+        with mock.patch.object(WalBackend, "_install_checkpoint", crash_on_second_install):
+            with self.assertRaises(SystemExit):
+                FileHandler.compact_log()
+        self.assertTrue(os.path.exists(OrderRepository.ORDERS_FILE + ".wal-1"))
+
+        self.use_backend(self.make_backend())
+        self.assertEqual(self.run_command("rebuild-order-index"), "Indexed 1 orders\n")
+        self.assertFalse([name for name in os.listdir("data") if ".wal-" in name])
+        self.assertEqual(OrderRepository.get(1)["username"], "alice")
+
+if __name__ == "__main__":
+    unittest.main()
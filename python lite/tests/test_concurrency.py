@@ -0,0 +1,98 @@
+"""
+Repository reads running on other threads while a writer changes the same
+repository, as the API server's executor threads do. Run from the project
+directory:
+    python -m pytest tests
+"""
+import sys
+import threading
+import unittest
+from typing import Callable, List
+
+from src.models.user import User, UserRole, UserStatus
+from src.repositories.cart_repository import CartRepository
+from src.repositories.inventory_repository import InventoryRepository
+from src.repositories.order_repository import OrderRepository
+from src.repositories.user_repository import UserRepository
+from src.utils.file_handler import FileHandler
+from tests.helpers import DataDirectoryTestCase, item
+
+READERS = 3
+WRITES = 100
+ITEMS = 1000
+
+class ConcurrentReadWriteTest(DataDirectoryTestCase):
+    def run_concurrently(self, write: Callable[[int], None], read: Callable[[], None]) -> None:
+        """Call write(0..WRITES-1) on one thread while READERS threads call read until it is done"""
+        errors: List[BaseException] = []
+        done = threading.Event()
+        # Switch threads far more often than usual so that unguarded reads race with the writes
+        switch_interval = sys.getswitchinterval()
+        sys.setswitchinterval(1e-6)
+
+        def reader():
+            try:
+                while not done.is_set():
+                    read()
+            except BaseException as e:
+                errors.append(e)
+
+        threads = [threading.Thread(target=reader) for _ in range(READERS)]
+        for thread in threads:
+            thread.start()
+        try:
+            for i in range(WRITES):
+                write(i)
+        finally:
+            done.set()
+            for thread in threads:
+                thread.join()
+            sys.setswitchinterval(switch_interval)
+        self.assertEqual(errors, [])
+
+    def test_inventory(self):
+        InventoryRepository.upsert_many(item(i) for i in range(ITEMS))
+
+        def read():
+            InventoryRepository.sorted_by("name", lambda record: (record["name"], record["item_id"]))
+            InventoryRepository.search("item")
+            InventoryRepository.most_critical()
+            InventoryRepository.all()
+
+        def write(i):
+            # New items grow the index; lowering stock moves items through the low-stock index
+            InventoryRepository.upsert(item(ITEMS + i))
+            InventoryRepository.upsert(item(i, quantity=i % 7))
+
+        self.run_concurrently(write, read)
+        self.assertEqual(len(InventoryRepository.all()), ITEMS + WRITES)
+
+    def test_users(self):
+        def write(i):
+            UserRepository.add(User(f"user{i}", "password", UserRole.CUSTOMER, UserStatus.PENDING).to_dict())
+
+        self.run_concurrently(write, lambda: (UserRepository.all(), UserRepository.find("USER0")))
+        self.assertEqual(len(UserRepository.all()), WRITES)
+
+    def test_carts(self):
+        def write(i):
+            CartRepository.add(f"user{i % 10}", f"sku{i}", 1)
+            if i % 3 == 0:
+                CartRepository.clear(f"user{(i + 5) % 10}")
+
+        self.run_concurrently(write, lambda: CartRepository.holders("sku0"))
+
+    def test_orders(self):
+        def write(i):
+            OrderRepository.append({
+                "username": f"user{i % 5}", "items": [], "total": 0.0, "status": "processing",
+                "timestamp": f"2024-01-01T00:{i // 60:02d}:{i % 60:02d}"
+            })
+
+        self.run_concurrently(write, lambda: (OrderRepository.for_user("user0"), OrderRepository.get(1)))
+        self.assertEqual(len(OrderRepository.for_user("user0")), WRITES // 5)
+        self.assertEqual([order["order_id"] for order in FileHandler.read_data(OrderRepository.ORDERS_FILE)],
+                         list(range(1, WRITES + 1)))
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,81 @@
+"""
+Data file formats: each reads back what it wrote, and a file is read
+correctly whatever format it was last written in.
+"""
+import unittest
+from unittest import mock
+
+from src.services.order_service import OrderService
+from src.storage import formats
+from src.storage.json_backend import JsonFileBackend
+from src.utils.file_handler import FileHandler
+from tests.helpers import DataDirectoryTestCase
+
+RECORDS = [
+    {"item_id": "sku1", "name": "Écran 27\" — 4K", "price": 199.99, "quantity": 3, "tags": ["a", "b"]},
+    {"item_id": "sku2", "name": "", "price": 0.1 + 0.2, "quantity": 0, "details": {"ok": True, "note": None}},
+]
+
+class FormatTest(unittest.TestCase):
+    def test_round_trip(self):
+        for fmt in formats.FORMATS + (formats.JSON_LINES,):
+            with self.subTest(fmt=fmt):
+                raw = formats.encode(RECORDS, fmt)
+                self.assertEqual(formats.detect(raw), fmt if fmt != formats.COMPACT else formats.JSON)
+                self.assertEqual(formats.decode(raw), RECORDS)
+                self.assertEqual(formats.decode(formats.encode([], fmt)), [])
+
+    def test_empty_data(self):
+        self.assertIsNone(formats.detect(b" \n"))
+        self.assertEqual(formats.decode(b""), [])
+
+    def test_torn_json_lines_record_is_skipped(self):
+        raw = formats.encode(RECORDS, formats.JSON_LINES)
+        self.assertEqual(formats.decode(raw + b'{"item_id": "sku3", "na'), RECORDS)
+        self.assertEqual(list(formats.decode_lines(raw.splitlines() + [b"", b"{"])), RECORDS)
+
+    def test_unknown_binary_version_is_rejected(self):
+        raw = formats.encode(RECORDS, formats.BINARY)
+        with self.assertRaisesRegex(ValueError, "Unsupported binary data file version: 2"):
+            formats.decode(raw[:len(formats.MAGIC)] + b"\x02" + raw[len(formats.MAGIC) + 1:])
+        with self.assertRaises(ValueError):
+            formats.encode(RECORDS, "yaml")
+
+class FileFormatTest(DataDirectoryTestCase):
+    FILE = "data/items.txt"
+
+    def setUp(self):
+        super().setUp()
+        patcher = mock.patch.object(JsonFileBackend, "file_formats", {})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_switching_formats_keeps_the_records(self):
+        for fmt in formats.FORMATS + formats.FORMATS:
+            with self.subTest(fmt=fmt):
+                # Read in the format last written, then written in the next
+                records = FileHandler.read_data(self.FILE) or RECORDS
+                FileHandler.set_format(self.FILE, fmt)
+                FileHandler.write_data(self.FILE, records)
+                with open(self.FILE, "rb") as file:
+                    self.assertEqual(formats.detect(file.read()), fmt if fmt != formats.COMPACT else formats.JSON)
+                self.use_backend(JsonFileBackend())
+                self.assertEqual(FileHandler.read_data(self.FILE), RECORDS)
+                self.assertEqual(list(FileHandler.iter_data(self.FILE)), RECORDS)
+
+    def test_array_file_is_converted_to_json_lines(self):
+        # The order history as written before it was kept as JSON Lines
+        with open(OrderService.ORDERS_FILE, "wb") as file:
+            file.write(formats.encode(RECORDS, formats.JSON))
+        self.assertTrue(FileHandler.migrate_to_json_lines(OrderService.ORDERS_FILE))
+        with open(OrderService.ORDERS_FILE, "rb") as file:
+            self.assertEqual(file.read(), formats.encode(RECORDS, formats.JSON_LINES))
+        self.assertFalse(FileHandler.migrate_to_json_lines(OrderService.ORDERS_FILE))
+        self.assertEqual(FileHandler.read_data(OrderService.ORDERS_FILE), RECORDS)
+
+    def test_unknown_format_is_rejected(self):
+        with self.assertRaisesRegex(ValueError, "Unknown file format: yaml"):
+            FileHandler.set_format(self.FILE, "yaml")
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,80 @@
+"""
+Bulk imports: each invalid row is reported by number, and strict imports
+write nothing when any row is rejected.
+"""
+import unittest
+
+from src.repositories.inventory_repository import InventoryRepository
+from src.services.inventory_service import InventoryService
+from tests.helpers import DataDirectoryTestCase, item
+
+class BulkUpsertTest(DataDirectoryTestCase):
+    def setUp(self):
+        super().setUp()
+        InventoryRepository.upsert_many([item(0), item(1)])
+
+    def rejected(self, row: dict) -> str:
+        success, _, errors = InventoryService.bulk_upsert([row], strict=True)
+        self.assertFalse(success)
+        self.assertEqual(len(errors), 1)
+        return errors[0]
+
+    def test_rows_are_added_and_merged(self):
+        success, message, errors = InventoryService.bulk_upsert([
+            {"item_id": "sku0", "quantity": "4"},
+            {"item_id": "sku2", "name": "New", "price": "2.5", "quantity": 3},
+            {"item_id": "sku0", "price": "", "description": "Changed"},
+        ])
+        self.assertTrue(success)
+        self.assertEqual(message, "Imported 2 items (1 new, 1 updated), 0 rows rejected")
+        self.assertEqual(errors, [])
+        sku0 = InventoryRepository.get("sku0")
+        self.assertEqual((sku0["quantity"], sku0["price"], sku0["description"]), (4, 1.0, "Changed"))
+        self.assertEqual(InventoryRepository.get("sku2")["price"], 2.5)
+
+    def test_invalid_rows_are_reported_by_number(self):
+        success, message, errors = InventoryService.bulk_upsert([
+            {"item_id": "sku0", "quantity": "2.5"},
+            {"item_id": "sku1", "quantity": "5"},
+            "not a row",
+            {"item_id": "sku9", "name": "Missing price", "quantity": 1},
+        ], first_row=2)
+        self.assertTrue(success)
+        self.assertEqual(message, "Imported 1 items (0 new, 1 updated), 3 rows rejected")
+        self.assertEqual(errors, [
+            "row 2: quantity must be a whole number, got '2.5'",
+            "row 4: not a valid record",
+            "row 5: new item sku9 needs price",
+        ])
+        self.assertEqual(InventoryRepository.get("sku0")["quantity"], 10)
+        self.assertEqual(InventoryRepository.get("sku1")["quantity"], 5)
+
+    def test_strict_import_writes_nothing_on_error(self):
+        success, message, errors = InventoryService.bulk_upsert([
+            {"item_id": "sku0", "quantity": "1"},
+            {"item_id": "", "quantity": "1"},
+        ], strict=True)
+        self.assertFalse(success)
+        self.assertEqual(message, "1 invalid rows, nothing imported")
+        self.assertEqual(errors, ["row 2: item_id is required"])
+        self.assertEqual(InventoryRepository.get("sku0")["quantity"], 10)
+
+    def test_non_finite_prices_are_rejected(self):
+        for price in ("nan", "-nan", "inf", "-Infinity", float("nan"), float("inf")):
+            with self.subTest(price=price):
+                self.assertEqual(self.rejected({"item_id": "sku0", "price": price}),
+                                 f"row 1: price must be a finite number, got {price!r}")
+        self.assertEqual(self.rejected({"item_id": "sku0", "price": "-1"}), "row 1: price cannot be negative")
+        self.assertEqual(InventoryRepository.get("sku0")["price"], 1.0)
+
+    def test_counts_out_of_range_are_rejected(self):
+        too_large = InventoryService.MAX_COUNT + 1
+        self.assertEqual(self.rejected({"item_id": "sku0", "quantity": str(too_large)}),
+                         f"row 1: quantity cannot exceed {InventoryService.MAX_COUNT}")
+        self.assertEqual(self.rejected({"item_id": "sku0", "reorder_point": -1}),
+                         "row 1: reorder_point cannot be negative")
+        self.assertEqual(self.rejected({"item_id": "sku0", "quantity": True}),
+                         "row 1: quantity must be a whole number, got True")
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,128 @@
+"""
+The fixed-width inventory store (RETAIL_INVENTORY_ENGINE=mmap): batches of
+writes survive a crash whole or not at all, and the items it holds go back
+to the inventory file when the engine is turned off.
+"""
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+from src import config
+from src.repositories.inventory_repository import InventoryRepository
+from src.storage.mmap_inventory import MmapInventoryStore
+from src.utils.file_handler import FileHandler
+from tests.helpers import DataDirectoryTestCase, item
+
+class CrashedWrite(Exception):
+    pass
+
+class MmapInventoryStoreTest(unittest.TestCase):
+    def setUp(self):
+        self._directory = tempfile.TemporaryDirectory(prefix="retail-test-")
+        self.path = os.path.join(self._directory.name, "inventory")
+        self.store = MmapInventoryStore(self.path)
+        self.store.replace_all(item(i) for i in range(3))
+
+    def tearDown(self):
+        self.store.close()
+        self._directory.cleanup()
+
+    def reopened(self) -> MmapInventoryStore:
+        """The store as the next process finds it, after recovery"""
+        self.store.close()
+        self.store = MmapInventoryStore(self.path)
+        self.store.recover()
+        return self.store
+
+    def quantities(self, store: MmapInventoryStore) -> dict:
+        return {record["item_id"]: record["quantity"] for record in store.records()}
+
+    def crash_during_apply(self) -> None:
+        """Write a two-item batch that dies after the journal is synced but before the header is finished"""
+        original = MmapInventoryStore._apply
+
+        def apply_one_slot(store, version, used, slots, heap):
+            first = dict(list(slots.items())[:1])
+            original(store, version, used, first, heap)
+            raise CrashedWrite()
+
+        with mock.patch.object(MmapInventoryStore, "_apply", apply_one_slot):
+            with self.assertRaises(CrashedWrite):
+                with self.store.writing():
+                    self.store.put(item(0, quantity=1))
+                    self.store.put(item(1, quantity=2))
+
+    def test_round_trip(self):
+        with self.store.writing():
+            self.store.put(item(3))
+            self.store.put({**item(0, quantity=4), "name": "Renamed"})
+            self.store.delete("sku1")
+        records = {record["item_id"]: record for record in self.reopened().records()}
+        self.assertEqual(sorted(records), ["sku0", "sku2", "sku3"])
+        self.assertEqual(records["sku0"]["name"], "Renamed")
+        self.assertEqual(records["sku0"]["quantity"], 4)
+
+    def test_journaled_batch_is_replayed_whole(self):
+        self.crash_during_apply()
+        store = self.reopened()
+        self.assertEqual(self.quantities(store), {"sku0": 1, "sku1": 2, "sku2": 10})
+        self.assertEqual(store.version() % 2, 0)
+
+    def test_torn_journal_is_ignored(self):
+        with open(self.store.journal_path, "wb") as journal:
+            journal.write(b"\x01" * 40)
+        self.assertFalse(self.reopened().recover())
+        self.assertEqual(self.quantities(self.store), {"sku0": 10, "sku1": 10, "sku2": 10})
+
+    def test_failed_batch_writes_nothing(self):
+        with self.assertRaises(CrashedWrite):
+            with self.store.writing():
+                self.store.put(item(0, quantity=1))
+                raise CrashedWrite()
+        self.store.put(item(1, quantity=2))
+        self.assertEqual(self.quantities(self.reopened()), {"sku0": 10, "sku1": 2, "sku2": 10})
+
+    def test_compact_keeps_live_items(self):
+        self.store.delete("sku1")
+        self.store.put({**item(2), "description": "Changed"})
+        heap_size = os.path.getsize(self.store.heap_path)
+        self.store.compact()
+        self.assertLess(os.path.getsize(self.store.heap_path), heap_size)
+        records = self.reopened().records()
+        self.assertEqual([record["item_id"] for record in records], ["sku0", "sku2"])
+        self.assertEqual(records[1]["description"], "Changed")
+
+class ExportStoreTest(DataDirectoryTestCase):
+    def setUp(self):
+        super().setUp()
+        InventoryRepository._store = None
+        FileHandler.write_data(InventoryRepository.INVENTORY_FILE, [item(0), item(1)])
+
+    def tearDown(self):
+        if InventoryRepository._store is not None:
+            InventoryRepository._store.close()
+            InventoryRepository._store = None
+        super().tearDown()
+
+    def test_store_changes_reach_the_inventory_file(self):
+        with mock.patch.object(config, "INVENTORY_ENGINE", "mmap"):
+            InventoryRepository.upsert(item(0, quantity=3))
+            self.assertEqual(InventoryRepository.export_store(), 2)
+            self.assertTrue(os.path.exists(config.INVENTORY_MMAP_PATH + ".dat"))
+        stored = {record["item_id"]: record["quantity"] for record in FileHandler.read_data("data/inventory.txt")}
+        self.assertEqual(stored, {"sku0": 3, "sku1": 10})
+
+    def test_turning_the_engine_off_retires_the_store(self):
+        with mock.patch.object(config, "INVENTORY_ENGINE", "mmap"):
+            InventoryRepository.upsert(item(1, quantity=0))
+        InventoryRepository._store.close()
+        InventoryRepository._store = None
+
+        self.assertEqual(InventoryRepository.export_store(), 2)
+        self.assertFalse(os.path.exists(config.INVENTORY_MMAP_PATH + ".dat"))
+        self.assertEqual(InventoryRepository.get("sku1")["quantity"], 0)
+        self.assertIsNone(InventoryRepository.export_store())
+
+if __name__ == "__main__":
+    unittest.main()
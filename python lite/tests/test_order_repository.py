@@ -0,0 +1,70 @@
+"""
+The order history and its index by order ID and by customer, which must be
+rebuilt whenever the history moves under it.
+"""
+import unittest
+
+from src.repositories.order_repository import OrderRepository
+from src.utils.file_handler import FileHandler
+from tests.helpers import DataDirectoryTestCase
+
+ORDERS = OrderRepository.ORDERS_FILE
+INDEX = OrderRepository.INDEX_FILE
+
+def order(username: str, day: int) -> dict:
+    return {"username": username, "items": [], "total": float(day), "status": "processing",
+            "timestamp": f"2024-01-{day:02d}T00:00:00"}
+
+class OrderRepositoryTest(DataDirectoryTestCase):
+    def setUp(self):
+        super().setUp()
+        for day, username in enumerate(("alice", "bob", "alice", "alice"), 1):
+            OrderRepository.append(order(username, day))
+
+    def positions(self) -> dict:
+        return {entry["order_id"]: entry["position"] for entry in FileHandler.read_data(INDEX)}
+
+    def assertIndexMatchesHistory(self):
+        self.assertEqual(self.positions(), {order["order_id"]: position for position, order in FileHandler.scan(ORDERS)})
+
+    def test_lookups(self):
+        self.assertEqual(OrderRepository.get(2)["username"], "bob")
+        self.assertIsNone(OrderRepository.get(5))
+        self.assertEqual([o["order_id"] for o in OrderRepository.for_user("alice")], [1, 3, 4])
+        self.assertEqual([o["order_id"] for o in OrderRepository.for_user("alice", "2024-01-02", "2024-01-04")], [3])
+        self.assertIndexMatchesHistory()
+
+    def test_offsets_moved_by_a_rewrite_are_rebuilt(self):
+        # Order 1 grows, so every later order now starts further into the file
+        orders = FileHandler.read_data(ORDERS)
+        orders[0]["note"] = "x" * 100
+        FileHandler.write_data(ORDERS, orders)
+        stale = self.positions()
+
+        self.assertEqual(OrderRepository.get(3)["timestamp"], "2024-01-03T00:00:00")
+        self.assertNotEqual(self.positions(), stale)
+        self.assertIndexMatchesHistory()
+
+    def test_index_pointing_at_the_wrong_order_is_rebuilt(self):
+        entries = FileHandler.read_data(INDEX)
+        entries[1]["position"], entries[2]["position"] = entries[2]["position"], entries[1]["position"]
+        FileHandler.write_data(INDEX, entries)
+        self.assertEqual(OrderRepository.get(2)["username"], "bob")
+        self.assertIndexMatchesHistory()
+
+    def test_orders_appended_without_indexing_are_indexed_on_load(self):
+        # As left by a process that stopped between writing the order and its index entry
+        FileHandler.append_data(ORDERS, {"order_id": 5, **order("bob", 5)})
+        self.assertEqual([o["order_id"] for o in OrderRepository.for_user("bob")], [2, 5])
+        self.assertEqual(OrderRepository.append(order("bob", 6))["order_id"], 6)
+        self.assertIndexMatchesHistory()
+
+    def test_orders_without_ids_are_numbered_after_the_last_id(self):
+        FileHandler.append_data(ORDERS, order("carol", 5))
+        FileHandler.write_data(INDEX, [])
+        self.assertEqual(OrderRepository.rebuild(), 5)
+        self.assertEqual(OrderRepository.get(5)["username"], "carol")
+        self.assertIndexMatchesHistory()
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,68 @@
+"""
+Checkout: stock is checked and taken, the cart emptied and the order written
+together, and a failure part way through undoes the earlier steps.
+"""
+import unittest
+from unittest import mock
+
+from src.repositories.cart_repository import CartRepository
+from src.repositories.inventory_repository import InventoryRepository
+from src.repositories.order_repository import OrderRepository
+from src.services.order_service import OrderService
+from tests.helpers import DataDirectoryTestCase, item
+
+class CheckoutTest(DataDirectoryTestCase):
+    def setUp(self):
+        super().setUp()
+        InventoryRepository.upsert_many([item(0, quantity=5), item(1, quantity=1)])
+        CartRepository.add("alice", "sku0", 2)
+        CartRepository.add("alice", "sku1", 1)
+
+    def quantities(self) -> dict:
+        return {record["item_id"]: record["quantity"] for record in InventoryRepository.all()}
+
+    def cart(self) -> dict:
+        return {line["item_id"]: line["quantity"] for line in OrderService.get_cart("alice")}
+
+    def assertUnchanged(self):
+        self.assertEqual(self.quantities(), {"sku0": 5, "sku1": 1})
+        self.assertEqual(self.cart(), {"sku0": 2, "sku1": 1})
+        self.assertEqual(OrderService.get_orders(), [])
+
+    def test_checkout_places_the_order(self):
+        self.assertEqual(OrderService.checkout("alice"), (True, "Order #1 placed successfully. Total: $4.00"))
+        self.assertEqual(self.quantities(), {"sku0": 3, "sku1": 0})
+        self.assertEqual(self.cart(), {})
+        order = OrderService.get_order(1)
+        self.assertEqual([(line["item_id"], line["quantity"], line["price"]) for line in order["items"]],
+                         [("sku0", 2, 1.0), ("sku1", 1, 2.0)])
+        self.assertEqual(OrderService.get_sales_aggregates()["order_count"], 1)
+
+    def test_short_stock_changes_nothing(self):
+        CartRepository.add("alice", "sku1", 1)
+        self.assertEqual(OrderService.checkout("alice"), (False, "Insufficient stock for item sku1"))
+        self.assertEqual(self.quantities(), {"sku0": 5, "sku1": 1})
+        self.assertEqual(self.cart(), {"sku0": 2, "sku1": 2})
+
+    def test_empty_cart(self):
+        self.assertEqual(OrderService.checkout("bob"), (False, "Cart is empty"))
+
+    def test_failed_order_write_is_rolled_back(self):
+        with mock.patch.object(OrderRepository, "append", side_effect=OSError("disk full")):
+            self.assertEqual(OrderService.checkout("alice"), (False, "Checkout failed, no changes were made: disk full"))
+        self.assertUnchanged()
+
+    def test_failed_cart_write_is_rolled_back(self):
+        with mock.patch.object(OrderService, "clear_cart", side_effect=OSError("disk full")):
+            self.assertFalse(OrderService.checkout("alice")[0])
+        self.assertUnchanged()
+
+    def test_checkout_after_a_rollback_succeeds(self):
+        with mock.patch.object(OrderRepository, "append", side_effect=OSError("disk full")):
+            OrderService.checkout("alice")
+        self.assertTrue(OrderService.checkout("alice")[0])
+        self.assertEqual(self.quantities(), {"sku0": 3, "sku1": 0})
+        self.assertEqual([order["order_id"] for order in OrderService.get_orders()], [1])
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,97 @@
+"""
+Keyset pagination: page cursors, and paging through items and orders while
+records are added between pages.
+"""
+import unittest
+
+from src.repositories.inventory_repository import InventoryRepository
+from src.repositories.order_repository import OrderRepository
+from src.services.inventory_service import InventoryService
+from src.services.order_service import OrderService
+from src.utils.pagination import decode_cursor, encode_cursor, keyset_page
+from tests.helpers import DataDirectoryTestCase, item
+
+def all_pages(get_page, page_size: int) -> list:
+    """Every page from get_page(page_size, cursor), following the cursors to the end"""
+    pages, cursor = [], None
+    while True:
+        page, cursor = get_page(page_size, cursor)
+        pages.append(page)
+        if cursor is None:
+            return pages
+
+class CursorTest(unittest.TestCase):
+    def test_round_trip(self):
+        cursor = encode_cursor("-price", 2.5, "sku/1 ü")
+        self.assertNotIn("=", cursor)
+        self.assertEqual(decode_cursor(cursor, "-price"), (2.5, "sku/1 ü"))
+
+    def test_cursor_from_another_sort_is_rejected(self):
+        with self.assertRaisesRegex(ValueError, "does not belong to sort order price"):
+            decode_cursor(encode_cursor("-price", 2.5, "sku1"), "price")
+
+    def test_malformed_cursor_is_rejected(self):
+        for cursor in ("", "not a cursor", encode_cursor("price")[:-2] + "!!", "bnVsbA"):
+            with self.subTest(cursor=cursor):
+                with self.assertRaises(ValueError):
+                    decode_cursor(cursor, "price")
+
+class KeysetPageTest(unittest.TestCase):
+    keys = [(i,) for i in range(6)]
+    rows = list(range(6))
+
+    def pages(self, page_size: int, descending: bool = False, accept=lambda row: True) -> list:
+        return all_pages(lambda size, cursor: keyset_page(self.keys, self.rows, "n", size, cursor, descending, accept),
+                         page_size)
+
+    def test_page_boundaries(self):
+        self.assertEqual(self.pages(2), [[0, 1], [2, 3], [4, 5]])
+        self.assertEqual(self.pages(4), [[0, 1, 2, 3], [4, 5]])
+        self.assertEqual(self.pages(6), [[0, 1, 2, 3, 4, 5]])
+        self.assertEqual(self.pages(7), [[0, 1, 2, 3, 4, 5]])
+        self.assertEqual(self.pages(4, descending=True), [[5, 4, 3, 2], [1, 0]])
+
+    def test_filtered_rows_do_not_count_towards_a_page(self):
+        self.assertEqual(self.pages(2, accept=lambda row: row % 2), [[1, 3], [5]])
+        self.assertEqual(self.pages(2, descending=True, accept=lambda row: row % 2 == 0), [[4, 2], [0]])
+
+    def test_empty_and_invalid(self):
+        self.assertEqual(keyset_page([], [], "n", 2, None), ([], None))
+        with self.assertRaises(ValueError):
+            keyset_page(self.keys, self.rows, "n", 0, None)
+
+class ServicePagingTest(DataDirectoryTestCase):
+    def test_items_by_price(self):
+        InventoryRepository.upsert_many(item(i, price=float(i % 3)) for i in range(7))
+        pages = all_pages(lambda size, cursor: InventoryService.get_items_page(size, cursor, sort="-price"), 3)
+        self.assertEqual([[i.item_id for i in page] for page in pages],
+                         [["sku5", "sku2", "sku4"], ["sku1", "sku6", "sku3"], ["sku0"]])
+
+    def test_items_added_between_pages_do_not_shift_the_next_page(self):
+        InventoryRepository.upsert_many(item(i) for i in range(1, 5))
+        first, cursor = InventoryService.get_items_page(2)
+        InventoryRepository.upsert(item(0))
+        second, cursor = InventoryService.get_items_page(2, cursor)
+        self.assertEqual([i.item_id for i in first + second], ["sku1", "sku2", "sku3", "sku4"])
+        self.assertIsNone(cursor)
+
+    def test_orders_newest_first(self):
+        for day in range(1, 6):
+            OrderRepository.append({"username": "alice" if day % 2 else "bob", "items": [], "total": 6.0 - day,
+                                    "status": "processing", "timestamp": f"2024-01-0{day}T00:00:00"})
+        first, cursor = OrderService.get_orders_page(page_size=2)
+        # An order placed while the first page is read does not appear on, or shift, the later pages
+        OrderRepository.append({"username": "alice", "items": [], "total": 1.0, "status": "processing",
+                                "timestamp": "2024-01-06T00:00:00"})
+        second, cursor = OrderService.get_orders_page(page_size=2, cursor=cursor)
+        third, cursor = OrderService.get_orders_page(page_size=2, cursor=cursor)
+        self.assertEqual([[o["order_id"] for o in page] for page in (first, second, third)], [[5, 4], [3, 2], [1]])
+        self.assertIsNone(cursor)
+
+        pages = all_pages(lambda size, c: OrderService.get_orders_page("alice", size, c, since="2024-01-02"), 2)
+        self.assertEqual([[o["order_id"] for o in page] for page in pages], [[6, 5], [3]])
+        pages = all_pages(lambda size, c: OrderService.get_orders_page(page_size=size, cursor=c, sort="total"), 4)
+        self.assertEqual([[o["order_id"] for o in page] for page in pages], [[5, 6, 4, 3], [2, 1]])
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,78 @@
+"""
+The running sales totals checkout keeps, checked against a full recompute
+of the order history.
+"""
+import contextlib
+import io
+import unittest
+from unittest import mock
+
+from src.repositories.cart_repository import CartRepository
+from src.repositories.inventory_repository import InventoryRepository
+from src.repositories.order_repository import OrderRepository
+from src.repositories.sales_repository import SalesRepository
+from src.services.order_service import OrderService
+from src.utils.file_handler import FileHandler
+from tests.helpers import DataDirectoryTestCase, item
+
+def order(timestamp: str, *lines) -> dict:
+    items = [{"item_id": item_id, "quantity": quantity, "price": price} for item_id, quantity, price in lines]
+    return {"username": "alice", "items": items, "total": sum(q * p for _, q, p in lines),
+            "status": "processing", "timestamp": timestamp}
+
+class SalesRepositoryTest(DataDirectoryTestCase):
+    def setUp(self):
+        super().setUp()
+        InventoryRepository.upsert_many([item(0), item(1)])
+
+    def place(self, *orders) -> None:
+        """Append orders and add them to the totals, as checkout does"""
+        for placed in orders:
+            SalesRepository.record_order(OrderRepository.append(placed))
+
+    def test_recorded_totals_match_a_full_recompute(self):
+        self.place(order("2024-01-01T10:00:00", ("sku0", 2, 1.0)),
+                   order("2024-01-01T11:00:00", ("sku0", 1, 1.0), ("sku1", 3, 2.0)),
+                   order("2024-01-02T09:00:00", ("sku1", 1, 2.0)))
+        stored = SalesRepository.get()
+        self.assertEqual(stored["order_count"], 3)
+        self.assertAlmostEqual(stored["total_sales"], 11.0)
+        self.assertEqual(stored["items"]["sku0"], {"units": 3, "revenue": 3.0})
+        self.assertEqual(stored["days"]["2024-01-01"], {"orders": 2, "sales": 9.0})
+
+        self.assertEqual(OrderService.check_sales_aggregates(), [])
+        self.assertEqual(OrderService.rebuild_sales_aggregates(), stored)
+
+    def test_rebuild_repairs_drifted_totals(self):
+        self.place(order("2024-01-01T10:00:00", ("sku0", 2, 1.0)))
+        # An order whose totals were never recorded, as after a failed update
+        OrderRepository.append(order("2024-01-02T10:00:00", ("sku1", 1, 2.0)))
+        self.assertEqual(OrderService.check_sales_aggregates(), [
+            "/days/2024-01-02: stored None, expected {'orders': 1, 'sales': 2.0}",
+            "/items/sku1: stored None, expected {'units': 1, 'revenue': 2.0}",
+            "/order_count: stored 1, expected 2",
+            "/total_sales: stored 2.0, expected 4.0",
+        ])
+        OrderService.rebuild_sales_aggregates()
+        self.assertEqual(OrderService.check_sales_aggregates(), [])
+
+    def test_ensure_builds_missing_totals_once(self):
+        OrderRepository.append(order("2024-01-01T10:00:00", ("sku0", 2, 1.0)))
+        self.assertTrue(SalesRepository.ensure(OrderService.ORDERS_FILE))
+        self.assertFalse(SalesRepository.ensure(OrderService.ORDERS_FILE))
+        self.assertEqual(SalesRepository.get()["order_count"], 1)
+
+    def test_failed_update_keeps_the_order(self):
+        CartRepository.add("alice", "sku0", 2)
+        stderr = io.StringIO()
+        with mock.patch.object(SalesRepository, "record_order", side_effect=KeyError("items")), \
+                contextlib.redirect_stderr(stderr):
+            success, message = OrderService.checkout("alice")
+        self.assertTrue(success, message)
+        self.assertIn("rebuild-sales", stderr.getvalue())
+        self.assertEqual(len(FileHandler.read_data(OrderService.ORDERS_FILE)), 1)
+        self.assertEqual(InventoryRepository.get("sku0")["quantity"], 8)
+        self.assertEqual(OrderService.check_sales_aggregates()[-1], "/total_sales: stored 0.0, expected 2.0")
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,126 @@
+"""
+The write-ahead log backend (RETAIL_WAL=1): recovery after a crash, log
+compaction, and checkout when the log cannot be written.
+"""
+import os
+import unittest
+from unittest import mock
+
+from src.repositories.cart_repository import CartRepository
+from src.repositories.inventory_repository import InventoryRepository
+from src.services.order_service import OrderService
+from src.storage.json_backend import JsonFileBackend
+from src.storage.wal import WriteAheadLog
+from src.storage.wal_backend import WalBackend
+from src.utils.file_handler import FileHandler
+from tests.helpers import DataDirectoryTestCase, item
+
+LOG = "data/wal.log"
+INVENTORY = InventoryRepository.INVENTORY_FILE
+
+class WalTestCase(DataDirectoryTestCase):
+    def make_backend(self) -> WalBackend:
+        # Compacted only when a test asks
+        return WalBackend(LOG, compact_bytes=0)
+
+    def restart(self) -> dict:
+        """Recover as a new process would from the data directory as it was left; returns the recovery statistics"""
+        backend = self.make_backend()
+        self.use_backend(backend)
+        return backend.recover()
+
+    def quantities(self) -> dict:
+        return {record["item_id"]: record["quantity"] for record in FileHandler.read_data(INVENTORY)}
+
+class RecoveryTest(WalTestCase):
+    def setUp(self):
+        super().setUp()
+        InventoryRepository.upsert_many(item(i) for i in range(3))
+        InventoryRepository.upsert(item(0, quantity=4))
+
+    def test_torn_last_line_is_cut_off(self):
+        with open(LOG, "ab") as log:
+            log.write(b'deadbeef {"ops":[{"op":"app')
+        stats = self.restart()
+        self.assertEqual(stats["truncated_bytes"], 27)
+        self.assertEqual(stats["transactions"], 2)
+        self.assertEqual(self.quantities(), {"sku0": 4, "sku1": 10, "sku2": 10})
+
+    def test_commit_after_a_torn_line_starts_a_line_of_its_own(self):
+        with open(LOG, "ab") as log:
+            log.write(b'0000 {"bro')
+        InventoryRepository.upsert(item(1, quantity=2))
+        self.assertEqual(self.restart()["transactions"], 3)
+        self.assertEqual(self.quantities(), {"sku0": 4, "sku1": 2, "sku2": 10})
+
+    def test_uncommitted_block_is_discarded(self):
+        with self.assertRaises(RuntimeError):
+            with FileHandler.locked(INVENTORY):
+                InventoryRepository.upsert(item(2, quantity=0))
+                raise RuntimeError("interrupted")
+        self.assertEqual(self.quantities(), {"sku0": 4, "sku1": 10, "sku2": 10})
+        self.restart()
+        self.assertEqual(self.quantities(), {"sku0": 4, "sku1": 10, "sku2": 10})
+
+class CompactionTest(WalTestCase):
+    def setUp(self):
+        super().setUp()
+        InventoryRepository.upsert_many(item(i) for i in range(3))
+        InventoryRepository.upsert(item(0, quantity=4))
+        self.expected = {"sku0": 4, "sku1": 10, "sku2": 10}
+
+    def test_compaction_moves_the_log_into_the_data_files(self):
+        self.assertEqual(FileHandler.compact_log(), [INVENTORY])
+        self.assertEqual(self.restart()["transactions"], 0)
+        stored = JsonFileBackend().read_data(INVENTORY)
+        self.assertEqual({record["item_id"]: record["quantity"] for record in stored}, self.expected)
+        self.assertEqual(FileHandler.compact_log(), [])
+
+    def test_crash_before_files_are_moved_into_place(self):
+        install = WalBackend._install_checkpoint
+        calls = []
+
+        def crash_on_second_install(backend):
+            calls.append(backend)
+            if len(calls) == 2:
+                raise SystemExit("crash")
+            install(backend)
+
+        with mock.patch.object(WalBackend, "_install_checkpoint", crash_on_second_install):
+            with self.assertRaises(SystemExit):
+                FileHandler.compact_log()
+        self.assertTrue(os.path.exists(INVENTORY + ".wal-1"))
+
+        self.restart()
+        self.assertEqual(self.quantities(), self.expected)
+        self.assertFalse(os.path.exists(INVENTORY + ".wal-1"))
+        self.assertEqual(JsonFileBackend().read_data(INVENTORY), FileHandler.read_data(INVENTORY))
+
+class CheckoutTest(WalTestCase):
+    def setUp(self):
+        super().setUp()
+        InventoryRepository.upsert(item(0))
+        CartRepository.add("alice", "sku0", 2)
+
+    def test_failed_log_write_changes_nothing(self):
+        with mock.patch.object(WriteAheadLog, "append", side_effect=OSError(28, "No space left on device")):
+            success, message = OrderService.checkout("alice")
+        self.assertFalse(success)
+        self.assertEqual(message, "Checkout failed, no changes were made: [Errno 28] No space left on device")
+        self.assertEqual(self.quantities(), {"sku0": 10})
+        self.assertEqual([line["quantity"] for line in OrderService.get_cart("alice")], [2])
+        self.assertEqual(OrderService.get_orders(), [])
+
+    def test_failed_sync_is_reported(self):
+        with mock.patch("src.storage.wal.os.fsync", side_effect=OSError(5, "Input/output error")):
+            success, message = OrderService.checkout("alice")
+        self.assertFalse(success)
+        self.assertTrue(message.startswith("Order placed but not confirmed on disk"), message)
+        # The transaction is still not known to be on disk, so the next commit syncs it again
+        log = FileHandler.backend().log
+        self.assertLess(log._synced, log._written)
+        InventoryRepository.upsert(item(1))
+        self.assertEqual(log._synced, log._written)
+
+if __name__ == "__main__":
+    unittest.main()